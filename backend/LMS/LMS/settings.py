@@ -137,6 +137,57 @@ else:
     }
 
 
+# -----------------------------
+# Bulk Import
+# -----------------------------
+# Rows written per bulk_create statement by labs.importers
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', default=500, cast=int)
+# Rows read per chunk when streaming uploads (0 loads the whole file at once)
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=0, cast=int)
+# Rows per chunk for background import jobs (run by `manage.py run_import_worker`)
+IMPORT_JOB_CHUNK_SIZE = config('IMPORT_JOB_CHUNK_SIZE', default=1000, cast=int)
+# Processes parsing sheets of multi-sheet workbook imports (0 = one per CPU)
+IMPORT_WORKBOOK_WORKERS = config('IMPORT_WORKBOOK_WORKERS', default=0, cast=int)
+# Parsed upload cache, keyed by file hash (empty disables it), and its entry lifetime in seconds
+IMPORT_CACHE_DIR = config('IMPORT_CACHE_DIR', default=str(BASE_DIR / 'import_cache'))
+IMPORT_CACHE_MAX_AGE = config('IMPORT_CACHE_MAX_AGE', default=86400, cast=int)
+# Normalized rows returned in the preview of a dry-run import
+IMPORT_DRY_RUN_SAMPLE_SIZE = config('IMPORT_DRY_RUN_SAMPLE_SIZE', default=20, cast=int)
+# Creates + updates + deletes accepted by one request to the /bulk/ endpoints (labs.bulk)
+BULK_WRITE_MAX_ITEMS = config('BULK_WRITE_MAX_ITEMS', default=1000, cast=int)
+
+
+# -----------------------------
+# Caching
+# -----------------------------
+# Pluggable: locmem (per process), django.core.cache.backends.filebased.FileBasedCache
+# with CACHE_LOCATION set to a directory, or django.core.cache.backends.redis.RedisCache
+# with a redis:// URL (needs the redis package)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='lms'),
+    }
+}
+# Cache holding rendered responses and their versions (labs.response_cache), and their lifetime in seconds
+RESPONSE_CACHE_ALIAS = config('RESPONSE_CACHE_ALIAS', default='default')
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+# Lifetime of the memoized /api/stats/ result in seconds
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=30, cast=int)
+# Serve the PC and equipment lists from values() rows without DRF serializers (labs.fastpath)
+FAST_SERIALIZATION = config('FAST_SERIALIZATION', default=True, cast=bool)
+# /api/sync/ (labs.sync): rows per table and response, how long rows settle before
+# they are returned, and how many days deletions are kept for
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+SYNC_SETTLE_SECONDS = config('SYNC_SETTLE_SECONDS', default=5, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+# /api/events/ (labs.events): events queued per client before a slow client is
+# disconnected, events kept for reconnecting clients, and seconds between keepalives
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+EVENTS_BACKLOG = config('EVENTS_BACKLOG', default=256, cast=int)
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -174,6 +225,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (background import jobs keep their upload here until they run)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -191,6 +246,8 @@ CORS_ALLOWED_ORIGINS = [
     'http://172.19.96.1:5173',
     'http://172.19.96.1:5174',
 ]
+# Let the frontend read the conditional GET validator (labs.conditional)
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # If you face CSRF issues with unsafe methods and cookies, trust the dev origins
 CSRF_TRUSTED_ORIGINS = [
@@ -16,14 +16,28 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from labs.importers import import_labs, import_pcs, import_lab_equipment
+from labs.importers import handle_import_request
 
 
 class BulkImportAPIView(APIView):
     """
     POST multipart/form-data:
       - file: CSV or XLSX
-      - entity: labs | pcs | equipment
+      - entity: labs | pcs | lab-equipment
+      - lab_id: optional target lab for pcs / lab-equipment
+      - chunk_size: optional, stream the file in chunks of this many rows
+      - commit_per_chunk: optional, commit every chunk instead of all-or-nothing
+      - mode: optional, insert (default, skip existing rows) | upsert
+        (update changed pcs / lab-equipment rows in place)
+      - workbook: optional, import every sheet of an XLSX; rows go to the lab
+        in their "lab" column or the lab named after their sheet
+      - workers: optional, processes parsing workbook sheets in parallel
+      - force: optional, import again even if this exact file was imported
+        before (otherwise the earlier result is returned with 200)
+      - dry_run: optional, validate the file and return the projected counts,
+        row errors and a sample of normalized rows without writing anything
+      - background: optional, queue the import and return 202 with a job id;
+        poll /api/import/jobs/<id>/ for progress
 
     Requires JWT auth.
     Only admin users can import.
@@ -40,45 +54,10 @@ class BulkImportAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        file = request.FILES.get("file")
-        entity = request.data.get("entity")
-
-        if not file or not entity:
-            return Response(
-                {"detail": "Both 'file' and 'entity' are required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        data, code = handle_import_request(request.data, request.FILES, user)
+        return Response(data, status=code)
 
-        try:
-            if entity == "labs":
-                created, skipped, errors = import_labs(file)
-            elif entity == "pcs":
-                created, skipped, errors = import_pcs(file)
-            elif entity == "lab-equipment":
-                created, skipped, errors = import_lab_equipment(file)
-            else:
-                return Response(
-                    {"detail": "Invalid entity. Use labs | pcs | lab-equipment."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
 
-            return Response(
-                {
-                    "status": "success",
-                    "entity": entity,
-                    "created": created,
-                    "skipped": skipped,
-                    "errors": errors,
-                },
-                status=status.HTTP_201_CREATED,
-            )
-
-        except Exception as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-    
 # TEMPORARY browser test UI (no DRF)
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
@@ -2,7 +2,7 @@ from django.contrib import admin
 from .models import (
     User, Lab, PC, LabEquipment, NetworkEquipmentDetails, ServerDetails,
     ProjectorDetails, ElectricalApplianceDetails, Peripheral, Software,
-    MaintenanceLog, LabEquipment, CPU, OS
+    MaintenanceLog, LabEquipment, CPU, OS, ImportJob, ImportRecord, InventorySummary, Tombstone
 )
 
 ### Inline editing for LabEquipment under Lab admin (Lab -> LabEquipment)
@@ -171,3 +171,48 @@ class MaintenanceLogAdmin(admin.ModelAdmin):
         return "Unknown"
     
     get_device.short_description = 'Device'
+
+
+# --------------------------
+# Import Job Admin
+# --------------------------
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'entity', 'file_name', 'lab', 'status', 'rows_processed', 'total_rows', 'created_at', 'finished_at')
+    list_filter = ('status', 'entity')
+    search_fields = ('file_name', 'lab__name')
+    readonly_fields = ('rows_processed', 'created_count', 'updated_count', 'unchanged_count', 'skipped_count', 'errors', 'detail', 'started_at', 'finished_at')
+
+
+# --------------------------
+# Import Ledger Admin
+# --------------------------
+@admin.register(ImportRecord)
+class ImportRecordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'entity', 'file_name', 'lab', 'mode', 'content_hash', 'created_by', 'created_at')
+    list_filter = ('entity', 'mode')
+    search_fields = ('file_name', 'content_hash', 'lab__name')
+    readonly_fields = ('content_hash', 'file_size', 'result', 'created_at')
+
+
+# --------------------------
+# Inventory Summary Admin
+# --------------------------
+@admin.register(InventorySummary)
+class InventorySummaryAdmin(admin.ModelAdmin):
+    list_display = ('lab', 'equipment_type', 'category', 'total', 'working', 'not_working', 'under_repair', 'updated_at')
+    list_filter = ('equipment_type', 'category')
+    search_fields = ('lab__name',)
+    # Maintained from LabEquipment; fix drift with `manage.py rebuild_inventory_summary`
+    readonly_fields = ('lab', 'equipment_type', 'category', 'total', 'working', 'not_working', 'under_repair', 'updated_at')
+
+
+# --------------------------
+# Sync Tombstones Admin
+# --------------------------
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('entity', 'object_id', 'owner_id', 'deleted_at')
+    list_filter = ('entity',)
+    # Written on deletes for /api/sync/; prune with `manage.py prune_sync_tombstones`
+    readonly_fields = ('entity', 'object_id', 'owner_id', 'deleted_at')
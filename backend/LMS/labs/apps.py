@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LabsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'labs'
+
+    def ready(self):
+        # Keeps InventorySummary in step with LabEquipment
+        from labs import signals  # noqa: F401
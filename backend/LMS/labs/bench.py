@@ -0,0 +1,340 @@
+"""
+Importer benchmark harness (see `manage.py bench_import`).
+
+Generates synthetic CSV/XLSX files with messy headers and a share of bad
+rows, runs the importers against a fresh SQLite database and measures
+throughput, peak RSS, query count and where the time goes.
+"""
+import csv
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.core.files import File
+from django.core.management import call_command
+from django.db import connection, connections
+from openpyxl import Workbook
+
+from labs import importers
+from labs.models import Lab, LabEquipment
+
+
+BENCH_ENTITIES = ("labs", "pcs", "lab-equipment")
+BENCH_FORMATS = ("csv", "xlsx")
+
+# Headers as they show up in real inventory sheets: mixed case, stray
+# spaces, parentheses and aliases that normalize_columns has to clean up.
+LAB_HEADER = ["Lab Name", " Location "]
+PC_HEADER = ["PC Name (Comp ID)", "Status", "Connected", "GPU", "Processor", " RAM ", "Storage",
+             "Brand", "Serial", "Peripherals"]
+EQUIPMENT_HEADER = ["Equipment Code", "Name", "Type", "Category", "Quantity", " Status", "Is Networked",
+                    "Brand", "Model", "Installation Date", "Location", "Notes",
+                    "IP", "MAC Address", "Ports", "Firmware", "Managed Switch",
+                    "CPU", "RAM", "Storage", "RAID", "OS",
+                    "Resolution", "Brightness (Lumens)", "HDMI",
+                    "Power", "Voltage", "Inverter Type", "Energy Rating"]
+
+EQUIPMENT_TYPES = [code for code, _ in LabEquipment.EQUIPMENT_TYPES]
+APPLIANCE_TYPES = ("PROJECTOR", "AC", "FAN", "LIGHT")
+
+
+# -----------------------
+# SYNTHETIC DATA
+# -----------------------
+def generate_rows(entity, rows, bad_ratio=0.05, seed=0):
+    """
+    Synthetic (header, rows) for entity. Roughly bad_ratio of the rows are
+    broken: missing keys, repeated keys, invalid types, numbers or dates.
+    """
+    rng = random.Random(seed)
+    make = {"labs": _lab_row, "pcs": _pc_row, "lab-equipment": _equipment_row}[entity]
+    header = {"labs": LAB_HEADER, "pcs": PC_HEADER, "lab-equipment": EQUIPMENT_HEADER}[entity]
+    return header, [make(n, rng, rng.random() < bad_ratio) for n in range(rows)]
+
+
+def _lab_row(n, rng, bad):
+    name = f"Bench Lab {n:06d}"
+    if bad:
+        name = rng.choice(["", "   ", f"Bench Lab {max(n - 1, 0):06d}"])
+    return [name, f"Block {n % 12}"]
+
+
+def _pc_row(n, rng, bad):
+    name = f"PC-{n:06d}"
+    status = rng.choice(["working", "not_working", "under_repair", "Working"])
+    if bad:
+        name, status = rng.choice([("", status), (f"PC-{max(n - 1, 0):06d}", status), (name, "on fire")])
+    return [
+        name, status, rng.choice(["yes", "no", "1", "0", "TRUE", ""]), rng.choice(["y", "n", ""]),
+        rng.choice(["i5-12400", "Ryzen 5 5600", "i7-12700"]), rng.choice(["8GB", "16GB", "32 GB"]),
+        rng.choice(["512GB SSD", "1TB HDD"]), rng.choice(["Dell", "HP", "Lenovo", ""]),
+        f"SN{n:08d}" if rng.random() < 0.8 else "", rng.choice(["yes", "no"]),
+    ]
+
+
+def _equipment_row(n, rng, bad):
+    eq_type = EQUIPMENT_TYPES[n % len(EQUIPMENT_TYPES)]
+    code = f"EQ-{n:06d}"
+    quantity = str(rng.randint(1, 4))
+    installed = f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    type_label = rng.choice([eq_type, eq_type.lower(), f" {eq_type.title()} "])
+    if bad:
+        kind = rng.choice(["code", "type", "quantity", "date"])
+        if kind == "code":
+            code = rng.choice(["", f"EQ-{max(n - 1, 0):06d}"])
+        elif kind == "type":
+            type_label = "teleporter"
+        elif kind == "quantity":
+            quantity = rng.choice(["-3", "lots", "0"])
+        else:
+            installed = "someday"
+
+    row = {
+        "Equipment Code": code,
+        "Name": f"{eq_type.title()} {n}" if rng.random() < 0.9 else "",
+        "Type": type_label,
+        "Category": "APPLIANCE" if eq_type in APPLIANCE_TYPES else "INFRASTRUCTURE",
+        "Quantity": quantity,
+        " Status": rng.choice(["working", "not_working", "under_repair"]),
+        "Is Networked": rng.choice(["yes", "no"]),
+        "Brand": rng.choice(["Cisco", "Epson", "Daikin", "APC", ""]),
+        "Model": f"M-{n % 97}",
+        "Installation Date": installed,
+        "Location": f"Rack {n % 8}",
+        "Notes": "",
+    }
+    if eq_type in importers.NETWORK_TYPES:
+        row.update({
+            "IP": f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}",
+            "MAC Address": ":".join(f"{(n >> shift) & 0xff:02x}" for shift in (40, 32, 24, 16, 8, 0)),
+            "Ports": rng.choice(["8", "24", "48"]),
+            "Firmware": "v1.2.3",
+            "Managed Switch": rng.choice(["yes", "no"]),
+        })
+    if eq_type == "SERVER":
+        row.update({"CPU": "Xeon Silver", "RAM": "128GB", "Storage": "4TB", "RAID": "RAID 10", "OS": "Ubuntu"})
+    if eq_type == "PROJECTOR":
+        row.update({"Resolution": "1920x1080", "Brightness (Lumens)": "3500", "HDMI": "2"})
+    if eq_type in importers.ELECTRICAL_TYPES:
+        row.update({"Power": "1500W", "Voltage": "230V", "Inverter Type": rng.choice(["yes", "no"]),
+                    "Energy Rating": "5 Star"})
+    return [row.get(column, "") for column in EQUIPMENT_HEADER]
+
+
+def write_file(header, rows, fmt, directory):
+    """Write header and rows as a CSV or XLSX file in directory; returns the path."""
+    path = os.path.join(directory, f"bench-{len(rows)}.{fmt}")
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            writer.writerows(rows)
+    else:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+    return path
+
+
+# -----------------------
+# MEASUREMENT
+# -----------------------
+def current_rss():
+    """Resident set size of this process in bytes (Linux), else the peak so far."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler(threading.Thread):
+    """Background thread tracking the peak RSS while a run is in progress."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+class QueryCounter:
+    """connection.execute_wrapper counting statements without recording SQL."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class PhaseTimer:
+    """
+    Wraps importer functions so their time is booked to a phase: parse
+    (reading the file into frames) and write (database inserts/updates).
+    Everything else the importer does counts as validate.
+    """
+    PARSE = ("iter_dataframes",)
+    WRITE = ("bulk_create_rows", "bulk_update_rows", "assign_equipment_ids")
+
+    def __init__(self):
+        self.seconds = {"parse": 0.0, "write": 0.0}
+
+    @contextmanager
+    def installed(self):
+        originals = {name: getattr(importers, name) for name in self.PARSE + self.WRITE}
+        for name in self.PARSE:
+            setattr(importers, name, self._timed_reader(originals[name]))
+        for name in self.WRITE:
+            setattr(importers, name, self._timed(originals[name], "write"))
+        try:
+            yield self
+        finally:
+            for name, func in originals.items():
+                setattr(importers, name, func)
+
+    def _timed(self, func, phase):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.perf_counter() - start
+        return wrapper
+
+    def _timed_reader(self, func):
+        # The reader opens the file when called and parses lazily per chunk
+        opener = self._timed(func, "parse")
+
+        def wrapper(*args, **kwargs):
+            chunks = opener(*args, **kwargs)
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    self.seconds["parse"] += time.perf_counter() - start
+                yield chunk
+        return wrapper
+
+
+@contextmanager
+def fresh_sqlite_database(directory):
+    """
+    Point the default connection at a new, migrated SQLite file for the
+    duration of the block, whatever database the project is configured with.
+    """
+    original = connections.settings["default"]
+    connection.close()
+    bench = dict(original, ENGINE="django.db.backends.sqlite3", NAME=os.path.join(directory, "bench.sqlite3"),
+                 OPTIONS={}, HOST="", PORT="", USER="", PASSWORD="")
+    connections.settings["default"] = bench
+    del connections["default"]
+    try:
+        call_command("migrate", verbosity=0, interactive=False)
+        yield
+    finally:
+        connections["default"].close()
+        connections.settings["default"] = original
+        del connections["default"]
+        os.remove(bench["NAME"])
+
+
+# -----------------------
+# RUNNER
+# -----------------------
+def run_one(entity, path, batch_size, chunk_size):
+    """Import path as entity into the current (fresh) database and measure it."""
+    lab = None if entity == "labs" else Lab.objects.create(name="Bench Lab")
+    timer, queries, sampler = PhaseTimer(), QueryCounter(), RSSSampler()
+    options = {"batch_size": batch_size, "chunk_size": chunk_size}
+
+    with open(path, "rb") as handle, timer.installed(), connection.execute_wrapper(queries):
+        upload = File(handle, name=os.path.basename(path))
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            if entity == "labs":
+                result = importers.import_lab_file(upload, **options)
+            elif entity == "pcs":
+                result = importers.import_pcs(upload, lab_id=lab.id, **options)
+            else:
+                result = importers.import_lab_equipment(upload, lab_id=lab.id, **options)
+        finally:
+            seconds = time.perf_counter() - start
+            peak_rss = sampler.stop()
+
+    parse, write = timer.seconds["parse"], timer.seconds["write"]
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(result["created"] / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+        "queries": queries.count,
+        "parse_seconds": round(parse, 4),
+        "validate_seconds": round(max(seconds - parse - write, 0.0), 4),
+        "write_seconds": round(write, 4),
+        "created": result["created"],
+        "skipped": result["skipped"],
+        "errors": len(result["errors"]),
+    }
+
+
+def run_benchmark(rows=10000, entities=BENCH_ENTITIES, formats=BENCH_FORMATS, bad_ratio=0.05, seed=0,
+                  batch_size=importers.DEFAULT_BATCH_SIZE, chunk_size=None, repeat=1):
+    """
+    Run every entity/format combination `repeat` times, each on a fresh
+    SQLite database. Returns a JSON-ready report.
+    """
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="bench-import-") as directory:
+        for entity in entities:
+            header, data = generate_rows(entity, rows, bad_ratio, seed)
+            for fmt in formats:
+                path = write_file(header, data, fmt, directory)
+                for attempt in range(repeat):
+                    with fresh_sqlite_database(directory):
+                        stats = run_one(entity, path, batch_size, chunk_size)
+                    runs.append({"entity": entity, "format": fmt, "rows": rows, "run": attempt + 1, **stats})
+                os.remove(path)
+
+    return {
+        "settings": {
+            "rows": rows,
+            "bad_ratio": bad_ratio,
+            "seed": seed,
+            "batch_size": batch_size,
+            "chunk_size": chunk_size,
+            "repeat": repeat,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "platform": platform.platform(),
+        },
+        "runs": runs,
+    }
@@ -0,0 +1,278 @@
+"""
+Batch writes: many creates, updates and deletes of one model in a request.
+
+POST /api/<resource>/bulk/ with
+
+    {"create": [{...}, ...], "update": [{"id": 1, ...}, ...], "delete": [3, 4]}
+
+Items are validated with the resource's serializer (updates are partial,
+like PATCH). If any item fails nothing is written and the 400 response holds
+the errors per item, in request order ({} for valid items), as DRF does for
+many=True serializers. Otherwise everything is written in one transaction:
+deletes with one queryset delete, updates with one bulk_update and creates
+with bulk_create. The 200 response has the serialized rows per item and the
+deleted ids.
+
+Validation costs a fixed number of queries however many items there are:
+related rows are fetched once for all items and unique_together is checked
+for the whole batch at once instead of per item.
+
+bulk_create and bulk_update send no signals, so the response cache and, for
+LabEquipment, the InventorySummary are kept current in after_write().
+"""
+import copy
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.validators import UniqueTogetherValidator
+
+from labs import response_cache, sync
+from labs.models import PC
+from labs.permissions import IsAdminUser
+from labs.prefetching import eager_load
+
+
+OPERATIONS = ("create", "update", "delete")
+
+
+def parse_payload(data):
+    """(creates, updates, deletes) of a request body, checking its shape only."""
+    if not isinstance(data, dict) or not set(data) & set(OPERATIONS):
+        raise ValidationError({"detail": f"Expected an object with any of: {', '.join(OPERATIONS)}."})
+    unknown = set(data) - set(OPERATIONS)
+    if unknown:
+        raise ValidationError({"detail": f"Unknown keys: {', '.join(sorted(unknown))}."})
+
+    creates, updates, deletes = (data.get(operation) or [] for operation in OPERATIONS)
+    for operation, items in zip(OPERATIONS, (creates, updates, deletes)):
+        if not isinstance(items, list):
+            raise ValidationError({operation: "Must be a list."})
+    if any(not isinstance(item, dict) for item in creates + updates):
+        raise ValidationError({"detail": "create and update items must be objects."})
+    if any(isinstance(pk, bool) or not isinstance(pk, int) for pk in deletes):
+        raise ValidationError({"delete": "Must be a list of ids."})
+
+    total = len(creates) + len(updates) + len(deletes)
+    if total > settings.BULK_WRITE_MAX_ITEMS:
+        raise ValidationError({"detail": f"At most {settings.BULK_WRITE_MAX_ITEMS} items per request, got {total}."})
+    return creates, updates, deletes
+
+
+class PreloadedRows:
+    """
+    Stands in for a PrimaryKeyRelatedField's queryset with the rows every
+    item refers to, fetched in one query.
+    """
+
+    def __init__(self, queryset, pks):
+        self.model = queryset.model
+        valid = []
+        for pk in pks:
+            try:
+                valid.append(self.model._meta.pk.to_python(pk))
+            except Exception:
+                # Reported by the field itself
+                continue
+        self.rows = queryset.in_bulk(valid)
+
+    def get(self, pk):
+        row = self.rows.get(self.model._meta.pk.to_python(pk))
+        if row is None:
+            raise self.model.DoesNotExist
+        return row
+
+
+def unique_key_errors(model, objects, exclude):
+    """
+    {key: errors} for objects ((key, unsaved object) pairs) that would
+    break a unique_together constraint, with each other or with stored rows
+    other than the exclude pks. One query per constraint.
+    """
+    errors = {}
+    for fields in model._meta.unique_together:
+        attnames = [model._meta.get_field(name).attname for name in fields]
+        message = f"The fields {', '.join(fields)} must make a unique set."
+        keyed = []
+        seen = set()
+        for key, obj in objects:
+            values = tuple(getattr(obj, attname) for attname in attnames)
+            if None in values:
+                # NULLs never collide
+                continue
+            if values in seen:
+                errors[key] = {"non_field_errors": [message]}
+            seen.add(values)
+            keyed.append((key, values))
+        if not keyed:
+            continue
+        stored = set(
+            model._default_manager
+            .filter(reduce(or_, (Q(**dict(zip(attnames, values))) for values in seen)))
+            .exclude(pk__in=exclude)
+            .values_list(*attnames)
+        )
+        for key, values in keyed:
+            if values in stored:
+                errors[key] = {"non_field_errors": [message]}
+    return errors
+
+
+def lab_ids(objects):
+    """Labs the objects (PC children or rows with a lab) belong to."""
+    labs = {obj.lab_id for obj in objects if hasattr(obj, "lab_id")}
+    pc_ids = {obj.pc_id for obj in objects if hasattr(obj, "pc_id")}
+    if pc_ids:
+        labs.update(PC.objects.filter(pk__in=pc_ids).values_list("lab_id", flat=True))
+    return labs
+
+
+class BulkWriteView(generics.GenericAPIView):
+    """Base for the bulk endpoints; subclasses set queryset and serializer_class."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        creates, updates, deletes = parse_payload(request.data)
+        try:
+            with transaction.atomic():
+                created, updated, errors = self.validate_items(creates, updates, deletes)
+                if errors:
+                    return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+                self.write(created, updated, deletes)
+        except IntegrityError as e:
+            # e.g. updates swapping unique values, which one UPDATE statement may reject
+            return Response({"detail": f"IntegrityError: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = self.get_queryset().filter(pk__in=[obj.pk for obj in created + updated])
+        rows = {obj.pk: obj for obj in eager_load(rows, self.get_serializer_class())}
+        return Response({
+            "created": self.get_serializer([rows[obj.pk] for obj in created], many=True).data,
+            "updated": self.get_serializer([rows[obj.pk] for obj in updated], many=True).data,
+            "deleted": deletes,
+        })
+
+    def preload_related(self, items):
+        """{field name: PreloadedRows} for the related fields of the serializer."""
+        related = {}
+        for name, field in self.get_serializer().fields.items():
+            if isinstance(field, PrimaryKeyRelatedField) and not field.read_only:
+                pks = {item[name] for item in items if isinstance(item.get(name), (int, str))}
+                related[name] = PreloadedRows(field.get_queryset(), pks)
+        return related
+
+    def get_item_serializer(self, related, *args, **kwargs):
+        """
+        Serializer for one item, reading related rows from related and
+        leaving unique_together to unique_key_errors().
+        """
+        serializer = self.get_serializer(*args, **kwargs)
+        for name, rows in related.items():
+            serializer.fields[name].queryset = rows
+        serializer.validators = [
+            validator for validator in serializer.validators if not isinstance(validator, UniqueTogetherValidator)
+        ]
+        return serializer
+
+    def validate_items(self, creates, updates, deletes):
+        """
+        Unsaved objects for creates and updates, and the per-item errors
+        ({operation: [errors per item]}, empty when everything is valid).
+        """
+        model = self.get_queryset().model
+        related = self.preload_related(creates + updates)
+        ids = [item.get("id") for item in updates]
+        instances = self.get_queryset().select_for_update().in_bulk(
+            [pk for pk in ids + deletes if isinstance(pk, int) and not isinstance(pk, bool)]
+        )
+        errors = {operation: [] for operation in OPERATIONS}
+        created, updated = [], []
+
+        for item in creates:
+            serializer = self.get_item_serializer(related, data=item)
+            if serializer.is_valid():
+                created.append(model(**serializer.validated_data))
+            errors["create"].append(serializer.errors)
+
+        seen = set()
+        for n, (item, pk) in enumerate(zip(updates, ids)):
+            if pk not in instances:
+                errors["update"].append({"id": ["Not found." if pk is not None else "This field is required."]})
+                continue
+            if pk in seen:
+                errors["update"].append({"id": ["Listed more than once."]})
+                continue
+            seen.add(pk)
+            data = {name: value for name, value in item.items() if name != "id"}
+            serializer = self.get_item_serializer(related, instances[pk], data=data, partial=True)
+            if serializer.is_valid():
+                obj = instances[pk]
+                # The row as stored, for after_write
+                obj._before = copy.copy(obj)
+                for name, value in serializer.validated_data.items():
+                    setattr(obj, name, value)
+                obj._changed_fields = set(serializer.validated_data)
+                obj._item = n
+                updated.append(obj)
+            errors["update"].append(serializer.errors)
+
+        for pk in deletes:
+            if pk not in instances:
+                errors["delete"].append({"id": ["Not found."]})
+            elif pk in seen:
+                errors["delete"].append({"id": ["Also listed in update."]})
+            else:
+                errors["delete"].append({})
+
+        # Among the valid items; updated and deleted rows give up their stored values
+        clashes = unique_key_errors(
+            model,
+            [(("create", n), obj) for n, obj in enumerate(created)]
+            + [(("update", obj._item), obj) for obj in updated],
+            exclude=[obj.pk for obj in updated] + deletes,
+        )
+        for (operation, n), error in clashes.items():
+            errors[operation][n] = error
+        if not any(any(item) for item in errors.values()):
+            return created, updated, {}
+        return created, updated, {operation: items for operation, items in errors.items() if items}
+
+    def write(self, created, updated, deletes):
+        model = self.get_queryset().model
+        started = timezone.now()
+        if deletes:
+            # Deletes send their signals, which keep caches and summaries current
+            model.objects.filter(pk__in=deletes).delete()
+        if updated:
+            fields = set().union(*(obj._changed_fields for obj in updated))
+            for obj in updated:
+                # bulk_update does not apply auto_now
+                obj.updated_at = started
+            model.objects.bulk_update(updated, [*fields, "updated_at"], batch_size=settings.IMPORT_BATCH_SIZE)
+        bulk_created = connection.features.can_return_rows_from_bulk_insert
+        if bulk_created:
+            model.objects.bulk_create(created, batch_size=settings.IMPORT_BATCH_SIZE)
+        else:
+            # The response needs the new ids, which bulk_create only sets on
+            # backends with RETURNING; save() sends its signals itself
+            for obj in created:
+                obj.save(force_insert=True)
+        if created or updated:
+            # For delta sync (labs.sync): stamped again once the request's transaction commits
+            sync.restamp_on_commit(model.objects.filter(updated_at__gte=started))
+        self.after_write(created if bulk_created else [], updated)
+
+    def changed_labs(self, created, updated):
+        """Labs whose data the written rows changed, including labs rows moved out of."""
+        return lab_ids(created + updated + [obj._before for obj in updated])
+
+    def after_write(self, created, updated):
+        """Book rows written without signals: created (by bulk_create) and updated."""
+        for lab_id in self.changed_labs(created, updated):
+            response_cache.bump_lab(lab_id)
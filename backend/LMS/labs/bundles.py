@@ -0,0 +1,84 @@
+"""
+Lab bundles: a lab with its PCs, equipment, maintenance counts and
+inventory rows in one response, for pages that would otherwise request each
+list per lab.
+
+Bundles for any number of labs are built from a fixed number of queries:
+each part is fetched for all the labs at once and grouped in memory.
+?include= picks the parts (default: all of PARTS).
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from labs import inventory
+from labs.models import PC, LabEquipment, MaintenanceLog, InventorySummary
+from labs.prefetching import eager_load
+from labs.serializers import LabSerializer, PCSerializer, LabEquipmentListSerializer, InventorySerializer
+
+
+PARTS = ("pcs", "equipment", "maintenance", "inventory")
+
+
+def requested_parts(request):
+    """The parts named in ?include=, or all of them."""
+    value = request.query_params.get("include")
+    if not value:
+        return PARTS
+    parts = tuple(name.strip() for name in value.split(",") if name.strip())
+    unknown = set(parts) - set(PARTS)
+    if unknown:
+        raise ValidationError({"include": f"Unknown parts: {', '.join(sorted(unknown))}; allowed: {', '.join(PARTS)}."})
+    return parts
+
+
+def grouped(rows, key):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row[key]].append(row)
+    return groups
+
+
+def maintenance_counts(lab_ids):
+    """lab id -> {"pending": n, "fixed": n}; MaintenanceLog.save() fills in the lab of every log."""
+    rows = (
+        MaintenanceLog.objects.filter(lab__in=lab_ids)
+        .values("lab")
+        .annotate(pending=Count("pk", filter=Q(status="pending")), fixed=Count("pk", filter=Q(status="fixed")))
+        .order_by()
+    )
+    return {row["lab"]: {"pending": row["pending"], "fixed": row["fixed"]} for row in rows}
+
+
+def build_bundles(labs, parts, context):
+    """Bundles for labs (Lab instances), in their order, with the given parts."""
+    lab_ids = [lab.pk for lab in labs]
+    bundles = [dict(LabSerializer(lab, context=context).data) for lab in labs]
+    # ?fields= and ?expand= narrow the labs only; the parts are serialized
+    # whole, with the "lab" they are grouped by
+    part_context = {key: value for key, value in context.items() if key != "request"}
+
+    def add(name, by_lab, default):
+        for lab_id, bundle in zip(lab_ids, bundles):
+            bundle[name] = by_lab.get(lab_id, default)
+
+    if "pcs" in parts:
+        pcs = eager_load(PC.objects.filter(lab__in=lab_ids), PCSerializer)
+        add("pcs", grouped(PCSerializer(pcs, many=True, context=part_context).data, "lab"), [])
+
+    if "equipment" in parts:
+        equipment = eager_load(
+            LabEquipment.objects.filter(lab__in=lab_ids).order_by("equipment_code"), LabEquipmentListSerializer
+        )
+        data = LabEquipmentListSerializer(equipment, many=True, context=part_context).data
+        add("equipment", grouped(data, "lab"), [])
+
+    if "maintenance" in parts:
+        add("maintenance", maintenance_counts(lab_ids), {"pending": 0, "fixed": 0})
+
+    if "inventory" in parts:
+        rows = inventory.per_type(InventorySummary.objects.filter(lab__in=lab_ids))
+        add("inventory", grouped(InventorySerializer(rows, many=True, context=part_context).data, "lab"), [])
+
+    return bundles
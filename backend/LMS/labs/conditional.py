@@ -0,0 +1,107 @@
+"""
+Conditional GET for list and detail views.
+
+ConditionalGetMixin answers If-None-Match with 304 before anything is
+serialized. The ETag is a digest of the row count and the latest
+updated_at of the filtered queryset and of each nested relation the
+serializer renders, so edits to e.g. a PC's CPU or a deleted peripheral
+change the PC list's ETag too. It is computed with one aggregate query,
+with a subquery per nested table.
+
+No Last-Modified is sent: a delete, or a row leaving the filter, changes
+the count but not necessarily the latest updated_at, so If-Modified-Since
+would be answered with a stale 304.
+"""
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, DateTimeField, Max, Subquery, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import serializers
+
+
+def state_query(queryset):
+    """queryset reduced to one row: its row count and latest updated_at."""
+    try:
+        queryset.model._meta.get_field('updated_at')
+        modified = Max('updated_at')
+    except FieldDoesNotExist:
+        modified = Value(None, output_field=DateTimeField())
+    # Grouping by a constant aggregates the whole queryset, as a values() query
+    # that can be used as a subquery
+    return (
+        queryset.order_by()
+        .annotate(_state=Value(1)).values('_state')
+        .annotate(count=Count('pk'), modified=modified)
+    )
+
+
+def table_states(querysets):
+    """[(row count, latest updated_at or None)] for querysets, in one query."""
+    first, *others = [state_query(queryset) for queryset in querysets]
+    subqueries = {}
+    for n, other in enumerate(others):
+        subqueries[f'count_{n}'] = Subquery(other.values('count'))
+        subqueries[f'modified_{n}'] = Subquery(other.values('modified'))
+    row = next(iter(first.values('count', 'modified').annotate(**subqueries)), None)
+    if row is None:
+        # An empty first queryset (e.g. .none()) matches nothing nested either
+        return [(0, None)] * len(querysets)
+    return [(row['count'], row['modified'])] + [
+        (row[f'count_{n}'] or 0, row[f'modified_{n}']) for n in range(len(others))
+    ]
+
+
+def nested_querysets(queryset, serializer):
+    """Querysets of the rows the nested serializers of serializer render for queryset."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = queryset.model
+    for field in serializer.fields.values():
+        if not isinstance(field, serializers.BaseSerializer) or field.source == '*':
+            continue
+        try:
+            relation = model._meta.get_field(field.source.split('.')[0])
+        except FieldDoesNotExist:
+            continue
+        if not relation.is_relation:
+            continue
+        related = relation.related_model._default_manager
+        if relation.concrete and not relation.many_to_many:
+            # Forward foreign key / one-to-one
+            yield related.filter(pk__in=queryset.values(relation.name))
+        else:
+            # Reverse relations and many-to-many, filtered by the name pointing back
+            yield related.filter(**{f'{relation.remote_field.name}__in': queryset.values('pk')})
+
+
+class ConditionalGetMixin:
+    """
+    For generic list and detail views. Views whose rows are not model
+    instances (aggregates) override get_validator_querysets().
+    """
+
+    def get_validator_querysets(self):
+        """The querysets whose state the response depends on."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return [queryset, *nested_querysets(queryset, self.get_serializer())]
+
+    def get_etag(self, request):
+        """ETag of the current response."""
+        states = table_states(self.get_validator_querysets())
+        digest = hashlib.md5(request.get_full_path().encode('utf-8'), usedforsecurity=False)
+        for count, modified in states:
+            digest.update(f'|{count}:{modified.isoformat() if modified else ""}'.encode('utf-8'))
+        return quote_etag(digest.hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response.headers.setdefault('ETag', etag)
+        return response
@@ -0,0 +1,232 @@
+"""
+Live events: PC status, maintenance and ticket changes pushed to clients
+as server-sent events, instead of clients polling the lists.
+
+GET /api/events/ (?lab=1,2 for some labs only) keeps the response open and
+writes an event per change:
+
+    id: 3f9c01a2.42
+    event: pc.status
+    data: {"id": 7, "lab": 1, "device_name": "PC-07", "status": "not_working", ...}
+
+    pc.status            a PC's status or connected flag changed
+    maintenance.created  a maintenance log was opened
+    maintenance.fixed    a maintenance log was marked fixed
+    ticket.status        a ticket's status changed (students: their own tickets)
+    reset                events were missed; reload what is shown (e.g. with /api/sync/)
+
+The handlers in labs.signals (and PCBulk for bulk updates) publish events
+when their transaction commits to the in-process Hub, which hands them to
+the queues of the matching subscribers. Queues are bounded: a client too
+slow to keep up has its stream closed and reconnects, and EventSource sends
+the Last-Event-ID it reached, from which the last EVENTS_BACKLOG events are
+replayed; older ones get a reset.
+
+The stream needs an ASGI server (e.g. `uvicorn LMS.asgi:application`); the
+hub is per process, so events reach the clients of the process where the
+change was made. Rows written by the importers publish no events.
+"""
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque, namedtuple
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from labs.models import PC
+
+
+RESET = "reset"
+# How long EventSource waits before reconnecting, in milliseconds
+RETRY_MS = 3000
+
+# lab: id of the lab the event concerns (None: none); owner: user the event
+# is restricted to, besides admins (None: everyone); data: what is sent
+Event = namedtuple("Event", ["id", "type", "lab", "owner", "data"])
+
+
+class Subscriber:
+    """A stream's bounded queue of events and what it subscribed to, on the stream's event loop."""
+
+    def __init__(self, labs, user, queue_size):
+        self.labs = labs
+        self.user_id = user.pk
+        self.is_admin = getattr(user, "role", None) == "admin"
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event):
+        if self.labs is not None and event.lab not in self.labs:
+            return False
+        return event.owner is None or self.is_admin or event.owner == self.user_id
+
+    def put(self, event):
+        """Queue event; when the queue is full, drop it all and queue None to close the stream."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Hub:
+    """
+    Fan-out of published events to subscribers. publish() may be called from
+    any thread; each subscriber's queue is filled on its own event loop.
+    Event ids are "<hub>.<n>", so ids from another process or an earlier run
+    are recognised and answered with a reset.
+    """
+
+    def __init__(self, backlog):
+        self.name = secrets.token_hex(4)
+        self.subscribers = set()
+        self.backlog = deque(maxlen=backlog)
+        self.last = 0
+        self.lock = threading.Lock()
+
+    def publish(self, type, data, lab=None, owner=None):
+        with self.lock:
+            self.last += 1
+            event = Event(f"{self.name}.{self.last}", type, lab, owner, data)
+            self.backlog.append(event)
+            subscribers = [subscriber for subscriber in self.subscribers if subscriber.wants(event)]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put, event)
+            except RuntimeError:
+                # The loop is closed: the stream went away without unsubscribing
+                self.unsubscribe(subscriber)
+        return event
+
+    def subscribe(self, labs, user, queue_size, last_event_id=None):
+        """
+        A Subscriber to the events from now on for labs (a set of ids, or None
+        for every lab) that user may see. With last_event_id, the events after
+        it are queued first, or a reset when they are no longer all kept.
+        """
+        subscriber = Subscriber(labs, user, queue_size)
+        with self.lock:
+            missed = self.since(last_event_id) if last_event_id else []
+            self.subscribers.add(subscriber)
+        for event in missed:
+            if event.type == RESET or subscriber.wants(event):
+                subscriber.put(event)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def since(self, event_id):
+        """The kept events after event_id, or [reset] when some are gone or event_id is not ours."""
+        name, _, n = event_id.partition(".")
+        oldest = int(self.backlog[0].id.partition(".")[2]) if self.backlog else self.last + 1
+        if name != self.name or not n.isdigit() or not oldest - 1 <= int(n) <= self.last:
+            return [Event(f"{self.name}.{self.last}", RESET, None, None, {})]
+        return list(self.backlog)[len(self.backlog) - (self.last - int(n)):]
+
+
+hub = Hub(settings.EVENTS_BACKLOG)
+
+
+def publish_on_commit(type, data, lab=None, owner=None):
+    """Publish to the hub once the current transaction commits (at once outside of one)."""
+    transaction.on_commit(partial(hub.publish, type, data, lab=lab, owner=owner))
+
+
+# -----------------------
+# EVENTS
+# -----------------------
+def pc_status_changed(pc, previous):
+    """Publish pc.status if pc's status or connected flag differs from previous (a dict of both)."""
+    if (previous["status"], previous["connected"]) == (pc.status, pc.connected):
+        return
+    publish_on_commit("pc.status", {
+        "id": pc.pk, "lab": pc.lab_id, "device_name": pc.device_name,
+        "status": pc.status, "connected": pc.connected,
+        "previous": {"status": previous["status"], "connected": previous["connected"]},
+    }, lab=pc.lab_id)
+
+
+def maintenance_changed(log, previous_status, created):
+    """Publish maintenance.created for a new log and maintenance.fixed for one just marked fixed."""
+    if created:
+        type = "maintenance.created"
+    elif log.status == "fixed" and previous_status != "fixed":
+        type = "maintenance.fixed"
+    else:
+        return
+    publish_on_commit(type, {
+        "id": log.pk, "lab": log.lab_id, "pc": log.pc_id, "lab_equipment": log.lab_equipment_id,
+        "peripheral": log.peripheral_id, "status": log.status,
+    }, lab=log.lab_id)
+
+
+def ticket_status_changed(ticket, previous_status):
+    """Publish ticket.status, for admins and the ticket's student, if the status changed."""
+    if previous_status is None or previous_status == ticket.status:
+        return
+    lab_id = PC.objects.filter(pk=ticket.pc_id).values_list("lab_id", flat=True).first() if ticket.pc_id else None
+    publish_on_commit("ticket.status", {
+        "id": ticket.pk, "lab": lab_id, "pc": ticket.pc_id,
+        "status": ticket.status, "previous_status": previous_status,
+    }, lab=lab_id, owner=ticket.student_id)
+
+
+# -----------------------
+# STREAM
+# -----------------------
+def jwt_user(request):
+    """
+    The user of the access token in the Authorization header or in
+    ?access_token= (EventSource cannot set headers), or None.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header is not None else request.GET.get("access_token")
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def authenticate(request):
+    """The user making request, by access token or session, or None."""
+    user = await sync_to_async(jwt_user)(request)
+    if user is None:
+        user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def format_event(event):
+    data = json.dumps(event.data, separators=(",", ":"))
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+
+async def stream(labs, user, last_event_id=None):
+    """The text/event-stream of the events for labs that user may see, until the client leaves."""
+    subscriber = hub.subscribe(labs, user, settings.EVENTS_QUEUE_SIZE, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                # The queue overflowed: the client reconnects from the last event it got
+                return
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,270 @@
+"""
+Fast read path for the busiest list endpoints.
+
+FastListMixin lists values() rows instead of model instances and turns
+them into response dicts with a Plan compiled from the view's serializer,
+so DRF's per-row, per-field work (get_attribute, to_representation, one
+nested serializer per related row) is done once per request instead.
+Nested serializers are joined or fetched as labs.prefetching does for the
+serializer, so a page costs the same number of queries. The response is rendered with orjson when it is
+installed (FastJSONRenderer).
+
+The output is byte for byte what the serializer and JSONRenderer would
+produce; labs.tests compares the two. Serializers a plan cannot reproduce
+exactly (method fields, dotted sources, custom to_representation(),
+floats, ...) raise Unsupported while compiling and the view serializes
+them as usual, as it does everything with FAST_SERIALIZATION off.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField, RelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class Unsupported(Exception):
+    """The serializer renders something a Plan cannot reproduce exactly."""
+
+
+# DRF fields whose to_representation() returns database values unchanged
+PLAIN_FIELDS = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField, serializers.BooleanField)
+# Rendered by the JSON encoder in ways orjson does not match
+INEXACT_FIELDS = (serializers.FloatField, serializers.DecimalField)
+
+
+def iso_datetime(tz):
+    """DateTimeField.to_representation() for ISO 8601 output in tz."""
+    def convert(value):
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def iso_date(value):
+    return value.isoformat()
+
+
+def converter(field):
+    """Function turning a column value into field's representation, or None when it is the value itself."""
+    if type(field) in PLAIN_FIELDS:
+        return None
+    if isinstance(field, INEXACT_FIELDS):
+        raise Unsupported(f"{field.field_name}: {type(field).__name__}")
+    if type(field) is serializers.DateTimeField and not hasattr(field, 'timezone'):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        tz = field.default_timezone()
+        if isinstance(output_format, str) and output_format.lower() == ISO_8601 and tz is not None:
+            return iso_datetime(tz)
+    if type(field) is serializers.DateField:
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if isinstance(output_format, str) and output_format.lower() == ISO_8601:
+            return iso_date
+    return field.to_representation
+
+
+def getter(indices):
+    """itemgetter that always returns a tuple, for one or no indices too."""
+    if not indices:
+        return lambda values: ()
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda values: (values[index],)
+    return itemgetter(*indices)
+
+
+class Plan:
+    """
+    How to render values() rows of a model serializer: the columns to read,
+    the conversions to apply and the nested plans to fill in, compiled once
+    per request from serializer (an instance, so ?fields= narrowing applies).
+
+    Nested single serializers (reverse one-to-one, e.g. a PC's cpu) read
+    columns joined into the same values() query under prefix, as
+    select_related() would; nested many=True serializers (reverse foreign
+    keys) fetch their rows with one query, as a prefetch would.
+    """
+
+    def __init__(self, serializer, prefix=''):
+        if not isinstance(serializer, serializers.ModelSerializer):
+            raise Unsupported(f"{type(serializer).__name__} is not a model serializer")
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            raise Unsupported(f"{type(serializer).__name__} overrides to_representation()")
+        self.model = serializer.Meta.model
+        opts = self.model._meta
+        self.names = []
+        self.columns = []
+        self.converters = []
+        # (plan, attname of the foreign key on the nested model or None when joined)
+        self.nested = []
+        sources = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise Unsupported(f"{name}: source {field.source!r}")
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                raise Unsupported(f"{name}: no model field {field.source!r}")
+            self.names.append(name)
+
+            if isinstance(field, serializers.ListSerializer):
+                if not model_field.one_to_many or not model_field.field.target_field.primary_key:
+                    raise Unsupported(f"{name}: only reverse foreign keys are nested with many=True")
+                if type(field).to_representation is not serializers.ListSerializer.to_representation:
+                    raise Unsupported(f"{name}: {type(field).__name__} overrides to_representation()")
+                self.nested.append((Plan(field.child), model_field.field.attname))
+                sources.append(('nested', len(self.nested) - 1))
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                if not model_field.one_to_one or model_field.concrete:
+                    raise Unsupported(f"{name}: only reverse one-to-one relations are nested")
+                self.nested.append((Plan(field, f"{prefix}{model_field.name}__"), None))
+                sources.append(('nested', len(self.nested) - 1))
+                continue
+
+            if isinstance(field, RelatedField):
+                if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                    raise Unsupported(f"{name}: {type(field).__name__}")
+                convert = None
+            elif model_field.is_relation:
+                raise Unsupported(f"{name}: {type(field).__name__} on {model_field.name}")
+            else:
+                convert = converter(field)
+            if not model_field.concrete:
+                raise Unsupported(f"{name}: {model_field.name} is not a column")
+            if convert is not None:
+                self.converters.append((len(self.columns), convert))
+            sources.append(('column', len(self.columns)))
+            self.columns.append(prefix + model_field.attname)
+
+        # Nested rows are looked up by primary key, and a joined row without
+        # one is missing; neither needs to be rendered
+        self.key = prefix + opts.pk.attname
+        if (prefix or self.nested) and self.key not in self.columns:
+            self.columns.append(self.key)
+        self.order = getter([
+            index if kind == 'column' else len(self.columns) + index for kind, index in sources
+        ])
+
+    @property
+    def query_columns(self):
+        """values() lookups of the columns this plan and the plans joined into it read."""
+        columns = list(self.columns)
+        for plan, fk in self.nested:
+            if fk is None:
+                columns += plan.query_columns
+        return columns
+
+    def render(self, rows):
+        """Representations of rows (values() dicts with the query_columns), in their order."""
+        if not rows:
+            return []
+        nested = []
+        for plan, fk in self.nested:
+            if fk is None:
+                key = plan.key
+                nested.append([
+                    data if row[key] is not None else None for row, data in zip(rows, plan.render(rows))
+                ])
+            else:
+                nested.append(self.render_related(plan, fk, [row[self.key] for row in rows]))
+
+        read = getter(self.columns)
+        names = self.names
+        data = []
+        for n, row in enumerate(rows):
+            values = list(read(row))
+            for index, convert in self.converters:
+                if values[index] is not None:
+                    values[index] = convert(values[index])
+            for related in nested:
+                values.append(related[n])
+            data.append(dict(zip(names, self.order(values))))
+        return data
+
+    @staticmethod
+    def render_related(plan, fk, keys):
+        """For each key, the rendered rows of plan's model whose fk points at it."""
+        # The default manager, ordered as the prefetches of labs.prefetching are
+        queryset = plan.model._default_manager.filter(**{f"{fk}__in": {key for key in keys if key is not None}})
+        rows = list(queryset.values(*dict.fromkeys([*plan.query_columns, fk])))
+        groups = defaultdict(list)
+        for row, data in zip(rows, plan.render(rows)):
+            groups[row[fk]].append(data)
+        return [groups.get(key, []) for key in keys]
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer with orjson, producing the same bytes for the compact,
+    UTF-8 output DRF renders by default. Anything else (indented output for
+    the browsable API or ?indent=, ensure_ascii, values orjson refuses, no
+    orjson installed) goes to JSONRenderer. orjson writes floats in a form
+    of its own (1e20 for 1e+20), so this is only used for Plan output, which
+    has none.
+    """
+    # date, time and datetime go through DRF's encoder, which formats them its own way
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, for a strict javascript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def use_fast_renderer(request):
+    """Render the response to request with FastJSONRenderer if JSONRenderer was negotiated."""
+    if type(request.accepted_renderer) is JSONRenderer:
+        request.accepted_renderer = FastJSONRenderer()
+
+
+class FastListMixin:
+    """
+    For generic list views: list() renders with a Plan of get_serializer()
+    when FAST_SERIALIZATION is on and the serializer allows it. Works with
+    the views' filtering, ordering and pagination (page numbers or keysets).
+    """
+
+    def get_plan(self):
+        if not settings.FAST_SERIALIZATION:
+            return None
+        try:
+            return Plan(self.get_serializer())
+        except Unsupported:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        # The plan reads the columns and nested rows itself
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None).defer(None)
+        opts = queryset.model._meta
+        # Keyset pagination builds its cursors from the ordering fields
+        ordering = [opts.get_field(name.lstrip('-')).attname for name in getattr(self, 'cursor_ordering', ())]
+        rows = queryset.values(*dict.fromkeys([*plan.query_columns, *ordering]))
+
+        page = self.paginate_queryset(rows)
+        use_fast_renderer(request)
+        if page is not None:
+            return self.get_paginated_response(plan.render(list(page)))
+        return Response(plan.render(list(rows)))
@@ -1,7 +1,20 @@
+import json
+import numpy as np
 import pandas as pd
 import os
+from contextlib import nullcontext
 from datetime import datetime
-from django.db import transaction
+from functools import lru_cache
+from itertools import chain, islice
+from openpyxl import load_workbook
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.urls import reverse
+from django.utils import timezone
+from labs import inventory, response_cache, sync, workbooks
+from labs.ledger import cache_frames, cached_frames, file_hash, find_import, previous_import, record_import, recorded_result
 from labs.models import Lab, PC, LabEquipment, NetworkEquipmentDetails, ServerDetails, ProjectorDetails, ElectricalApplianceDetails
 
 
@@ -9,6 +22,112 @@ ALLOWED_EQUIPMENT_TYPES = [c[0] for c in LabEquipment.EQUIPMENT_TYPES]
 ALLOWED_CATEGORIES = [c[0] for c in LabEquipment.CATEGORY_CHOICES]
 ALLOWED_STATUS = [c[0] for c in LabEquipment.STATUS_CHOICES]
 NETWORK_TYPES = ('ROUTER', 'SWITCH', 'HUB', 'SERVER', 'E_BOARD')
+ELECTRICAL_TYPES = ('AC', 'FAN', 'LIGHT')
+TRUE_VALUES = ('yes', 'true', '1', 'y', 't')
+
+# Canonical column -> header aliases, in priority order. A row takes the
+# first alias that has a value.
+LAB_COLUMNS = {
+    "name": ("name", "lab_name", "labname"),
+    "location": ("location", "lab_location"),
+}
+
+PC_COLUMNS = {
+    "device_name": ("device_name", "name", "pc_name", "pc_name_comp_id"),
+    "product_id": ("product_id",),
+    "processor": ("processor",),
+    "ram": ("ram",),
+    "storage": ("storage",),
+    "status": ("status",),
+    "connected": ("connected",),
+    "gpu": ("gpu",),
+    "peripherals": ("peripherals",),
+    "brand": ("brand",),
+    "serial_number": ("serial_number", "serial"),
+}
+
+EQUIPMENT_COLUMNS = {
+    "equipment_code": ("equipment_code", "code", "eq_code"),
+    "name": ("name", "equipment_name", "eq_name"),
+    "category": ("category", "cat"),
+    "equipment_type": ("equipment_type", "type", "eq_type"),
+    "brand": ("brand",),
+    "model_name": ("model_name", "model"),
+    "quantity": ("quantity",),
+    "status": ("status",),
+    "is_networked": ("is_networked",),
+    "installation_date": ("installation_date",),
+    "location_in_lab": ("location_in_lab", "location"),
+    "remarks": ("remarks", "notes"),
+}
+
+# Subtable columns. Integer columns whose second alias is a separate
+# fallback column (e.g. number_of_ports / ports) are listed in DETAIL_INT_COLUMNS.
+DETAIL_COLUMNS = {
+    # NetworkEquipmentDetails
+    "ip_address": ("ip_address", "ip"),
+    "mac_address": ("mac_address", "mac"),
+    "firmware_version": ("firmware_version", "firmware"),
+    "managed_switch": ("managed_switch",),
+    "bandwidth_capacity": ("bandwidth_capacity", "bandwidth"),
+    "power_rating": ("power_rating", "power"),
+    # ServerDetails
+    "cpu_model": ("cpu_model", "cpu"),
+    "total_ram": ("total_ram", "ram"),
+    "total_storage": ("total_storage", "storage"),
+    "raid_config": ("raid_config", "raid"),
+    "virtualization_enabled": ("virtualization_enabled",),
+    "operating_system": ("operating_system", "os"),
+    # ProjectorDetails
+    "resolution": ("resolution",),
+    "throw_type": ("throw_type", "throw"),
+    # ElectricalApplianceDetails
+    "voltage": ("voltage",),
+    "inverter_type": ("inverter_type",),
+    "energy_rating": ("energy_rating", "energy_star"),
+    "service_due_date": ("service_due_date", "service_date"),
+}
+
+DETAIL_INT_COLUMNS = {
+    "number_of_ports": ("number_of_ports", "ports"),
+    "rack_unit_size": ("rack_unit_size", "rack_size"),
+    "brightness_lumens": ("brightness_lumens", "brightness"),
+    "hdmi_ports": ("hdmi_ports", "hdmi"),
+}
+
+DETAIL_BOOL_COLUMNS = ("managed_switch", "virtualization_enabled", "inverter_type")
+DETAIL_DATE_COLUMNS = ("service_due_date",)
+
+# (model, equipment types, columns of which one must be set, fields, error label)
+DETAIL_TABLES = (
+    (NetworkEquipmentDetails, NETWORK_TYPES, ("ip_address", "mac_address"),
+     ("ip_address", "mac_address", "firmware_version", "number_of_ports", "rack_unit_size",
+      "managed_switch", "bandwidth_capacity", "power_rating"), "NetworkDetails"),
+    (ServerDetails, ("SERVER",), ("cpu_model", "total_ram", "total_storage"),
+     ("cpu_model", "total_ram", "total_storage", "raid_config", "virtualization_enabled",
+      "operating_system"), "ServerDetails"),
+    (ProjectorDetails, ("PROJECTOR",), ("resolution", "brightness_lumens"),
+     ("resolution", "brightness_lumens", "throw_type", "hdmi_ports"), "ProjectorDetails"),
+    (ElectricalApplianceDetails, ELECTRICAL_TYPES, ("power_rating", "voltage"),
+     ("power_rating", "voltage", "inverter_type", "energy_rating", "service_due_date"), "ElectricalDetails"),
+)
+
+# Number of rows written per bulk_create statement
+DEFAULT_BATCH_SIZE = getattr(settings, 'IMPORT_BATCH_SIZE', 500)
+# Rows read from the file per chunk when streaming (None = whole file)
+DEFAULT_CHUNK_SIZE = getattr(settings, 'IMPORT_CHUNK_SIZE', None)
+
+# insert: rows whose key already exists are skipped
+# upsert: rows whose key already exists update the changed fields
+IMPORT_MODES = ("insert", "upsert")
+
+# Workbook imports: column naming each row's lab (else the sheet name is
+# used), and processes parsing sheets in parallel (None = one per CPU)
+SHEET_LAB_COLUMNS = {"lab": ("lab", "lab_name")}
+DEFAULT_WORKBOOK_WORKERS = getattr(settings, 'IMPORT_WORKBOOK_WORKERS', None)
+
+# Normalized rows returned by dry runs as a preview
+DRY_RUN_SAMPLE_SIZE = getattr(settings, 'IMPORT_DRY_RUN_SAMPLE_SIZE', 20)
 
 
 def load_dataframe(file):
@@ -25,13 +144,108 @@ def load_dataframe(file):
         raise ValueError(f"Error loading file: {e}")
 
 
-def get_val(row, *keys, default=None):
-    """Get value from row, handling NaN and None properly."""
-    for key in keys:
-        val = row.get(key)
-        if val is not None and not pd.isna(val):
-            return val
-    return default
+def iter_dataframes(file, chunk_size=None, content_hash=None):
+    """
+    Read the file as a sequence of normalized DataFrames (see read_dataframes).
+    With content_hash the frames are served from, or saved to, the parsed
+    file cache (see labs.ledger).
+    """
+    variant = f"{file_extension(file)}-rows-{chunk_size or 0}"
+    cached = cached_frames(content_hash, variant)
+    if cached is not None:
+        return cached
+    return cache_frames(read_dataframes(file, chunk_size), content_hash, variant)
+
+
+def file_extension(file):
+    return os.path.splitext(file.name)[1].lstrip(".").lower()
+
+
+def read_dataframes(file, chunk_size=None):
+    """
+    Read the file as a sequence of normalized DataFrames.
+
+    Without chunk_size the whole file is loaded at once (see load_dataframe).
+    With chunk_size, CSV is read through pandas' chunked reader and XLSX
+    through openpyxl's read-only row iterator, so at most chunk_size rows
+    are held in memory. The row index keeps counting across chunks so
+    "Row N" error messages still refer to the spreadsheet row.
+
+    The file is opened before returning so loading errors surface early.
+    """
+    if not chunk_size:
+        return iter([normalize_columns(load_dataframe(file))])
+
+    name = file.name.lower()
+    try:
+        if name.endswith(".csv"):
+            reader = pd.read_csv(file, on_bad_lines='skip', chunksize=chunk_size)
+            return (normalize_columns(df) for df in reader)
+        elif name.endswith(".xlsx"):
+            workbook = load_workbook(file, read_only=True, data_only=True)
+            return iter_worksheet(workbook, workbook.worksheets[0], chunk_size)
+        elif name.endswith(".xls"):
+            # Legacy .xls has no streaming reader; load it whole
+            return iter([normalize_columns(load_dataframe(file))])
+        else:
+            raise ValueError("Only CSV and XLSX files are supported.")
+    except Exception as e:
+        raise ValueError(f"Error loading file: {e}")
+
+
+def iter_worksheet(workbook, sheet, chunk_size):
+    """Yield DataFrames of chunk_size rows from a read-only openpyxl sheet."""
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(col) if col is not None else f"unnamed_{n}"
+            for n, col in enumerate(header)
+        ]
+        start = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield normalize_columns(pd.DataFrame(
+                chunk,
+                columns=columns,
+                index=pd.RangeIndex(start, start + len(chunk)),
+            ))
+            start += len(chunk)
+    finally:
+        workbook.close()
+
+
+def iter_sheets(file, workers=None, content_hash=None):
+    """
+    Yield (sheet_name, DataFrame) for every worksheet of an XLSX file,
+    parsed on a process pool (see labs.workbooks). CSV and .xls files are
+    read as a single sheet named after the file. content_hash enables the
+    parsed file cache like in iter_dataframes.
+    """
+    variant = f"{file_extension(file)}-sheets"
+    cached = cached_frames(content_hash, variant)
+    if cached is not None:
+        return cached
+    return cache_frames(read_sheets(file, workers), content_hash, variant)
+
+
+def read_sheets(file, workers=None):
+    name = file.name.lower()
+    try:
+        if name.endswith(".xlsx"):
+            content = file.read()
+            file.seek(0)
+            return workbooks.read_sheets(content, workbooks.sheet_names(content), workers)
+        sheet = os.path.splitext(os.path.basename(file.name))[0]
+        return iter([(sheet, load_dataframe(file))])
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error loading file: {e}")
 
 
 def parse_bool(val):
@@ -39,7 +253,7 @@ def parse_bool(val):
     if val is None or pd.isna(val):
         return False
     val_str = str(val).lower().strip()
-    return val_str in ('yes', 'true', '1', 'y', 't')
+    return val_str in TRUE_VALUES
 
 
 def parse_int(val, default=None):
@@ -52,10 +266,148 @@ def parse_int(val, default=None):
         return default
 
 
+# -----------------------
+# COLUMN OPERATIONS
+# -----------------------
+@lru_cache(maxsize=64)
+def map_header(columns, spec_items):
+    """Map each canonical column to the aliases present in the header."""
+    return {
+        canonical: [alias for alias in aliases if alias in columns]
+        for canonical, aliases in spec_items
+    }
+
+
+def resolve_columns(df, spec):
+    """
+    Build a frame with one column per canonical name in spec.
+    The header is mapped once (and cached across chunks); each canonical
+    column takes the first non-empty alias value per row. Columns missing
+    from the file come back empty.
+    """
+    df = df.loc[:, ~df.columns.duplicated()]
+    mapping = map_header(tuple(df.columns), tuple(spec.items()))
+    resolved = {}
+    for canonical, aliases in mapping.items():
+        if not aliases:
+            resolved[canonical] = pd.Series(None, index=df.index, dtype=object)
+            continue
+        column = df[aliases[0]]
+        for alias in aliases[1:]:
+            column = column.combine_first(df[alias])
+        resolved[canonical] = column
+    return pd.DataFrame(resolved, index=df.index)
+
+
+def provided_fields(df, spec, key):
+    """Canonical columns (other than key) that the file actually has."""
+    mapping = map_header(tuple(df.columns), tuple(spec.items()))
+    return [name for name, aliases in mapping.items() if aliases and name != key]
+
+
+def get_column(df, name):
+    """df[name], or an empty column when the file does not have it."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def clean_values(column):
+    """Object column with NaN/NaT replaced by None, ready for model fields."""
+    column = column.astype(object)
+    return column.where(column.notna(), None)
+
+
+def strip_text(column):
+    """str(...).strip() every value; missing values stay missing."""
+    column = column.astype(object)
+    return column.where(column.isna(), column.astype(str).str.strip())
+
+
+def is_blank(column):
+    """True where the value is missing or an empty string after stripping."""
+    return column.isna() | (strip_text(column) == "")
+
+
+def is_truthy(column):
+    """Python truthiness of each value; missing values are False."""
+    present = column.notna()
+    return present & column.astype(object).where(present, 0).astype(bool)
+
+
+def parse_bool_column(column):
+    """Column version of parse_bool."""
+    return column.notna() & column.astype(str).str.lower().str.strip().isin(TRUE_VALUES)
+
+
+def parse_int_column(column):
+    """
+    Column version of parse_int. Returns whole numbers as floats, NaN where
+    the value is missing or not a number; see int_values.
+    """
+    if column.dtype == object:
+        column = column.astype(str).str.strip()
+    numbers = pd.to_numeric(column, errors="coerce").astype(float)
+    return np.trunc(numbers.where(np.isfinite(numbers)))
+
+
+def int_values(column):
+    """Whole-number float column -> int/None values for model fields."""
+    return clean_values(column.astype("Int64"))
+
+
+def parse_date_column(column, errors, label=""):
+    """
+    Column version of DateField.to_python: dates, datetimes and YYYY-MM-DD
+    text (a time after it is ignored). Values that are not dates are
+    reported in errors here, before they can fail a batch write.
+    Returns: (dates with None where missing or invalid, where invalid)
+    """
+    text = strip_text(column)
+    dates = pd.to_datetime(text.str.split(r"[ T]", n=1, regex=True).str[0], errors="coerce", format="%Y-%m-%d")
+    invalid = ~is_blank(column) & dates.isna()
+    errors.extend(
+        f"Row {n}{label}: ValidationError: {column.name} '{value}' is not a YYYY-MM-DD date."
+        for n, value in zip(row_numbers(column.index[invalid]), text[invalid])
+    )
+    return clean_values(dates.dt.date), invalid
+
+
+def choice_column(column, allowed, default):
+    """Replace values outside allowed (and missing values) with default."""
+    return column.where(column.isin(allowed), default)
+
+
+def row_numbers(index):
+    """Spreadsheet row numbers for a frame index (header is row 1)."""
+    return [i + 2 for i in index]
+
+
+def drop_existing(frame, key, existing, result):
+    """
+    Drop rows whose key is already taken, in the database or earlier in the
+    file, and count them as skipped. The remaining keys are added to existing.
+    """
+    duplicate = frame[key].isin(existing) | frame[key].duplicated()
+    result["skipped"] += int(duplicate.sum())
+    frame = frame[~duplicate]
+    existing.update(frame[key])
+    return frame
+
+
+def build_instances(model, frame, **fields):
+    """(row_number, unsaved instance) pairs for every row of a prepared frame."""
+    return [
+        (row_no, model(**fields, **values))
+        for row_no, values in zip(row_numbers(frame.index), frame.to_dict("records"))
+    ]
+
+
 def normalize_columns(df):
     """Normalize column names to lowercase, replace spaces with underscores."""
     df.columns = (
         df.columns
+        .astype(str)
         .str.strip()
         .str.lower()
         .str.replace(" ", "_")
@@ -65,8 +417,11 @@ def normalize_columns(df):
     return df
 
 
-def get_or_create_lab(file_name=None, lab_name=None, lab_id=None):
-    """Helper to get or create a Lab for import."""
+def get_or_create_lab(file_name=None, lab_name=None, lab_id=None, create=True):
+    """
+    Helper to get or create a Lab for import.
+    With create=False (dry runs) a missing lab comes back unsaved.
+    """
     if lab_id:
         try:
             return Lab.objects.get(id=lab_id), None
@@ -74,8 +429,7 @@ def get_or_create_lab(file_name=None, lab_name=None, lab_id=None):
             return None, f"Lab with id {lab_id} not found"
     
     if lab_name:
-        lab, created = Lab.objects.get_or_create(name=lab_name)
-        return lab, None
+        return find_or_create_lab(lab_name, create), None
     
     # Auto-create lab from filename
     if file_name:
@@ -84,300 +438,862 @@ def get_or_create_lab(file_name=None, lab_name=None, lab_id=None):
     else:
         lab_name = f"Imported_Lab_{datetime.now().strftime('%Y%m%d')}"
     
-    lab, created = Lab.objects.get_or_create(name=lab_name)
-    return lab, None
+    return find_or_create_lab(lab_name, create), None
+
+
+def find_or_create_lab(name, create=True):
+    if create:
+        return Lab.objects.get_or_create(name=name)[0]
+    return Lab.objects.filter(name=name).first() or Lab(name=name)
+
+
+def bulk_create_rows(model, pending, errors, batch_size=DEFAULT_BATCH_SIZE, label=""):
+    """
+    Insert pending (row_number, instance) pairs with batched bulk_create.
+    If a batch fails it is split in halves until the failing rows are
+    isolated, so errors are still reported per row while the good rows keep
+    being inserted in bulk. Returns the pairs that were saved.
+    """
+    saved = []
+    for start in range(0, len(pending), batch_size):
+        create_batch(model, pending[start:start + batch_size], saved, errors, label)
+    return saved
+
+
+def create_batch(model, batch, saved, errors, label=""):
+    """
+    bulk_create batch inside a savepoint, bisecting it on failure.
+    Single rows go through bulk_create too, so no save signals are sent
+    and callers can book every saved row themselves.
+    """
+    if len(batch) == 1:
+        row_no, obj = batch[0]
+        obj.pk = None
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([obj])
+            saved.append((row_no, obj))
+        except Exception as e:
+            errors.append(f"Row {row_no}{label}: {type(e).__name__}: {e}")
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([obj for _, obj in batch])
+        saved.extend(batch)
+    except Exception:
+        for _, obj in batch:
+            obj.pk = None
+        middle = len(batch) // 2
+        create_batch(model, batch[:middle], saved, errors, label)
+        create_batch(model, batch[middle:], saved, errors, label)
+
+
+def check_instances(model, pending, errors, label=""):
+    """
+    Dry-run stand-in for bulk_create_rows: convert the non-text field values
+    the way saving would and report the rows that would fail.
+    Returns the pairs that would be saved.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key or field.is_relation or isinstance(field, (models.CharField, models.TextField)))
+    ]
+    valid = []
+    for row_no, obj in pending:
+        try:
+            for field in fields:
+                value = getattr(obj, field.attname)
+                if value is not None:
+                    field.to_python(value)
+        except ValidationError as e:
+            errors.append(f"Row {row_no}{label}: {type(e).__name__}: {e}")
+            continue
+        valid.append((row_no, obj))
+    return valid
+
+
+def create_rows(model, pending, errors, batch_size=DEFAULT_BATCH_SIZE, label="", dry_run=False):
+    """bulk_create_rows, or check_instances for dry runs."""
+    if dry_run:
+        return check_instances(model, pending, errors, label)
+    return bulk_create_rows(model, pending, errors, batch_size, label)
+
+
+def add_sample(result, frame):
+    """Add normalized rows to a dry run's preview until it is full."""
+    if "sample" not in result:
+        return
+    room = DRY_RUN_SAMPLE_SIZE - len(result["sample"])
+    if room <= 0 or frame.empty:
+        return
+    rows = frame.head(room)
+    records = json.loads(rows.to_json(orient="records", date_format="iso"))
+    result["sample"].extend(
+        {"row": row_no, **values} for row_no, values in zip(row_numbers(rows.index), records)
+    )
+
+
+def count_rows(file, all_sheets=False):
+    """
+    Estimate the number of data rows in the file without parsing it, for
+    progress reporting. XLSX files count the first sheet, or every sheet
+    with all_sheets. Returns None when the count is not available.
+    """
+    name = file.name.lower()
+    try:
+        if name.endswith(".csv"):
+            lines, last = 0, b"\n"
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                lines += block.count(b"\n")
+                last = block[-1:]
+            # A final line without a trailing newline still counts
+            if last != b"\n":
+                lines += 1
+            return max(lines - 1, 0)
+        elif name.endswith(".xlsx"):
+            workbook = load_workbook(file, read_only=True)
+            try:
+                sheets = workbook.worksheets if all_sheets else workbook.worksheets[:1]
+                max_rows = [sheet.max_row for sheet in sheets]
+            finally:
+                workbook.close()
+            if not max_rows or None in max_rows:
+                return None
+            return sum(max(max_row - 1, 0) for max_row in max_rows)
+        return None
+    finally:
+        file.seek(0)
+
+
+def import_transaction(commit_per_chunk):
+    """
+    All-or-nothing imports run inside one transaction; with commit_per_chunk
+    every chunk is committed on its own and earlier chunks survive a failure.
+    """
+    return nullcontext() if commit_per_chunk else transaction.atomic()
+
+
+def bulk_update_rows(model, pending, fields, errors, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write fields of pending (row_number, instance) pairs with batched
+    bulk_update, falling back to row-by-row saves like bulk_create_rows.
+    Returns the pairs that were saved.
+    """
+    saved = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_update([obj for _, obj in batch], fields, batch_size=batch_size)
+            saved.extend(batch)
+        except Exception:
+            for row_no, obj in batch:
+                try:
+                    with transaction.atomic():
+                        obj.save(update_fields=fields)
+                    saved.append((row_no, obj))
+                except Exception as e:
+                    errors.append(f"Row {row_no}: {type(e).__name__}: {e}")
+    return saved
+
+
+def update_existing(model, frame, key, current, fields, result, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Upsert step: diff the rows whose key is in current (key -> instance)
+    against those instances in memory. Only rows with real changes are
+    written, grouped so each bulk_update touches just the changed fields.
+    Dry runs only count them.
+    Returns the rows that still need to be created.
+    """
+    matched = frame[key].isin(current.keys())
+    model_fields = [model._meta.get_field(name) for name in fields]
+    groups = defaultdict(list)
+    now = timezone.now()
+
+    rows = frame.loc[matched, [key] + fields]
+    for row_no, values in zip(row_numbers(rows.index), rows.to_dict("records")):
+        obj = current[values[key]]
+        try:
+            incoming = {field.name: field.to_python(values[field.name]) for field in model_fields}
+        except ValidationError as e:
+            result["errors"].append(f"Row {row_no}: {type(e).__name__}: {e}")
+            continue
+
+        changed = tuple(name for name, value in incoming.items() if getattr(obj, name) != value)
+        if not changed:
+            result["unchanged"] += 1
+            continue
+        if dry_run:
+            result["updated"] += 1
+            continue
+        for name in changed:
+            setattr(obj, name, incoming[name])
+        # bulk_update does not apply auto_now
+        obj.updated_at = now
+        groups[changed].append((row_no, obj))
+
+    for changed, pending in groups.items():
+        saved = bulk_update_rows(model, pending, list(changed) + ["updated_at"], result["errors"], batch_size)
+        result["updated"] += len(saved)
+
+    return frame[~matched]
+
+
+def empty_result(lab=None, errors=None, dry_run=False):
+    """Counters every importer reports; dry runs also get a sample of rows."""
+    result = {
+        "lab": lab.name if lab else None,
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 0,
+        "errors": errors or [],
+    }
+    if dry_run:
+        result.update(dry_run=True, sample=[])
+    return result
+
+
+COUNTERS = ("created", "updated", "unchanged", "skipped")
+
+
+def merge_result(total, part, sheet=None):
+    """Add the counters of part to total, prefixing errors with the sheet name."""
+    for name in COUNTERS:
+        total[name] += part[name]
+    prefix = f"Sheet '{sheet}': " if sheet else ""
+    total["errors"].extend(prefix + error for error in part["errors"])
+    if "sample" in total:
+        room = max(DRY_RUN_SAMPLE_SIZE - len(total["sample"]), 0)
+        total["sample"].extend(dict(row, sheet=sheet) for row in part["sample"][:room])
+
+
+def load_lab_keys(model, key, lab, mode):
+    """
+    Keys already in the lab, loaded once per import.
+    Returns (existing, current). In insert mode existing holds the lab's keys
+    and current is None. In upsert mode current maps key -> instance so rows
+    can be diffed in memory, and existing only tracks keys seen earlier in
+    the file.
+    """
+    # An unsaved lab (dry run) has no rows yet
+    rows = model.objects.filter(lab=lab).order_by() if lab.pk else model.objects.none()
+    if mode == "upsert":
+        return set(), {getattr(obj, key): obj for obj in rows}
+    return set(rows.values_list(key, flat=True)), None
+
+
+def book_written_rows(model, lab, started):
+    """
+    bulk_create/bulk_update send no signals: once the chunk commits,
+    invalidate lab's cached responses and stamp the rows of model it wrote
+    (since started) again for delta sync (see labs.sync).
+    """
+    response_cache.bump_lab(lab.pk)
+    sync.restamp_on_commit(model.objects.filter(lab=lab, updated_at__range=(started, timezone.now())))
+
+
+def assign_equipment_ids(lab, saved):
+    """
+    bulk_create only sets primary keys on backends that support RETURNING
+    (SQLite, PostgreSQL). Fetch the missing ids by equipment_code otherwise.
+    """
+    missing = [obj for _, obj in saved if obj.pk is None]
+    if not missing:
+        return
+    codes = [obj.equipment_code for obj in missing]
+    ids = dict(
+        LabEquipment.objects.filter(lab=lab, equipment_code__in=codes)
+        .values_list("equipment_code", "id")
+    )
+    for obj in missing:
+        obj.pk = ids.get(obj.equipment_code)
 
 
 # -----------------------
 # LABS IMPORT
 # -----------------------
-@transaction.atomic
-def import_labs(file):
+def import_labs(file, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, commit_per_chunk=False,
+                progress=None, content_hash=None):
     """
     Import Labs from file.
     Expected columns: name, location
     Returns: (created_count, skipped_count, error_list)
     """
-    df = load_dataframe(file)
-    df = normalize_columns(df)
-    
-    created, skipped = 0, 0
-    errors = []
+    result = import_lab_file(file, batch_size, chunk_size, commit_per_chunk, progress, content_hash)
+    return result["created"], result["skipped"], result["errors"]
 
-    for i, row in df.iterrows():
-        try:
-            # Try multiple column names for lab name
-            lab_name = get_val(row, "name", "lab_name", "labname")
-            
-            if not lab_name or str(lab_name).strip() == '':
-                errors.append(f"Row {i+2}: Lab name is required")
-                continue
-            
-            lab_name = str(lab_name).strip()
-            
-            # Check for duplicates
-            if Lab.objects.filter(name=lab_name).exists():
-                skipped += 1
-                continue
 
-            # Location - optional
-            location = get_val(row, "location", "lab_location")
+def import_lab_file(file, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, commit_per_chunk=False,
+                    progress=None, content_hash=None, dry_run=False):
+    """import_labs returning the full result dict, with dry run support."""
+    chunks = iter_dataframes(file, chunk_size, content_hash)
+    result = empty_result(dry_run=dry_run)
 
-            Lab.objects.create(name=lab_name, location=location)
-            created += 1
+    with import_transaction(commit_per_chunk):
+        # Existing lab names are loaded once instead of queried per row
+        existing = set(Lab.objects.order_by().values_list("name", flat=True))
+
+        for df in chunks:
+            with transaction.atomic():
+                import_lab_rows(df, existing, result, batch_size, dry_run)
+            if progress:
+                progress(len(df), result)
+
+    return result
+
+
+def prepare_lab_frame(df, errors):
+    """
+    Resolve and normalize one chunk of lab rows with column operations.
+    Rows without a name are reported in errors and dropped.
+    """
+    cols = resolve_columns(df, LAB_COLUMNS)
+
+    missing = is_blank(cols["name"])
+    errors.extend(f"Row {n}: Lab name is required" for n in row_numbers(cols.index[missing]))
+    cols = cols[~missing]
+
+    return pd.DataFrame({
+        "name": strip_text(cols["name"]),
+        "location": clean_values(cols["location"]),
+    }, index=cols.index)
 
-        except Exception as e:
-            errors.append(f"Row {i+2}: {type(e).__name__}: {e}")
 
-    return created, skipped, errors
+def import_lab_rows(df, existing, result, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """Validate one chunk of lab rows and bulk insert the new ones."""
+    frame = prepare_lab_frame(df, result["errors"])
+    frame = drop_existing(frame, "name", existing, result)
+    add_sample(result, frame)
+    pending = build_instances(Lab, frame)
+    created = create_rows(Lab, pending, result["errors"], batch_size, dry_run=dry_run)
+    if created and not dry_run:
+        # bulk_create sends no signals
+        response_cache.bump_all()
+    result["created"] += len(created)
 
 
 # -----------------------
 # PCS IMPORT
 # -----------------------
-@transaction.atomic
-def import_pcs(file, lab_id=None):
+def import_pcs(file, lab_id=None, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, commit_per_chunk=False,
+               mode="insert", progress=None, content_hash=None, dry_run=False):
     """
     Import PCs from file.
     Expected columns: device_name (or name, pc_name), status, brand, etc.
-    Returns: dict with lab, created, skipped, errors
+    mode="upsert" updates PCs that already exist instead of skipping them.
+    dry_run=True validates the file and counts what would change without
+    writing anything; the result then includes a sample of normalized rows.
+    Returns: dict with lab, created, updated, unchanged, skipped, errors
     """
-    df = load_dataframe(file)
-    df = normalize_columns(df)
-    
-    # Get or create lab
-    file_name = getattr(file, 'name', None)
-    lab, error = get_or_create_lab(file_name=file_name, lab_id=lab_id)
-    if error:
-        return {"lab": None, "created": 0, "skipped": 0, "errors": [error]}
-    
-    created, skipped = 0, 0
-    errors = []
+    chunks = iter_dataframes(file, chunk_size, content_hash)
 
-    for i, row in df.iterrows():
-        try:
-            # Try multiple column names for PC name
-            device_name = get_val(row, "device_name", "name", "pc_name", "pc_name_comp_id")
-            
-            if not device_name or str(device_name).strip() == '':
-                errors.append(f"Row {i+2}: PC device name is required")
-                continue
-            
-            device_name = str(device_name).strip()
-            
-            # Check for duplicates in same lab
-            if PC.objects.filter(lab=lab, device_name=device_name).exists():
-                skipped += 1
-                continue
-            
-            # Status - default to working
-            status = get_val(row, "status", default="working")
-            if status and status not in ALLOWED_STATUS:
-                status = "working"
-            
-            connected = parse_bool(row.get("connected"))
-            gpu = parse_bool(row.get("gpu"))
-            peripherals = parse_bool(row.get("peripherals"))
-
-            PC.objects.create(
-                lab=lab,
-                device_name=device_name,
-                product_id=get_val(row, "product_id"),
-                processor=get_val(row, "processor"),
-                ram=get_val(row, "ram"),
-                storage=get_val(row, "storage"),
-                status=status,
-                connected=connected,
-                gpu=gpu,
-                peripherals=peripherals,
-                brand=get_val(row, "brand"),
-                serial_number=get_val(row, "serial_number", "serial")
-            )
-            created += 1
+    with import_transaction(commit_per_chunk):
+        # Get or create lab
+        file_name = getattr(file, 'name', None)
+        lab, error = get_or_create_lab(file_name=file_name, lab_id=lab_id, create=not dry_run)
+        if error:
+            return empty_result(errors=[error])
 
-        except Exception as e:
-            errors.append(f"Row {i+2}: {type(e).__name__}: {e}")
+        result = empty_result(lab, dry_run=dry_run)
 
-    return {
-        "lab": lab.name if lab else None,
-        "created": created,
-        "skipped": skipped,
-        "errors": errors
-    }
+        existing, current = load_lab_keys(PC, "device_name", lab, mode)
+
+        for df in chunks:
+            with transaction.atomic():
+                import_pc_rows(df, lab, existing, result, batch_size, current, dry_run)
+            if progress:
+                progress(len(df), result)
+
+    return result
+
+
+def prepare_pc_frame(df, errors):
+    """
+    Resolve and normalize one chunk of PC rows with column operations.
+    Rows without a device name are reported in errors and dropped.
+    """
+    cols = resolve_columns(df, PC_COLUMNS)
+
+    missing = is_blank(cols["device_name"])
+    errors.extend(f"Row {n}: PC device name is required" for n in row_numbers(cols.index[missing]))
+    cols = cols[~missing]
+
+    frame = pd.DataFrame({
+        "device_name": strip_text(cols["device_name"]),
+        # Status - default to working
+        "status": choice_column(cols["status"], ALLOWED_STATUS, "working"),
+    }, index=cols.index)
+    for name in ("connected", "gpu", "peripherals"):
+        frame[name] = parse_bool_column(cols[name])
+    for name in ("product_id", "processor", "ram", "storage", "brand", "serial_number"):
+        frame[name] = clean_values(cols[name])
+    return frame
+
+
+def import_pc_rows(df, lab, existing, result, batch_size=DEFAULT_BATCH_SIZE, current=None, dry_run=False):
+    """
+    Validate one chunk of PC rows and bulk insert the new ones.
+    With current (upsert mode), PCs that already exist are updated instead.
+    """
+    started = timezone.now()
+    frame = prepare_pc_frame(df, result["errors"])
+    frame = drop_existing(frame, "device_name", existing, result)
+    add_sample(result, frame)
+    if current is not None:
+        fields = provided_fields(df, PC_COLUMNS, "device_name")
+        frame = update_existing(PC, frame, "device_name", current, fields, result, batch_size, dry_run)
+    pending = build_instances(PC, frame, lab=lab)
+    result["created"] += len(create_rows(PC, pending, result["errors"], batch_size, dry_run=dry_run))
+    if not dry_run:
+        book_written_rows(PC, lab, started)
 
 
 # -----------------------
 # LAB EQUIPMENT IMPORT
 # -----------------------
-@transaction.atomic
-def import_lab_equipment(file, lab_id=None):
+def import_lab_equipment(file, lab_id=None, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, commit_per_chunk=False,
+                         mode="insert", progress=None, content_hash=None, dry_run=False):
     """
     Import LabEquipment from file.
     Expected columns: equipment_code, name, equipment_type, category, quantity, status, etc.
     Optional subtable columns: ip_address, mac_address, cpu_model, etc.
-    Returns: (created_count, skipped_count, error_list)
+    mode="upsert" updates equipment that already exists instead of skipping it
+    (detail subtables are only created for new equipment).
+    dry_run=True validates without writing, like in import_pcs.
+    Returns: dict with lab, created, updated, unchanged, skipped, errors
     """
-    df = load_dataframe(file)
-    df = normalize_columns(df)
-    
-    # Get or create lab
-    file_name = getattr(file, 'name', None)
-    lab, error = get_or_create_lab(file_name=file_name, lab_id=lab_id)
-    if error:
-        return {"lab": None, "created": 0, "skipped": 0, "errors": [error]}
-    
-    created, skipped = 0, 0
-    errors = []
+    chunks = iter_dataframes(file, chunk_size, content_hash)
 
-    for i, row in df.iterrows():
-        try:
-            # Equipment code - try multiple column names
-            equipment_code = get_val(row, "equipment_code", "code", "eq_code")
-            
-            # Generate code if missing
-            if not equipment_code or str(equipment_code).strip() == '':
-                equipment_code = f"EQ-{lab.id}-{i+1:04d}"
-            else:
-                equipment_code = str(equipment_code).strip()
-            
-            # Name - fallback to code
-            name = get_val(row, "name", "equipment_name", "eq_name") or equipment_code
-            name = str(name).strip()
-            
-            # Category - default to INFRASTRUCTURE
-            category = get_val(row, "category", "cat") or "INFRASTRUCTURE"
-            if category not in ALLOWED_CATEGORIES:
-                category = "INFRASTRUCTURE"
-            
-            # Equipment type - default to OTHER
-            eq_type_raw = get_val(row, "equipment_type", "type", "eq_type")
-            if eq_type_raw is not None:
-                eq_type = str(eq_type_raw).strip().upper()
-            else:
-                eq_type = "OTHER"
-            if eq_type not in ALLOWED_EQUIPMENT_TYPES:
-                errors.append(f"Row {i+2}: Invalid equipment_type '{eq_type}', defaulting to OTHER")
-                eq_type = "OTHER"
-            
-            # Status - default to working
-            status = get_val(row, "status", default="working")
-            if status and status not in ALLOWED_STATUS:
-                status = "working"
-            
-            # Quantity
-            quantity = parse_int(row.get("quantity"), default=1)
-            if quantity < 1:
-                quantity = 1
-            
-            is_networked = parse_bool(row.get("is_networked"))
-            
-            # Check for duplicate in same lab
-            if LabEquipment.objects.filter(lab=lab, equipment_code=equipment_code).exists():
-                skipped += 1
+    with import_transaction(commit_per_chunk):
+        # Get or create lab
+        file_name = getattr(file, 'name', None)
+        lab, error = get_or_create_lab(file_name=file_name, lab_id=lab_id, create=not dry_run)
+        if error:
+            return empty_result(errors=[error])
+
+        result = empty_result(lab, dry_run=dry_run)
+
+        existing, current = load_lab_keys(LabEquipment, "equipment_code", lab, mode)
+
+        for df in chunks:
+            with transaction.atomic():
+                import_equipment_rows(df, lab, existing, result, batch_size, current, dry_run)
+            if progress:
+                progress(len(df), result)
+
+    return result
+
+
+def new_equipment_codes(lab, taken, count):
+    """
+    count codes EQ-<lab id>-NNNN numbered on from the highest such code in
+    taken, so they are unique in the lab across chunks, sheets and imports.
+    A lab not saved yet (dry run) gets EQ-NEW-NNNN.
+    """
+    prefix = f"EQ-{lab.pk or 'NEW'}-"
+    numbers = (code[len(prefix):] for code in taken if code.startswith(prefix))
+    last = max((int(number) for number in numbers if number.isdigit()), default=0)
+    return [f"{prefix}{last + n:04d}" for n in range(1, count + 1)]
+
+
+def prepare_equipment_frame(df, lab, errors, taken=()):
+    """
+    Resolve and normalize one chunk of equipment rows with column operations.
+    Invalid equipment types are reported in errors and replaced with OTHER.
+    Missing codes are generated past the codes in taken (see new_equipment_codes).
+    Rows with an invalid installation_date are reported in errors and dropped.
+    """
+    cols = resolve_columns(df, EQUIPMENT_COLUMNS)
+
+    # Equipment code - generated when missing
+    code = strip_text(cols["equipment_code"])
+    missing = is_blank(cols["equipment_code"])
+    if missing.any():
+        code[missing] = new_equipment_codes(lab, chain(taken, code[~missing]), int(missing.sum()))
+
+    # Equipment type - default to OTHER
+    eq_type = strip_text(cols["equipment_type"]).str.upper().fillna("OTHER")
+    invalid = ~eq_type.isin(ALLOWED_EQUIPMENT_TYPES)
+    errors.extend(
+        f"Row {n}: Invalid equipment_type '{t}', defaulting to OTHER"
+        for n, t in zip(row_numbers(cols.index[invalid]), eq_type[invalid])
+    )
+
+    # Quantity - at least 1
+    quantity = parse_int_column(cols["quantity"]).fillna(1)
+
+    frame = pd.DataFrame({
+        "equipment_code": code,
+        # Name - fallback to code
+        "name": strip_text(cols["name"]).where(is_truthy(cols["name"]), code),
+        "category": choice_column(cols["category"], ALLOWED_CATEGORIES, "INFRASTRUCTURE"),
+        "equipment_type": choice_column(eq_type, ALLOWED_EQUIPMENT_TYPES, "OTHER"),
+        "quantity": int_values(quantity.where(quantity >= 1, 1)),
+        "status": choice_column(cols["status"], ALLOWED_STATUS, "working"),
+        "is_networked": parse_bool_column(cols["is_networked"]),
+    }, index=cols.index)
+    for name in ("brand", "model_name", "location_in_lab", "remarks"):
+        frame[name] = clean_values(cols[name])
+    frame["installation_date"], invalid = parse_date_column(cols["installation_date"], errors)
+    return frame[~invalid]
+
+
+def prepare_detail_frame(df):
+    """Resolve and normalize the subtable columns of equipment rows."""
+    cols = resolve_columns(df, DETAIL_COLUMNS)
+    frame = pd.DataFrame({name: clean_values(cols[name]) for name in cols.columns}, index=cols.index)
+    for name in DETAIL_BOOL_COLUMNS:
+        frame[name] = parse_bool_column(cols[name])
+    # parse_int(a) or parse_int(b): a zero in the first column falls through
+    for name, (column, fallback) in DETAIL_INT_COLUMNS.items():
+        first = parse_int_column(get_column(df, column))
+        second = parse_int_column(get_column(df, fallback))
+        frame[name] = int_values(first.where(first.fillna(0) != 0, second))
+    return frame
+
+
+def build_detail_rows(df, frame, errors):
+    """
+    Collect the subtable rows each equipment row should get. Rows with an
+    invalid date are reported in errors and left out.
+    Returns: equipment_code -> [(model, allowed equipment types, field values, error label)]
+    """
+    details = {}
+    if frame.empty:
+        return details
+
+    cols = prepare_detail_frame(df.loc[frame.index])
+    for model, types, required, fields, label in DETAIL_TABLES:
+        wanted = frame["equipment_type"].isin(types)
+        has_values = pd.concat([is_truthy(cols[name]) for name in required], axis=1).any(axis=1)
+        rows = cols.loc[wanted & has_values, list(fields)]
+        for name in DETAIL_DATE_COLUMNS:
+            if name in fields:
+                dates, invalid = parse_date_column(rows[name], errors, f" ({label})")
+                rows = rows.assign(**{name: dates})[~invalid]
+        for code, values in zip(frame.loc[rows.index, "equipment_code"], rows.to_dict("records")):
+            details.setdefault(code, []).append((model, types, values, label))
+    return details
+
+
+def import_equipment_rows(df, lab, existing, result, batch_size=DEFAULT_BATCH_SIZE, current=None, dry_run=False):
+    """
+    Validate one chunk of equipment rows, bulk insert them and add their subtables.
+    With current (upsert mode), equipment that already exists is updated instead.
+    """
+    started = timezone.now()
+    errors = result["errors"]
+    # Codes stored in the lab (current in upsert mode) or used earlier in the import
+    frame = prepare_equipment_frame(df, lab, errors, chain(existing, current or ()))
+    frame = drop_existing(frame, "equipment_code", existing, result)
+    add_sample(result, frame)
+    updated_before = result["updated"]
+    if current is not None:
+        fields = provided_fields(df, EQUIPMENT_COLUMNS, "equipment_code")
+        frame = update_existing(LabEquipment, frame, "equipment_code", current, fields, result, batch_size, dry_run)
+    details = build_detail_rows(df, frame, errors)
+
+    pending = build_instances(LabEquipment, frame, lab=lab)
+    saved = create_rows(LabEquipment, pending, errors, batch_size, dry_run=dry_run)
+    if not dry_run:
+        assign_equipment_ids(lab, saved)
+        # bulk_create/bulk_update send no signals; keep InventorySummary current here
+        if result["updated"] > updated_before:
+            inventory.refresh_labs([lab.id])
+        else:
+            inventory.add_equipment(obj for _, obj in saved)
+        book_written_rows(LabEquipment, lab, started)
+
+    # ----- SUBTABLES CREATION -----
+    # Collected for the whole chunk and bulk inserted per table once the
+    # parent rows have ids. bulk_create skips the models' save()/clean(),
+    # so the equipment type check they do is made here, in memory.
+    pending_details = defaultdict(list)
+    for row_no, lab_equipment in saved:
+        for model, types, values, label in details.get(lab_equipment.equipment_code, ()):
+            if lab_equipment.equipment_type not in types:
+                errors.append(
+                    f"Row {row_no} ({label}): ValidationError: {model.__name__} can only be "
+                    f"attached to {', '.join(types)} type equipment."
+                )
                 continue
-            
-            # Create LabEquipment
-            lab_equipment = LabEquipment.objects.create(
-                lab=lab,
-                equipment_code=equipment_code,
-                name=name,
-                category=category,
-                equipment_type=eq_type,
-                brand=get_val(row, "brand"),
-                model_name=get_val(row, "model_name", "model"),
-                quantity=quantity,
-                status=status,
-                is_networked=is_networked,
-                installation_date=get_val(row, "installation_date"),
-                location_in_lab=get_val(row, "location_in_lab", "location"),
-                remarks=get_val(row, "remarks", "notes"),
-            )
-            created += 1
-            
-            # ----- SUBTABLES CREATION -----
-            
-            # NetworkEquipmentDetails (for ROUTER, SWITCH, HUB, SERVER, E_BOARD)
-            if eq_type in NETWORK_TYPES:
-                ip_address = get_val(row, "ip_address", "ip")
-                mac_address = get_val(row, "mac_address", "mac")
-                
-                if ip_address or mac_address:
-                    try:
-                        NetworkEquipmentDetails.objects.create(
-                            equipment=lab_equipment,
-                            ip_address=ip_address,
-                            mac_address=mac_address,
-                            firmware_version=get_val(row, "firmware_version", "firmware"),
-                            number_of_ports=parse_int(row.get("number_of_ports")) or parse_int(row.get("ports")),
-                            rack_unit_size=parse_int(row.get("rack_unit_size")) or parse_int(row.get("rack_size")),
-                            managed_switch=parse_bool(row.get("managed_switch")),
-                            bandwidth_capacity=get_val(row, "bandwidth_capacity", "bandwidth"),
-                            power_rating=get_val(row, "power_rating", "power")
-                        )
-                    except Exception as e:
-                        errors.append(f"Row {i+2} (NetworkDetails): {type(e).__name__}: {e}")
-            
-            # ServerDetails (for SERVER only)
-            if eq_type == "SERVER":
-                cpu_model = get_val(row, "cpu_model", "cpu")
-                total_ram = get_val(row, "total_ram", "ram")
-                total_storage = get_val(row, "total_storage", "storage")
-                
-                if cpu_model or total_ram or total_storage:
-                    try:
-                        ServerDetails.objects.create(
-                            equipment=lab_equipment,
-                            cpu_model=cpu_model,
-                            total_ram=total_ram,
-                            total_storage=total_storage,
-                            raid_config=get_val(row, "raid_config", "raid"),
-                            virtualization_enabled=parse_bool(row.get("virtualization_enabled")),
-                            operating_system=get_val(row, "operating_system", "os")
-                        )
-                    except Exception as e:
-                        errors.append(f"Row {i+2} (ServerDetails): {type(e).__name__}: {e}")
-            
-            # ProjectorDetails (for PROJECTOR)
-            if eq_type == "PROJECTOR":
-                resolution = get_val(row, "resolution")
-                brightness_lumens = parse_int(row.get("brightness_lumens")) or parse_int(row.get("brightness"))
-                
-                if resolution or brightness_lumens:
-                    try:
-                        ProjectorDetails.objects.create(
-                            equipment=lab_equipment,
-                            resolution=resolution,
-                            brightness_lumens=brightness_lumens,
-                            throw_type=get_val(row, "throw_type", "throw"),
-                            hdmi_ports=parse_int(row.get("hdmi_ports")) or parse_int(row.get("hdmi"))
-                        )
-                    except Exception as e:
-                        errors.append(f"Row {i+2} (ProjectorDetails): {type(e).__name__}: {e}")
-            
-            # ElectricalApplianceDetails (for AC, FAN, LIGHT)
-            if eq_type in ('AC', 'FAN', 'LIGHT'):
-                power_rating = get_val(row, "power_rating", "power")
-                voltage = get_val(row, "voltage")
-                
-                if power_rating or voltage:
-                    try:
-                        ElectricalApplianceDetails.objects.create(
-                            equipment=lab_equipment,
-                            power_rating=power_rating,
-                            voltage=voltage,
-                            inverter_type=parse_bool(row.get("inverter_type")),
-                            energy_rating=get_val(row, "energy_rating", "energy_star"),
-                            service_due_date=get_val(row, "service_due_date", "service_date")
-                        )
-                    except Exception as e:
-                        errors.append(f"Row {i+2} (ElectricalDetails): {type(e).__name__}: {e}")
+            pending_details[model, label].append((row_no, model(equipment=lab_equipment, **values)))
 
-        except Exception as e:
-            errors.append(f"Row {i+2}: {type(e).__name__}: {e}")
+    for (model, label), pending in pending_details.items():
+        create_rows(model, pending, errors, batch_size, label=f" ({label})", dry_run=dry_run)
 
-    return {
-        "lab": lab.name if lab else None,
-        "created": created,
-        "skipped": skipped,
-        "errors": errors
+    result["created"] += len(saved)
+
+
+# -----------------------
+# WORKBOOK IMPORT
+# -----------------------
+# entity -> (model, key column, chunk importer)
+ROW_IMPORTERS = {
+    "pcs": (PC, "device_name", import_pc_rows),
+    "lab-equipment": (LabEquipment, "equipment_code", import_equipment_rows),
+}
+
+
+def import_workbook(file, entity, lab_id=None, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                    commit_per_chunk=False, mode="insert", progress=None, workers=DEFAULT_WORKBOOK_WORKERS,
+                    content_hash=None, dry_run=False):
+    """
+    Import every sheet of a workbook (a CSV counts as one sheet).
+    For pcs and lab-equipment each row goes to the lab named in its lab
+    column, else to the lab named after its sheet; lab_id sends every row
+    to that lab instead. Missing labs are created.
+    Sheets are parsed on `workers` processes while this process does all
+    database writes, one sheet at a time. chunk_size splits each sheet
+    into chunks, which commit_per_chunk commits separately. dry_run=True
+    validates without writing (missing labs are not created either).
+    Returns: dict with created, updated, unchanged, skipped, errors, and
+    those counters per lab under "labs"
+    """
+    sheets = iter_sheets(file, workers, content_hash)
+    result = empty_result(dry_run=dry_run)
+
+    with import_transaction(commit_per_chunk):
+        if entity == "labs":
+            names = set(Lab.objects.order_by().values_list("name", flat=True))
+        else:
+            model, key, import_rows = ROW_IMPORTERS[entity]
+            fixed_lab = None
+            if lab_id:
+                fixed_lab, error = get_or_create_lab(lab_id=lab_id)
+                if error:
+                    return empty_result(errors=[error])
+            # Lab cache (name -> Lab) and each lab's keys by name, loaded on first use
+            labs = {lab.name: lab for lab in Lab.objects.order_by()}
+            lab_keys = {}
+            result["labs"] = {}
+
+        for sheet, df in sheets:
+            df = normalize_columns(df)
+            size = chunk_size or len(df) or 1
+            for start in range(0, len(df), size):
+                chunk = df.iloc[start:start + size]
+                with transaction.atomic():
+                    if entity == "labs":
+                        part = empty_result(dry_run=dry_run)
+                        import_lab_rows(chunk, names, part, batch_size, dry_run)
+                        merge_result(result, part, sheet)
+                        continue
+                    for lab, rows in group_by_lab(chunk, sheet, labs, fixed_lab, create=not dry_run):
+                        if lab.name not in lab_keys:
+                            lab_keys[lab.name] = load_lab_keys(model, key, lab, mode)
+                        existing, current = lab_keys[lab.name]
+                        part = empty_result(lab, dry_run=dry_run)
+                        import_rows(rows, lab, existing, part, batch_size, current, dry_run)
+                        merge_result(result, part, sheet)
+                        counts = result["labs"].setdefault(lab.name, dict.fromkeys(COUNTERS, 0))
+                        for name in COUNTERS:
+                            counts[name] += part[name]
+                if progress:
+                    progress(len(chunk), result)
+
+    return result
+
+
+def group_by_lab(df, sheet, labs, lab=None, create=True):
+    """
+    Split rows by target lab: the lab column where it is set, else the
+    sheet name (or lab for every row when given). labs is the name -> Lab
+    cache; labs that do not exist yet are created (unsaved without create)
+    and cached.
+    Returns: [(lab, rows)]
+    """
+    if lab is not None:
+        return [(lab, df)]
+
+    names = strip_text(resolve_columns(df, SHEET_LAB_COLUMNS)["lab"])
+    names = names.where(~is_blank(names), sheet)
+    groups = []
+    for name, rows in df.groupby(names, sort=False):
+        if name not in labs:
+            labs[name] = find_or_create_lab(name, create)
+        groups.append((labs[name], rows))
+    return groups
+
+
+# -----------------------
+# ENTRY POINT HELPERS
+# -----------------------
+IMPORT_ENTITIES = ("labs", "pcs", "lab-equipment")
+
+
+def import_options(data):
+    """
+    Read the optional import settings from request data.
+      - chunk_size: rows read per chunk; enables streaming for large files
+      - commit_per_chunk: commit each chunk separately instead of all-or-nothing
+      - mode: insert (default) or upsert
+      - workbook: import every sheet, each into its own lab
+      - workers: processes parsing workbook sheets
+      - force: import again even if identical content was imported before
+      - dry_run: validate and count without writing anything
+    Raises ValueError for an invalid chunk_size, workers or mode.
+    """
+    options = {}
+
+    mode = data.get("mode")
+    if mode not in (None, ""):
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(IMPORT_MODES)}.")
+        options["mode"] = mode
+
+    if data.get("commit_per_chunk") not in (None, ""):
+        options["commit_per_chunk"] = parse_bool(data.get("commit_per_chunk"))
+
+    chunk_size = data.get("chunk_size")
+    if chunk_size not in (None, ""):
+        chunk_size = parse_int(chunk_size)
+        if not chunk_size or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer.")
+        options["chunk_size"] = chunk_size
+
+    if data.get("workbook") not in (None, ""):
+        options["workbook"] = parse_bool(data.get("workbook"))
+
+    if data.get("dry_run") not in (None, ""):
+        options["dry_run"] = parse_bool(data.get("dry_run"))
+
+    if data.get("force") not in (None, ""):
+        options["force"] = parse_bool(data.get("force"))
+
+    workers = data.get("workers")
+    if workers not in (None, ""):
+        workers = parse_int(workers)
+        if not workers or workers < 1:
+            raise ValueError("workers must be a positive integer.")
+        options["workers"] = workers
+
+    return options
+
+
+def import_failed(entity, result):
+    """Single-lab imports report no lab when the lab lookup failed."""
+    return result["lab"] is None and entity != "labs" and "labs" not in result
+
+
+def run_import(entity, file, lab_id=None, force=False, user=None, content_hash=None, **options):
+    """
+    Run the importer for entity.
+    options are passed through to the importer (batch_size, chunk_size,
+    commit_per_chunk, and progress: a callable(rows_in_chunk, result)
+    invoked after every chunk). workbook=True runs import_workbook.
+    Content already imported for the same entity, lab and mode returns the
+    recorded result (duplicate=True) unless force is set; other imports are
+    recorded in the ledger (see labs.ledger). Dry runs bypass the ledger.
+    content_hash is the file_hash() of file, when the caller has it already.
+    Returns: dict with lab, created, updated, unchanged, skipped, errors,
+    duplicate, import_id (and dry_run, sample for dry runs)
+    """
+    if entity not in IMPORT_ENTITIES:
+        raise ValueError(f"Invalid entity. Use {' | '.join(IMPORT_ENTITIES)}.")
+    if entity == "labs" and options.get("mode", "insert") != "insert":
+        raise ValueError("Upsert mode is only supported for pcs and lab-equipment.")
+
+    mode = options.get("mode", "insert")
+    workbook = bool(options.get("workbook"))
+    dry_run = bool(options.get("dry_run"))
+    content_hash = content_hash or file_hash(file)
+    if not (force or dry_run):
+        record = find_import(content_hash, entity, lab_id, mode, workbook)
+        if record:
+            return recorded_result(record)
+
+    result = dispatch_import(entity, file, lab_id, content_hash=content_hash, **options)
+    import_id = None
+    if not (dry_run or import_failed(entity, result)):
+        import_id = record_import(content_hash, file, entity, result, lab_id, mode, workbook, user).id
+    result.update(duplicate=False, import_id=import_id)
+    return result
+
+
+def dispatch_import(entity, file, lab_id=None, **options):
+    workers = options.pop("workers", DEFAULT_WORKBOOK_WORKERS)
+    if options.pop("workbook", False):
+        return import_workbook(file, entity, lab_id=lab_id, workers=workers, **options)
+
+    if entity == "labs":
+        options.pop("mode", None)
+        return import_lab_file(file, **options)
+    if entity == "pcs":
+        return import_pcs(file, lab_id=lab_id, **options)
+    return import_lab_equipment(file, lab_id=lab_id, **options)
+
+
+def handle_import_request(data, files, user=None):
+    """
+    Answer an import upload (POST /api/import/ and /api/labs/import/): data
+    holds the form fields (entity, lab_id, background and the
+    import_options()), files the uploaded "file". An identical file imported
+    before returns its recorded result; background=true queues an ImportJob.
+    Returns (response body, HTTP status).
+    """
+    # labs.jobs imports this module
+    from labs.jobs import enqueue_import
+
+    file = files.get("file")
+    entity = data.get("entity")
+    if not file or not entity:
+        return {"detail": "Both 'file' and 'entity' are required."}, 400
+    if entity not in IMPORT_ENTITIES:
+        return {"detail": f"Invalid entity. Use {' | '.join(IMPORT_ENTITIES)}."}, 400
+    try:
+        options = import_options(data)
+    except ValueError as e:
+        return {"detail": str(e)}, 400
+    lab_id = data.get("lab_id")
+    if lab_id in (None, ""):
+        lab_id = None
+    elif not str(lab_id).strip().isdigit():
+        return {"detail": "lab_id must be an integer"}, 400
+    else:
+        lab_id = int(lab_id)
+
+    # Hashed once, for the ledger lookup here and in run_import()
+    content_hash = file_hash(file)
+    previous = previous_import(content_hash, entity, lab_id=lab_id, options=options)
+
+    # Dry runs are quick enough to always run inline
+    if previous is None and not options.get("dry_run") and parse_bool(data.get("background")):
+        try:
+            job = enqueue_import(file, entity, lab_id=lab_id, options=options, user=user)
+        except ValueError as e:
+            return {"detail": str(e)}, 400
+        return {
+            "status": job.status,
+            "entity": entity,
+            "job_id": job.id,
+            "status_url": reverse("import-job-detail", args=[job.id]),
+        }, 202
+
+    try:
+        result = previous or run_import(entity, file, lab_id=lab_id, user=user, content_hash=content_hash, **options)
+    except Exception as e:
+        return {"detail": str(e)}, 500
+
+    body = {
+        "status": "success",
+        "entity": entity,
+        "lab": result["lab"],
+        "created": result["created"],
+        "updated": result["updated"],
+        "unchanged": result["unchanged"],
+        "skipped": result["skipped"],
+        "errors": result["errors"],
+        "duplicate": result["duplicate"],
+        "import_id": result["import_id"],
     }
+    if "labs" in result:
+        # Workbook imports: counters per lab
+        body["labs"] = result["labs"]
+    if result.get("dry_run"):
+        # Nothing was written: counts are projections
+        body.update(dry_run=True, sample=result["sample"])
+    written = not (result["duplicate"] or result.get("dry_run"))
+    return body, 201 if written else 200
@@ -0,0 +1,170 @@
+"""
+Inventory summary maintenance.
+
+InventorySummary holds equipment quantities per (lab, equipment_type,
+category) so that /api/inventory/ reads a small table instead of
+aggregating LabEquipment on every request. Saves and deletes of single
+objects are applied as deltas by the handlers in labs.signals; bulk imports
+call add_equipment / refresh_labs because bulk_create and bulk_update send
+no signals. `manage.py rebuild_inventory_summary` rebuilds and verifies it.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from labs import response_cache
+from labs.models import LabEquipment, InventorySummary
+
+
+STATUS_FIELDS = ("working", "not_working", "under_repair")
+COUNT_FIELDS = ("total",) + STATUS_FIELDS
+
+
+def quantity_sum(**filters):
+    return Coalesce(Sum('quantity', filter=Q(**filters) if filters else None), 0)
+
+
+def summarize(queryset=None):
+    """
+    Aggregate LabEquipment (or queryset) into summary rows with one grouped
+    query. Returns dicts with lab, equipment_type, category and the counts.
+    """
+    queryset = LabEquipment.objects.all() if queryset is None else queryset
+    return (
+        queryset
+        .values('lab', 'equipment_type', 'category')
+        .annotate(
+            total=quantity_sum(),
+            working=quantity_sum(status='working'),
+            not_working=quantity_sum(status='not_working'),
+            under_repair=quantity_sum(status='under_repair'),
+        )
+        .order_by()
+    )
+
+
+def per_type(rows):
+    """
+    Summary rows (an InventorySummary queryset) folded into one row per lab
+    and equipment type, as /api/inventory/ lists them.
+    """
+    # values() before annotate() groups the per-category rows
+    return (
+        rows
+        .values('lab', 'equipment_type', lab_name=F('lab__name'))
+        .annotate(
+            total_quantity=Sum('total'),
+            working_quantity=Sum('working'),
+            not_working_quantity=Sum('not_working'),
+            under_repair_quantity=Sum('under_repair'),
+        )
+        .order_by('lab', 'equipment_type')
+    )
+
+
+def add_delta(deltas, lab_id, equipment_type, category, status, quantity, sign=1):
+    """Book quantity (negative with sign=-1) to the summary row it belongs to."""
+    counts = deltas[lab_id, equipment_type, category]
+    counts["total"] += sign * quantity
+    if status in STATUS_FIELDS:
+        counts[status] += sign * quantity
+
+
+def new_deltas():
+    """(lab_id, equipment_type, category) -> Counter of field changes."""
+    return defaultdict(Counter)
+
+
+def apply_deltas(deltas):
+    """
+    Apply collected deltas with F() updates so concurrent writers do not
+    overwrite each other. Missing rows are created for positive deltas and
+    rows whose total reaches zero are removed.
+    """
+    now = timezone.now()
+    emptied_labs = set()
+    for (lab_id, equipment_type, category), counts in deltas.items():
+        changes = {field: change for field, change in counts.items() if change}
+        if not changes:
+            continue
+        rows = InventorySummary.objects.filter(lab_id=lab_id, equipment_type=equipment_type, category=category)
+        updates = {field: F(field) + change for field, change in changes.items()}
+        if rows.update(updated_at=now, **updates):
+            if changes.get("total", 0) < 0:
+                emptied_labs.add(lab_id)
+            continue
+        # No row yet. A negative delta means the row went away with its lab.
+        if changes.get("total", 0) <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                InventorySummary.objects.create(
+                    lab_id=lab_id, equipment_type=equipment_type, category=category, **changes
+                )
+        except IntegrityError:
+            # Created concurrently; add to it instead
+            rows.update(updated_at=now, **updates)
+
+    if emptied_labs:
+        InventorySummary.objects.filter(lab_id__in=emptied_labs, total__lte=0).delete()
+
+
+def add_equipment(equipment):
+    """Book newly created LabEquipment (e.g. from bulk_create) to the summary."""
+    deltas = new_deltas()
+    for obj in equipment:
+        add_delta(deltas, obj.lab_id, obj.equipment_type, obj.category, obj.status, obj.quantity)
+    apply_deltas(deltas)
+
+
+def refresh_labs(lab_ids):
+    """Recompute the summary rows of the given labs from LabEquipment."""
+    lab_ids = list(lab_ids)
+    with transaction.atomic():
+        InventorySummary.objects.filter(lab_id__in=lab_ids).delete()
+        InventorySummary.objects.bulk_create(
+            summary_rows(summarize(LabEquipment.objects.filter(lab_id__in=lab_ids)))
+        )
+
+
+def summary_rows(aggregates):
+    return [
+        InventorySummary(
+            lab_id=row['lab'], equipment_type=row['equipment_type'], category=row['category'],
+            **{field: row[field] for field in COUNT_FIELDS},
+        )
+        for row in aggregates
+    ]
+
+
+def rebuild():
+    """Replace the whole summary with a fresh aggregate. Returns the row count."""
+    rows = summary_rows(summarize())
+    with transaction.atomic():
+        InventorySummary.objects.all().delete()
+        InventorySummary.objects.bulk_create(rows, batch_size=1000)
+        response_cache.bump_all()
+    return len(rows)
+
+
+def verify():
+    """
+    Compare the summary with a fresh aggregate of LabEquipment.
+    Returns a list of (key, summary counts, actual counts) for rows that differ.
+    """
+    def keyed(rows):
+        return {
+            (row['lab'], row['equipment_type'], row['category']): tuple(row[field] for field in COUNT_FIELDS)
+            for row in rows
+        }
+
+    actual = keyed(summarize())
+    stored = keyed(InventorySummary.objects.values('lab', 'equipment_type', 'category', *COUNT_FIELDS))
+    return [
+        (key, stored.get(key), actual.get(key))
+        for key in sorted(actual.keys() | stored.keys(), key=str)
+        if stored.get(key) != actual.get(key)
+    ]
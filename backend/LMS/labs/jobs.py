@@ -0,0 +1,142 @@
+"""
+Background import jobs.
+
+Uploads are stored on an ImportJob row which doubles as a DB-backed queue.
+`manage.py run_import_worker` claims queued jobs and runs them on a thread
+pool, outside any HTTP request, writing progress back to the job row.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from labs.importers import count_rows, import_failed, run_import
+from labs.models import Lab, ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+# Jobs stream the file and commit per chunk by default so that progress is
+# visible to pollers while the job runs.
+JOB_CHUNK_SIZE = getattr(settings, 'IMPORT_JOB_CHUNK_SIZE', 1000)
+
+
+def enqueue_import(file, entity, lab_id=None, options=None, user=None):
+    """
+    Store the upload and queue an ImportJob for it.
+    Raises ValueError when lab_id does not match a Lab.
+    """
+    if lab_id and not Lab.objects.filter(pk=lab_id).exists():
+        raise ValueError(f"Lab with id {lab_id} not found")
+
+    options = dict(options or {})
+    options.setdefault("chunk_size", JOB_CHUNK_SIZE)
+    options.setdefault("commit_per_chunk", True)
+
+    return ImportJob.objects.create(
+        entity=entity,
+        lab_id=lab_id or None,
+        file=file,
+        file_name=file.name,
+        options=options,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running.
+    Returns the job, or None when the queue is empty.
+    """
+    while True:
+        job = ImportJob.objects.filter(status='queued').order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        # Conditional update so two workers never claim the same job
+        claimed = ImportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    """Run a claimed job to completion and record the outcome on it."""
+    def progress(rows, result):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=F('rows_processed') + rows,
+            created_count=result["created"],
+            updated_count=result["updated"],
+            unchanged_count=result["unchanged"],
+            skipped_count=result["skipped"],
+            updated_at=timezone.now(),
+        )
+
+    try:
+        with job.file.open('rb') as stored:
+            upload = File(stored, name=job.file_name)
+            total_rows = count_rows(upload, all_sheets=job.options.get("workbook", False))
+            ImportJob.objects.filter(pk=job.pk).update(total_rows=total_rows)
+            result = run_import(
+                job.entity, upload, lab_id=job.lab_id, user=job.created_by, progress=progress, **job.options
+            )
+    except Exception as e:
+        logger.exception("Import job %s failed", job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status='failed', detail=f"{type(e).__name__}: {e}", finished_at=timezone.now(),
+        )
+    else:
+        job.refresh_from_db()
+        job.status = 'failed' if import_failed(job.entity, result) else 'succeeded'
+        job.created_count = result["created"]
+        job.updated_count = result["updated"]
+        job.unchanged_count = result["unchanged"]
+        job.skipped_count = result["skipped"]
+        job.errors = result["errors"]
+        if result["duplicate"]:
+            job.detail = f"Identical file already imported (import #{result['import_id']})"
+        job.finished_at = timezone.now()
+        if job.lab_id is None and result["lab"]:
+            job.lab = Lab.objects.filter(name=result["lab"]).first()
+        job.save()
+    finally:
+        # The upload is only needed while the job runs
+        job.file.delete(save=False)
+        ImportJob.objects.filter(pk=job.pk).update(file=None)
+
+
+def _run_in_thread(job):
+    try:
+        run_job(job)
+    finally:
+        # Each pool thread owns a DB connection; release it when done
+        connection.close()
+
+
+def run_worker(workers=1, poll_interval=2.0, once=False, stdout=None):
+    """
+    Poll the queue and run jobs on a pool of `workers` threads.
+    With once=True, drain the queue and return instead of polling forever.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        while True:
+            close_old_connections()
+            running = {f for f in running if not f.done()}
+
+            job = claim_next_job() if len(running) < workers else None
+            if job is not None:
+                if stdout:
+                    stdout.write(f"Starting import job {job.pk} ({job.entity}, {job.file_name})")
+                running.add(pool.submit(_run_in_thread, job))
+                continue
+
+            if once and not running:
+                return
+            time.sleep(poll_interval)
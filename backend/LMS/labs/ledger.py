@@ -0,0 +1,150 @@
+"""
+Import ledger and parsed-file cache.
+
+Uploads are identified by the SHA-256 of their content. Completed imports
+are recorded as ImportRecord rows, so an identical re-upload for the same
+entity and lab returns the earlier result instead of importing again.
+Parsed frames are pickled to IMPORT_CACHE_DIR under the same hash, so a
+file is only parsed once even when it is imported twice (e.g. with force,
+or a dry run followed by the real import).
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+from django.conf import settings
+
+from labs.models import ImportRecord
+
+
+# -----------------------
+# LEDGER
+# -----------------------
+def file_hash(file):
+    """SHA-256 hex digest of an uploaded file, streamed from its chunks."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def find_import(content_hash, entity, lab_id=None, mode="insert", workbook=False):
+    """The latest ImportRecord for this content, entity, lab and mode, or None."""
+    return ImportRecord.objects.filter(
+        content_hash=content_hash,
+        entity=entity,
+        lab_id=lab_id or None,
+        mode=mode,
+        workbook=workbook,
+    ).first()
+
+
+def record_import(content_hash, file, entity, result, lab_id=None, mode="insert", workbook=False, user=None):
+    """Store the result of a completed import in the ledger."""
+    return ImportRecord.objects.create(
+        content_hash=content_hash,
+        entity=entity,
+        lab_id=lab_id or None,
+        mode=mode,
+        workbook=workbook,
+        file_name=getattr(file, "name", "") or "",
+        file_size=getattr(file, "size", None) or 0,
+        result=result,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def recorded_result(record):
+    """The stored result of record, marked as a repeat of that import."""
+    return dict(record.result, duplicate=True, import_id=record.id)
+
+
+def previous_import(content_hash, entity, lab_id=None, options=None):
+    """
+    Result of an earlier import of identical content (see file_hash()), or
+    None. options are import options (mode, workbook, force, dry_run); force
+    and dry runs skip the lookup.
+    """
+    options = options or {}
+    if options.get("force") or options.get("dry_run"):
+        return None
+    record = find_import(
+        content_hash, entity, lab_id,
+        mode=options.get("mode", "insert"), workbook=bool(options.get("workbook")),
+    )
+    return recorded_result(record) if record else None
+
+
+# -----------------------
+# PARSED FILE CACHE
+# -----------------------
+def cache_path(content_hash, variant):
+    """Cache file for the frames of content_hash read as variant, or None when caching is off."""
+    cache_dir = getattr(settings, "IMPORT_CACHE_DIR", None)
+    if not cache_dir or not content_hash:
+        return None
+    return os.path.join(cache_dir, f"{content_hash}-{variant}.pickle")
+
+
+def cached_frames(content_hash, variant):
+    """Iterator over the cached frames, or None on a cache miss."""
+    path = cache_path(content_hash, variant)
+    if not path or not os.path.exists(path):
+        return None
+    return _read_cache(path)
+
+
+def cache_frames(frames, content_hash, variant):
+    """
+    Pass frames through while pickling them to the cache one by one, so
+    streamed reads stay streamed. The entry is only kept once every frame
+    has been read.
+    """
+    path = cache_path(content_hash, variant)
+    if not path:
+        return frames
+    return _write_cache(frames, path)
+
+
+def _read_cache(path):
+    with open(path, "rb") as cached:
+        while True:
+            try:
+                yield pickle.load(cached)
+            except EOFError:
+                return
+
+
+def _write_cache(frames, path):
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    prune_cache(cache_dir)
+
+    fd, partial = tempfile.mkstemp(dir=cache_dir, suffix=".partial")
+    complete = False
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for frame in frames:
+                pickle.dump(frame, out, protocol=pickle.HIGHEST_PROTOCOL)
+                yield frame
+        # Atomic, so concurrent imports of the same file never see half an entry
+        os.replace(partial, path)
+        complete = True
+    finally:
+        if not complete:
+            os.remove(partial)
+
+
+def prune_cache(cache_dir):
+    """Delete cache entries older than IMPORT_CACHE_MAX_AGE seconds."""
+    cutoff = time.time() - getattr(settings, "IMPORT_CACHE_MAX_AGE", 86400)
+    for entry in os.scandir(cache_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            # Removed by another import meanwhile
+            pass
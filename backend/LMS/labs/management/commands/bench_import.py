@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from labs.bench import BENCH_ENTITIES, BENCH_FORMATS, run_benchmark
+from labs.importers import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the bulk importers on synthetic CSV/XLSX files against a fresh "
+            "SQLite database and print the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000,
+                            help="Rows per generated file.")
+        parser.add_argument("--entity", action="append", choices=BENCH_ENTITIES,
+                            help="Entity to benchmark; repeat for several (default: all).")
+        parser.add_argument("--format", action="append", choices=BENCH_FORMATS, dest="formats",
+                            help="File format to benchmark; repeat for several (default: all).")
+        parser.add_argument("--bad-ratio", type=float, default=0.05,
+                            help="Share of deliberately broken rows.")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Random seed for the generated data.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Rows per bulk_create statement.")
+        parser.add_argument("--chunk-size", type=int, default=0,
+                            help="Stream the file in chunks of this many rows (0 reads it whole).")
+        parser.add_argument("--repeat", type=int, default=1,
+                            help="Runs per entity and format.")
+        parser.add_argument("--output",
+                            help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1 or options["repeat"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--rows, --repeat and --batch-size must be positive.")
+        if not 0 <= options["bad_ratio"] <= 1:
+            raise CommandError("--bad-ratio must be between 0 and 1.")
+
+        report = run_benchmark(
+            rows=options["rows"],
+            entities=options["entity"] or BENCH_ENTITIES,
+            formats=options["formats"] or BENCH_FORMATS,
+            bad_ratio=options["bad_ratio"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            chunk_size=options["chunk_size"] or None,
+            repeat=options["repeat"],
+        )
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                out.write(output + "\n")
+            self.stderr.write(f"Benchmark report written to {options['output']}")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from labs import sync
+
+
+class Command(BaseCommand):
+    help = ("Delete the deletion records of /api/sync/ older than SYNC_TOMBSTONE_DAYS; "
+            "clients with older cursors sync again from scratch.")
+
+    def handle(self, *args, **options):
+        count = sync.prune_tombstones()
+        self.stdout.write(f"Deleted {count} tombstones older than {settings.SYNC_TOMBSTONE_DAYS} days.")
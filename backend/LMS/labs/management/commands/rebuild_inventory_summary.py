@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from labs import inventory
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the InventorySummary table from LabEquipment and verify it "
+            "against a fresh aggregate.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify-only", action="store_true",
+                            help="Only compare the summary with LabEquipment; do not rebuild.")
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            count = inventory.rebuild()
+            self.stdout.write(f"Rebuilt {count} inventory summary rows.")
+
+        mismatches = inventory.verify()
+        for (lab_id, equipment_type, category), stored, actual in mismatches:
+            self.stderr.write(
+                f"Lab {lab_id} {equipment_type}/{category}: summary {stored}, actual {actual}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} inventory summary rows do not match LabEquipment.")
+        self.stdout.write(self.style.SUCCESS("Inventory summary matches LabEquipment."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from labs.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background import jobs (ImportJob) on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of jobs run concurrently (keep 1 on SQLite).")
+        parser.add_argument("--poll-interval", type=float, default=2.0,
+                            help="Seconds to wait between queue polls when idle.")
+        parser.add_argument("--once", action="store_true",
+                            help="Run the queued jobs and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Import worker started with {options['workers']} worker(s)")
+        try:
+            run_worker(
+                workers=options["workers"],
+                poll_interval=options["poll_interval"],
+                once=options["once"],
+                stdout=self.stdout,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Import worker stopped")
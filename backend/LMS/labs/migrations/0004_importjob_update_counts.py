@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='options',
+            field=models.JSONField(blank=True, default=dict, help_text='chunk_size, commit_per_chunk, mode, ...'),
+        ),
+    ]
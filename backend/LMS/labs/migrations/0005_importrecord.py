@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0004_importjob_update_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the uploaded file', max_length=64)),
+                ('entity', models.CharField(choices=[('labs', 'Labs'), ('pcs', 'PCs'), ('lab-equipment', 'Lab Equipment')], max_length=20)),
+                ('mode', models.CharField(default='insert', max_length=10)),
+                ('workbook', models.BooleanField(default=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_records', to=settings.AUTH_USER_MODEL)),
+                ('lab', models.ForeignKey(blank=True, help_text='Lab requested by the upload; empty when the importer picked it', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='import_records', to='labs.lab')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['content_hash', 'entity'], name='labs_import_content_6eed8c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_inventory_summary(apps, schema_editor):
+    LabEquipment = apps.get_model('labs', 'LabEquipment')
+    InventorySummary = apps.get_model('labs', 'InventorySummary')
+
+    def quantity(**filters):
+        return Coalesce(Sum('quantity', filter=Q(**filters) if filters else None), 0)
+
+    rows = (
+        LabEquipment.objects
+        .values('lab', 'equipment_type', 'category')
+        .annotate(
+            total=quantity(),
+            working=quantity(status='working'),
+            not_working=quantity(status='not_working'),
+            under_repair=quantity(status='under_repair'),
+        )
+        .order_by()
+    )
+    InventorySummary.objects.bulk_create(
+        [
+            InventorySummary(
+                lab_id=row['lab'], equipment_type=row['equipment_type'], category=row['category'],
+                total=row['total'], working=row['working'],
+                not_working=row['not_working'], under_repair=row['under_repair'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0005_importrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(choices=[('SERVER', 'Server'), ('ROUTER', 'Router'), ('SWITCH', 'Switch'), ('HUB', 'Hub'), ('PROJECTOR', 'Projector'), ('E_BOARD', 'E-Board'), ('AC', 'Air Conditioner'), ('FAN', 'Fan'), ('LIGHT', 'Light'), ('UPS', 'UPS'), ('OTHER', 'Other')], max_length=20)),
+                ('category', models.CharField(choices=[('INFRASTRUCTURE', 'Infrastructure'), ('APPLIANCE', 'Appliance')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('working', models.IntegerField(default=0)),
+                ('not_working', models.IntegerField(default=0)),
+                ('under_repair', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_summaries', to='labs.lab')),
+            ],
+            options={
+                'ordering': ['lab', 'equipment_type'],
+                'constraints': [models.UniqueConstraint(fields=('lab', 'equipment_type', 'category'), name='unique_inventory_summary')],
+            },
+        ),
+        migrations.RunPython(populate_inventory_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0006_inventorysummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='labequipment',
+            name='labs_labequ_equipme_02d208_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pc',
+            name='labs_pc_device__2c0aa7_idx',
+        ),
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['equipment_code', 'id'], name='labs_labequ_equipme_10a6c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['reported_on', 'id'], name='labs_mainte_reporte_676e53_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['device_name', 'id'], name='labs_pc_device__1b24d1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(fields=['name', 'id'], name='labs_softwa_name_3344eb_idx'),
+        ),
+    ]
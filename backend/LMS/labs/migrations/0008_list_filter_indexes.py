@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0007_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['lab', 'equipment_type', 'status'], name='labs_labequ_lab_id_f05f4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['lab', 'category'], name='labs_labequ_lab_id_75fe0f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['brand'], name='labs_labequ_brand_671507_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['status', 'reported_on'], name='labs_mainte_status_790774_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['lab', 'reported_on'], name='labs_mainte_lab_id_075de9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['fixed_on'], name='labs_mainte_fixed_o_72527f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['lab', 'status'], name='labs_pc_lab_id_b351eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['lab', 'connected', 'gpu'], name='labs_pc_lab_id_3f00ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['brand'], name='labs_pc_brand_0b99cc_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0008_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(help_text='Sync entity of the deleted row, e.g. pcs', max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('owner_id', models.PositiveBigIntegerField(blank=True, help_text='Student of a deleted ticket', null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['updated_at', 'id'], name='labs_labequ_updated_09a01d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['updated_at', 'id'], name='labs_mainte_updated_002164_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['updated_at', 'id'], name='labs_pc_updated_baf987_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peripheral',
+            index=models.Index(fields=['updated_at', 'id'], name='labs_periph_updated_30f93d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='software',
+            index=models.Index(fields=['updated_at', 'id'], name='labs_softwa_updated_4a2a55_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='labs_tombst_deleted_94c8ea_idx'),
+        ),
+    ]
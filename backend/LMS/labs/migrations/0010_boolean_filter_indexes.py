@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0009_sync_indexes_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labequipment',
+            index=models.Index(fields=['is_networked'], name='labs_labequ_is_netw_648887_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['connected', 'gpu'], name='labs_pc_connect_2ed343_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pc',
+            index=models.Index(fields=['gpu'], name='labs_pc_gpu_aecca7_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 # ------------------------------
@@ -77,7 +78,14 @@ class PC(models.Model):
         indexes = [
             models.Index(fields=['lab']),
             models.Index(fields=['status']),
-            models.Index(fields=['device_name']),
+            models.Index(fields=['device_name', 'id']),  # also backs cursor pagination
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
+            # Filter combinations served by the list views (labs.filtering)
+            models.Index(fields=['lab', 'status']),
+            models.Index(fields=['lab', 'connected', 'gpu']),
+            models.Index(fields=['connected', 'gpu']),
+            models.Index(fields=['gpu']),
+            models.Index(fields=['brand']),
         ]
         unique_together = ('lab', 'device_name')
         ordering = ['device_name']
@@ -176,6 +184,7 @@ class Peripheral(models.Model):
             models.Index(fields=['pc']),
             models.Index(fields=['peripheral_type']),
             models.Index(fields=['status']),
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
         ]
         ordering = ['pc', 'peripheral_type']
 
@@ -202,6 +211,8 @@ class Software(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['pc']),
+            models.Index(fields=['name', 'id']),  # cursor pagination
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
         ]
         unique_together = ('pc', 'name', 'version')
 
@@ -264,7 +275,13 @@ class LabEquipment(models.Model):
             models.Index(fields=['category']),
             models.Index(fields=['equipment_type']),
             models.Index(fields=['status']),
-            models.Index(fields=['equipment_code']),
+            models.Index(fields=['equipment_code', 'id']),  # also backs cursor pagination
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
+            # Filter combinations served by the list views (labs.filtering)
+            models.Index(fields=['lab', 'equipment_type', 'status']),
+            models.Index(fields=['lab', 'category']),
+            models.Index(fields=['is_networked']),
+            models.Index(fields=['brand']),
         ]
         unique_together = ('lab', 'equipment_code')
         ordering = ['equipment_code']
@@ -447,6 +464,7 @@ class MaintenanceLog(models.Model):
     reported_on = models.DateTimeField(auto_now_add=True)
     fixed_on = models.DateTimeField(blank=True, null=True)
     remarks = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
@@ -455,6 +473,12 @@ class MaintenanceLog(models.Model):
             models.Index(fields=['peripheral']),
             models.Index(fields=['lab']),
             models.Index(fields=['status']),
+            models.Index(fields=['reported_on', 'id']),  # cursor pagination
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
+            # Filter combinations served by the list views (labs.filtering)
+            models.Index(fields=['status', 'reported_on']),
+            models.Index(fields=['lab', 'reported_on']),
+            models.Index(fields=['fixed_on']),
         ]
         ordering = ['-reported_on']
 
@@ -485,3 +509,159 @@ class MaintenanceLog(models.Model):
         elif self.lab_equipment:
             return f"Issue on {self.lab_equipment.name} - {self.status}"
         return f"Issue - {self.status}"
+
+
+# ==============================================================
+# 🔷 IMPORT JOBS (background bulk imports)
+# ==============================================================
+
+# ------------------------------
+# 14) Import Jobs
+# ------------------------------
+class ImportJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+
+    ENTITY_CHOICES = (
+        ('labs', 'Labs'),
+        ('pcs', 'PCs'),
+        ('lab-equipment', 'Lab Equipment'),
+    )
+
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    lab = models.ForeignKey(Lab, on_delete=models.SET_NULL, related_name="import_jobs", null=True, blank=True)
+    file = models.FileField(upload_to='imports/%Y/%m/', blank=True, null=True)
+    file_name = models.CharField(max_length=255, help_text="Original name of the uploaded file")
+    options = models.JSONField(default=dict, blank=True, help_text="chunk_size, commit_per_chunk, mode, ...")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    total_rows = models.PositiveIntegerField(blank=True, null=True, help_text="Estimated data rows in the file")
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    detail = models.TextField(blank=True, null=True, help_text="Failure reason when the job crashed")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="import_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        ordering = ['-created_at']
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return max((end - self.started_at).total_seconds(), 0.0)
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed_seconds
+        if not elapsed:
+            return None
+        return round(self.rows_processed / elapsed, 1)
+
+    @property
+    def eta_seconds(self):
+        if self.status != 'running' or not self.total_rows:
+            return None
+        rate = self.rows_per_second
+        if not rate:
+            return None
+        return round(max(self.total_rows - self.rows_processed, 0) / rate, 1)
+
+    def __str__(self):
+        return f"Import #{self.id} ({self.entity}) - {self.status}"
+
+
+# ------------------------------
+# 15) Import Ledger
+# ------------------------------
+class ImportRecord(models.Model):
+    """
+    A completed import, keyed by the SHA-256 of the uploaded file so that
+    re-uploading identical content can return the earlier result.
+    """
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the uploaded file")
+    entity = models.CharField(max_length=20, choices=ImportJob.ENTITY_CHOICES)
+    lab = models.ForeignKey(Lab, on_delete=models.CASCADE, related_name="import_records", null=True, blank=True,
+                            help_text="Lab requested by the upload; empty when the importer picked it")
+    mode = models.CharField(max_length=10, default='insert')
+    workbook = models.BooleanField(default=False)
+    file_name = models.CharField(max_length=255)
+    file_size = models.PositiveBigIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="import_records")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_hash', 'entity']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.entity}) - {self.content_hash[:12]}"
+
+
+# ==============================================================
+# 🔷 INVENTORY SUMMARY (materialized from LabEquipment)
+# ==============================================================
+
+# ------------------------------
+# 16) Inventory Summary
+# Kept current by labs.inventory; rebuild with `manage.py rebuild_inventory_summary`
+# ------------------------------
+class InventorySummary(models.Model):
+    lab = models.ForeignKey(Lab, on_delete=models.CASCADE, related_name='inventory_summaries')
+    equipment_type = models.CharField(max_length=20, choices=LabEquipment.EQUIPMENT_TYPES)
+    category = models.CharField(max_length=20, choices=LabEquipment.CATEGORY_CHOICES)
+    total = models.IntegerField(default=0)
+    working = models.IntegerField(default=0)
+    not_working = models.IntegerField(default=0)
+    under_repair = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lab', 'equipment_type', 'category'], name='unique_inventory_summary'),
+        ]
+        ordering = ['lab', 'equipment_type']
+
+    def __str__(self):
+        return f"{self.lab.name} - {self.equipment_type} ({self.category}): {self.total}"
+
+
+# ------------------------------
+# 17) Sync Tombstones
+# Written by labs.signals on deletes, read by /api/sync/ (labs.sync);
+# prune with `manage.py prune_sync_tombstones`
+# ------------------------------
+class Tombstone(models.Model):
+    entity = models.CharField(max_length=20, help_text="Sync entity of the deleted row, e.g. pcs")
+    object_id = models.PositiveBigIntegerField()
+    owner_id = models.PositiveBigIntegerField(blank=True, null=True, help_text="Student of a deleted ticket")
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+        ]
+        ordering = ['deleted_at', 'id']
+
+    def __str__(self):
+        return f"{self.entity} #{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
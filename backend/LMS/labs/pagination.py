@@ -0,0 +1,167 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that only kicks in when the client asks for it
+    with ?page= or ?page_size=; otherwise the full list is returned as before.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not {self.page_query_param, self.page_size_query_param} & set(request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over view.cursor_ordering, e.g.
+    ('-reported_on', '-id'). The last field must be unique and no field may
+    be null. A page is fetched with a WHERE on the last row seen rather than
+    an OFFSET and without a COUNT, so deep pages cost the same as the first.
+
+    The opaque ?cursor= holds the ordering values of the row to continue
+    after (or before, for the previous page).
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        self.page_size = self.get_page_size(request)
+        fields = [name.lstrip('-') for name in self.ordering]
+        self.model_fields = [queryset.model._meta.get_field(name) for name in fields]
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [self.flip(name) for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        loaded, deferring = queryset.query.deferred_loading
+        if loaded and not deferring:
+            # Narrowed with only(); the cursor is built from the ordering fields
+            queryset = queryset.only(*loaded, *fields)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first = self.position(rows[0]) if rows else None
+        self.last = self.position(rows[-1]) if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    @staticmethod
+    def flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def after(self, ordering, position):
+        """Rows strictly after position in ordering: (a > x) OR (a = x AND b > y) ..."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = '__lt' if name.startswith('-') else '__gt'
+            condition |= equal & Q(**{field + lookup: value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def position(self, obj):
+        if isinstance(obj, dict):
+            # values() rows (labs.fastpath)
+            return [obj[field.attname] for field in self.model_fields]
+        return [field.value_from_object(obj) for field in self.model_fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = data['v']
+            if len(values) != len(self.model_fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.model_fields, values)]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        # Not DjangoJSONEncoder: it cuts datetimes to milliseconds, which would
+        # move the position
+        values = [
+            value.isoformat() if isinstance(value, (datetime.date, datetime.time)) else value
+            for value in position
+        ]
+        data = json.dumps({'v': values, 'r': reverse}, default=str, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.first, True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page number pagination as before, unless the client opts in to keyset
+    pagination with ?pagination=cursor (the links it returns carry ?cursor=).
+    Views set cursor_ordering, ending in a unique field such as id.
+    """
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
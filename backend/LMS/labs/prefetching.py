@@ -0,0 +1,105 @@
+"""
+Eager loading derived from serializers.
+
+eager_load() walks a serializer's fields and adds the select_related and
+prefetch_related lookups its nested serializers need, so a list page costs
+a fixed number of queries however many related rows each object has. New
+nested fields are picked up automatically. Serializers narrowed with
+?fields= (see serializers.DynamicFieldsMixin) also get only() on the
+columns they render.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def related_lookups(serializer, prefix=""):
+    """
+    (select_related, prefetch_related) lookups for serializer, an instance.
+    Nested single serializers are joined, nested many=True serializers get a
+    Prefetch whose queryset is eager loaded in turn. Meta.select_related and
+    Meta.prefetch_related add lookups that cannot be derived from the fields.
+    """
+    # Lookups for fields the serializer reads by hand, e.g. in to_representation()
+    meta = getattr(serializer, "Meta", None)
+    select = [prefix + path for path in getattr(meta, "select_related", ())]
+    prefetch = [prefix + path for path in getattr(meta, "prefetch_related", ())]
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        path = prefix + field.source.replace(".", "__")
+
+        if isinstance(field, serializers.ListSerializer):
+            model = getattr(getattr(field.child, "Meta", None), "model", None)
+            if model is None:
+                prefetch.append(path)
+                continue
+            queryset = eager_load(model._default_manager.all(), field.child)
+            prefetch.append(Prefetch(path, queryset=queryset))
+        elif isinstance(field, ManyRelatedField):
+            prefetch.append(path)
+        elif isinstance(field, serializers.BaseSerializer):
+            select.append(path)
+            nested_select, nested_prefetch = related_lookups(field, path + "__")
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+        elif isinstance(field, RelatedField) and not field.use_pk_only_optimization():
+            # e.g. StringRelatedField / SlugRelatedField read the related row
+            select.append(path)
+    return select, prefetch
+
+
+def loaded_columns(serializer):
+    """
+    Model fields to load with only() for a narrowed serializer, or None to
+    load everything. Meta.load_fields lists fields read besides the rendered
+    ones (e.g. in to_representation()). Fields without a model field behind
+    them (methods, properties) have unknown needs, so nothing is narrowed.
+    """
+    if not getattr(serializer, "narrowed", False):
+        return None
+    model = serializer.Meta.model
+    columns = {model._meta.pk.name, *getattr(serializer.Meta, "load_fields", ())}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*":
+            return None
+        try:
+            model_field = model._meta.get_field(field.source.split(".")[0])
+        except FieldDoesNotExist:
+            return None
+        if model_field.concrete:
+            columns.add(model_field.name)
+    return columns
+
+
+def eager_load(queryset, serializer):
+    """queryset with the related lookups serializer (a class or an instance) needs."""
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    select, prefetch = related_lookups(serializer)
+    columns = loaded_columns(serializer)
+    if columns:
+        # Joined relations must be named in only() too; their rows load whole
+        queryset = queryset.only(*columns, *select)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    For generic views: eager load what get_serializer_class() nests. Hooked
+    into filter_queryset(), which list() and get_object() both call, so views
+    that override get_queryset() are covered too.
+    """
+
+    def filter_queryset(self, queryset):
+        # get_serializer() carries the request, so ?fields= / ?expand= apply
+        return eager_load(super().filter_queryset(queryset), self.get_serializer())
@@ -0,0 +1,214 @@
+"""
+Versioned response cache for read-heavy lab views.
+
+Rendered responses are cached under the view, the query string, the
+user's role, the negotiated media type and the current version of every
+scope the response depends on:
+
+    "global"     bumped by imports; every cached response depends on it
+    "labs"       the Lab table itself (LabList)
+    "all"        any lab's data (cross-lab lists such as /api/inventory/)
+    "lab:<id>"   one lab's data (its PCs, equipment, inventory)
+    "tickets"    the Ticket table (counted by /api/stats/)
+
+Writes never delete entries; they bump versions, so later reads build new
+keys and stale entries age out. Model saves and deletes (API, admin) bump
+through the handlers in labs.signals, imports per written chunk in labs.importers; bumps
+run on transaction commit so a concurrent read cannot cache pre-commit data
+under the new version. Versions live in the same cache as the responses,
+RESPONSE_CACHE_ALIAS, so a shared backend (file, Redis) invalidates across
+processes.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def cache_stats():
+    """Hit/miss/bump counters of this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["hit_ratio"] = round(stats.get("hits", 0) / lookups, 3) if lookups else None
+    return stats
+
+
+# -----------------------
+# VERSIONS
+# -----------------------
+def version_key(scope):
+    return f"response-version:{scope}"
+
+
+def fresh_version():
+    # Clock based, so a version lost from the cache never restarts at a
+    # number that old entries were cached under
+    return time.time_ns()
+
+
+def versions(scopes):
+    """Current version of each scope, initializing missing ones."""
+    cache = response_cache()
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, fresh_version(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate everything cached under scopes, once the transaction commits."""
+    def run():
+        cache = response_cache()
+        for scope in scopes:
+            try:
+                cache.incr(version_key(scope))
+            except ValueError:
+                cache.set(version_key(scope), fresh_version(), None)
+        count("bumps")
+    transaction.on_commit(run)
+
+
+def bump_lab(lab_id):
+    bump(f"lab:{lab_id}", "all")
+
+
+def bump_all():
+    bump("global", "labs", "all")
+
+
+# -----------------------
+# MEMOIZED VALUES
+# -----------------------
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def flight_lock(key):
+    with _flights_lock:
+        return _flights.setdefault(key, threading.Lock())
+
+
+def memoize(key, timeout, compute, wait=10):
+    """
+    compute() cached under key for timeout seconds, with single-flight: when
+    it is missing, one caller computes it while the others wait for the
+    result instead of all hitting the database. Threads of a process wait on
+    a lock; other processes on a claim in the cache, for up to wait seconds
+    before computing it themselves.
+    """
+    cache = response_cache()
+    value = cache.get(key)
+    if value is not None:
+        count("memo_hits")
+        return value
+
+    with flight_lock(key):
+        value = cache.get(key)
+        if value is not None:
+            count("memo_hits")
+            return value
+        claim = f"{key}:computing"
+        if not cache.add(claim, 1, wait):
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key)
+                if value is not None:
+                    count("memo_hits")
+                    return value
+        count("memo_misses")
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(claim)
+        return value
+
+
+# -----------------------
+# VIEWS
+# -----------------------
+class CachedResponseMixin:
+    """
+    For GET views whose response depends on lab data. get_cache_scopes()
+    names the scopes (besides "global") it depends on. Entries keep the
+    ETag / Last-Modified of the response, so conditional GETs are answered
+    from the cache too.
+    """
+    cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return self.cache_scopes
+
+    def get_cache_key(self, request):
+        scopes = ("global", *self.get_cache_scopes())
+        state = "|".join(
+            f"{scope}={version}" for scope, version in zip(scopes, versions(scopes))
+        )
+        parts = (
+            type(self).__name__, request.get_full_path(), getattr(request.user, "role", ""),
+            request.accepted_media_type, state,
+        )
+        digest = hashlib.md5("\n".join(map(str, parts)).encode("utf-8"), usedforsecurity=False)
+        return f"response:{digest.hexdigest()}"
+
+    def get(self, request, *args, **kwargs):
+        cache = response_cache()
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            count("hits")
+            content, content_type, headers = entry
+            last_modified = headers.get("Last-Modified")
+            response = get_conditional_response(
+                request, etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+            )
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response.headers[name] = value
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+        count("misses")
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._cache_key = key
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "_cache_key", None)
+        if key and response.status_code == 200:
+            response.render()
+            headers = {name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers}
+            response_cache().set(
+                key, (response.content, response["Content-Type"], headers), settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        return response
@@ -1,18 +1,68 @@
-from rest_framework import serializers
+from django.utils.functional import cached_property
+from rest_framework import permissions, serializers
 from .models import (
     User, Lab, PC, CPU, OS, Peripheral, Software,
     LabEquipment, NetworkEquipmentDetails, ServerDetails, 
-    ProjectorDetails, ElectricalApplianceDetails, MaintenanceLog
+    ProjectorDetails, ElectricalApplianceDetails, MaintenanceLog, ImportJob
 )
 
 
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for GET requests: ?fields=id,device_name picks the
+    fields of the top-level objects and ?expand=cpu,os the nested
+    serializers to include. With either parameter given, nested serializers
+    are only included when named in one of them; with neither the full
+    representation is returned. labs.prefetching narrows the query to match.
+    """
+
+    @cached_property
+    def field_selection(self):
+        """(fields or None, expand) requested for this serializer, or None when not narrowed."""
+        request = self.context.get('request')
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if request is None or parent is not None or request.method not in permissions.SAFE_METHODS:
+            return None
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+
+        def names(param):
+            return {name.strip() for name in params.get(param, '').split(',') if name.strip()}
+        return (names('fields') if 'fields' in params else None), names('expand')
+
+    @property
+    def narrowed(self):
+        return self.field_selection is not None
+
+    def nested_requested(self, name):
+        if self.field_selection is None:
+            return True
+        only, expand = self.field_selection
+        return name in expand or name in (only or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.field_selection is None:
+            return fields
+        only, expand = self.field_selection
+        unknown = ((only or set()) | expand) - set(fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return {
+            name: field for name, field in fields.items()
+            if (self.nested_requested(name) if isinstance(field, serializers.BaseSerializer)
+                else only is None or name in only)
+        }
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role')
 
 
-class LabSerializer(serializers.ModelSerializer):
+class LabSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Lab
         fields = '__all__'
@@ -30,19 +80,19 @@ class OSSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PeripheralSerializer(serializers.ModelSerializer):
+class PeripheralSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Peripheral
         fields = '__all__'
 
 
-class SoftwareSerializer(serializers.ModelSerializer):
+class SoftwareSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Software
         fields = '__all__'
 
 
-class PCSerializer(serializers.ModelSerializer):
+class PCSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     cpu = CPUSerializer(read_only=True)
     os = OSSerializer(read_only=True)
     peripheral_devices = PeripheralSerializer(many=True, read_only=True)
@@ -81,7 +131,7 @@ class ElectricalApplianceDetailsSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class LabEquipmentSerializer(serializers.ModelSerializer):
+class LabEquipmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     network_details = NetworkEquipmentDetailsSerializer(read_only=True)
     server_details = ServerDetailsSerializer(read_only=True)
     projector_details = ProjectorDetailsSerializer(read_only=True)
@@ -92,13 +142,37 @@ class LabEquipmentSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class LabEquipmentListSerializer(serializers.ModelSerializer):
+class LabEquipmentListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Lighter list form: only the detail blocks that can belong to the row's
+    equipment_type are included (e.g. network_details for a SWITCH).
+    """
+    DETAIL_TYPES = {
+        'network_details': NetworkEquipmentDetails.NETWORK_TYPES,
+        'server_details': ('SERVER',),
+        'projector_details': ('PROJECTOR',),
+        'electrical_details': ElectricalApplianceDetails.ELECTRICAL_TYPES,
+    }
+
+    network_details = NetworkEquipmentDetailsSerializer(read_only=True)
+    server_details = ServerDetailsSerializer(read_only=True)
+    projector_details = ProjectorDetailsSerializer(read_only=True)
+    electrical_details = ElectricalApplianceDetailsSerializer(read_only=True)
+
     class Meta:
         model = LabEquipment
         fields = '__all__'
+        load_fields = ('equipment_type',)  # labs.prefetching; read below
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name, types in self.DETAIL_TYPES.items():
+            if instance.equipment_type not in types:
+                data.pop(name, None)
+        return data
 
 
-class MaintenanceLogSerializer(serializers.ModelSerializer):
+class MaintenanceLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = MaintenanceLog
         fields = '__all__'
@@ -118,3 +192,27 @@ class MaintenanceLogSerializer(serializers.ModelSerializer):
             )
         
         return data
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    rows_per_second = serializers.ReadOnlyField()
+    eta_seconds = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ImportJob
+        exclude = ('file', 'options')
+
+
+class InventorySerializer(serializers.Serializer):
+    """One row of the inventory aggregate: equipment of one type in one lab."""
+    id = serializers.SerializerMethodField()
+    lab = serializers.IntegerField()
+    lab_name = serializers.CharField()
+    equipment_type = serializers.CharField()
+    total_quantity = serializers.IntegerField()
+    working_quantity = serializers.IntegerField()
+    not_working_quantity = serializers.IntegerField()
+    under_repair_quantity = serializers.IntegerField()
+
+    def get_id(self, obj):
+        return f"{obj['lab']}_{obj['equipment_type']}"
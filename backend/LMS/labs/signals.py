@@ -0,0 +1,200 @@
+"""
+Signal handlers keeping InventorySummary in step with LabEquipment,
+invalidating cached responses (labs.response_cache) on writes,
+recording deletions for delta sync (labs.sync) and publishing live events
+(labs.events). Connected in LabsConfig.ready().
+"""
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from labs import events, inventory, sync
+from labs.models import (
+    Lab, PC, CPU, OS, Peripheral, Software, LabEquipment, NetworkEquipmentDetails,
+    ServerDetails, ProjectorDetails, ElectricalApplianceDetails, InventorySummary, MaintenanceLog, Tombstone,
+)
+from labs.response_cache import bump, bump_lab
+from tickets.models import Ticket
+
+
+TRACKED_FIELDS = ('lab_id', 'equipment_type', 'category', 'status', 'quantity')
+
+
+@receiver(pre_save, sender=LabEquipment)
+def remember_inventory_values(sender, instance, raw=False, **kwargs):
+    # Values before this save, so post_save can book the difference
+    instance._inventory_previous = None
+    if instance.pk and not raw:
+        instance._inventory_previous = (
+            sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=LabEquipment)
+def update_inventory_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        # Fixtures: run `manage.py rebuild_inventory_summary` afterwards
+        return
+    deltas = inventory.new_deltas()
+    previous = getattr(instance, '_inventory_previous', None)
+    if previous:
+        inventory.add_delta(deltas, *(previous[field] for field in TRACKED_FIELDS), sign=-1)
+    inventory.add_delta(deltas, *(getattr(instance, field) for field in TRACKED_FIELDS))
+    inventory.apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=LabEquipment)
+def update_inventory_on_delete(sender, instance, **kwargs):
+    deltas = inventory.new_deltas()
+    inventory.add_delta(deltas, *(getattr(instance, field) for field in TRACKED_FIELDS), sign=-1)
+    inventory.apply_deltas(deltas)
+
+
+# -----------------------
+# RESPONSE CACHE
+# -----------------------
+LAB_ROWS = (PC, LabEquipment, InventorySummary, MaintenanceLog)
+PC_ROWS = (CPU, OS, Peripheral, Software)
+EQUIPMENT_ROWS = (NetworkEquipmentDetails, ServerDetails, ProjectorDetails, ElectricalApplianceDetails)
+# Row model -> (the model it belongs to, the foreign key to it)
+PARENTS = {**dict.fromkeys(PC_ROWS, (PC, 'pc')), **dict.fromkeys(EQUIPMENT_ROWS, (LabEquipment, 'equipment'))}
+
+
+def lab_of(instance):
+    """Id of the lab whose cached responses instance appears in."""
+    if isinstance(instance, LAB_ROWS):
+        return instance.lab_id
+    if isinstance(instance, PC_ROWS):
+        return PC.objects.filter(pk=instance.pc_id).values_list('lab_id', flat=True).first()
+    return LabEquipment.objects.filter(pk=instance.equipment_id).values_list('lab_id', flat=True).first()
+
+
+@receiver(pre_save, sender=PC)
+def remember_pc_state(sender, instance, raw=False, **kwargs):
+    # A PC moved to another lab leaves the old lab's lists too; status
+    # changes are published as live events below
+    instance._previous_lab_id = instance._previous_state = None
+    if instance.pk and not raw:
+        previous = sender.objects.filter(pk=instance.pk).values('lab_id', 'status', 'connected').first()
+        if previous:
+            instance._previous_lab_id = previous['lab_id']
+            instance._previous_state = previous
+
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    if sender is Lab:
+        bump(f"lab:{instance.pk}", "all", "labs")
+        return
+    lab_ids = {lab_of(instance), getattr(instance, '_previous_lab_id', None)}
+    # LabEquipment: the lab before this save, remembered for the inventory above
+    lab_ids.add((getattr(instance, '_inventory_previous', None) or {}).get('lab_id'))
+    for lab_id in lab_ids - {None}:
+        bump_lab(lab_id)
+
+
+def remember_deleted_parent(sender, instance, origin=None, **kwargs):
+    # Deleted with its PC, equipment or lab, whose own delete bumps the lab;
+    # otherwise collected to look the labs up once per delete() below
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if model is sender:
+        fk = PARENTS[sender][1]
+        origin.__dict__.setdefault('_deleted_from', set()).add(getattr(instance, f'{fk}_id'))
+
+
+def invalidate_deleted_rows(sender, instance, origin=None, **kwargs):
+    if origin is None:
+        lab_ids = {lab_of(instance)}
+    else:
+        parent_ids = origin.__dict__.pop('_deleted_from', None)
+        if not parent_ids:
+            return
+        parent = PARENTS[sender][0]
+        lab_ids = set(parent.objects.filter(pk__in=parent_ids).values_list('lab_id', flat=True))
+    for lab_id in lab_ids - {None}:
+        bump_lab(lab_id)
+
+
+for model in (Lab, *LAB_ROWS, *PC_ROWS, *EQUIPMENT_ROWS):
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f"response-cache-save-{model.__name__}")
+for model in (Lab, *LAB_ROWS):
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f"response-cache-delete-{model.__name__}")
+for model in PARENTS:
+    pre_delete.connect(remember_deleted_parent, sender=model, dispatch_uid=f"response-cache-parent-{model.__name__}")
+    post_delete.connect(invalidate_deleted_rows, sender=model, dispatch_uid=f"response-cache-delete-{model.__name__}")
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidate_ticket_counts(sender, instance, **kwargs):
+    # The ticket counters of /api/stats/ (labs.stats)
+    bump("tickets")
+
+
+# -----------------------
+# DELTA SYNC
+# -----------------------
+def tombstone(sender, instance):
+    return Tombstone(
+        entity=sync.entity_of(sender), object_id=instance.pk,
+        # Tickets are only synced to their student
+        owner_id=getattr(instance, 'student_id', None),
+    )
+
+
+def collect_tombstone(sender, instance, origin=None, **kwargs):
+    # pre_delete is sent for every collected row before any is deleted, so
+    # the first post_delete below writes the tombstones of the whole delete()
+    if origin is not None:
+        origin.__dict__.setdefault('_sync_tombstones', []).append(tombstone(sender, instance))
+
+
+def record_tombstones(sender, instance, origin=None, **kwargs):
+    tombstones = [tombstone(sender, instance)] if origin is None else origin.__dict__.pop('_sync_tombstones', None)
+    if tombstones:
+        Tombstone.objects.bulk_create(tombstones)
+        # Stamped once the delete commits, like the rows below
+        first = min(row.deleted_at for row in tombstones)
+        sync.restamp_on_commit(Tombstone.objects.filter(deleted_at__gte=first), 'deleted_at')
+
+
+def restamp_synced_row(sender, instance, raw=False, **kwargs):
+    # Outside a transaction the save has committed already
+    if not raw and transaction.get_connection().in_atomic_block:
+        sync.restamp_on_commit(sender._default_manager.filter(pk=instance.pk))
+
+
+for model in sync.ENTITIES.values():
+    pre_delete.connect(collect_tombstone, sender=model, dispatch_uid=f"sync-tombstone-{model.__name__}")
+    post_delete.connect(record_tombstones, sender=model, dispatch_uid=f"sync-tombstone-{model.__name__}")
+    post_save.connect(restamp_synced_row, sender=model, dispatch_uid=f"sync-stamp-{model.__name__}")
+
+
+# -----------------------
+# LIVE EVENTS
+# -----------------------
+@receiver(post_save, sender=PC)
+def publish_pc_status(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if not raw and not created and previous:
+        events.pc_status_changed(instance, previous)
+
+
+@receiver(pre_save, sender=MaintenanceLog)
+@receiver(pre_save, sender=Ticket)
+def remember_status(sender, instance, raw=False, **kwargs):
+    instance._previous_status = None
+    if instance.pk and not raw:
+        instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def publish_maintenance(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.maintenance_changed(instance, getattr(instance, '_previous_status', None), created)
+
+
+@receiver(post_save, sender=Ticket)
+def publish_ticket_status(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        events.ticket_status_changed(instance, getattr(instance, '_previous_status', None))
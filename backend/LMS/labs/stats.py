@@ -0,0 +1,135 @@
+"""
+Dashboard statistics, fleet-wide and per lab.
+
+compute_stats() runs one grouped, conditionally aggregated query per table
+(labs, PCs, equipment, maintenance logs, tickets) and sums the per-lab rows
+into the fleet totals in memory. fleet_stats() memoizes the result for
+STATS_CACHE_TIMEOUT seconds with single-flight (see
+response_cache.memoize), keyed by the lab data and ticket versions so
+writes show up without waiting for the timeout.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from labs import response_cache
+from labs.models import Lab, PC, LabEquipment, MaintenanceLog
+from tickets.models import Ticket
+
+
+def count_if(**filters):
+    return Count('pk', filter=Q(**filters))
+
+
+def pc_counts():
+    rows = (
+        PC.objects.values('lab')
+        .annotate(
+            total=Count('pk'),
+            working=count_if(status='working'),
+            not_working=count_if(status='not_working'),
+            # Annotations cannot take the name of the field they filter on
+            online=count_if(connected=True),
+            offline=count_if(connected=False),
+        )
+        .order_by()
+    )
+    return {
+        row['lab']: {
+            "total": row['total'], "working": row['working'], "not_working": row['not_working'],
+            "connected": row['online'], "disconnected": row['offline'],
+        }
+        for row in rows
+    }
+
+
+def equipment_counts():
+    """lab id -> {"total", "by_status", "by_type"}; equipment rows are counted, not quantities."""
+    counts = defaultdict(lambda: {"total": 0, "by_status": Counter(), "by_type": Counter()})
+    rows = LabEquipment.objects.values('lab', 'equipment_type', 'status').annotate(n=Count('pk')).order_by()
+    for row in rows:
+        lab = counts[row['lab']]
+        lab["total"] += row['n']
+        lab["by_status"][row['status']] += row['n']
+        lab["by_type"][row['equipment_type']] += row['n']
+    return counts
+
+
+def maintenance_counts(since):
+    rows = (
+        MaintenanceLog.objects.values('lab')
+        .annotate(
+            pending=count_if(status='pending'),
+            fixed=count_if(status='fixed'),
+            opened_recently=count_if(reported_on__gte=since),
+            closed_recently=count_if(fixed_on__gte=since),
+        )
+        .order_by()
+    )
+    return {row.pop('lab'): row for row in rows}
+
+
+def ticket_counts():
+    rows = (
+        Ticket.objects.values(lab=F('pc__lab'))
+        .annotate(
+            open=count_if(status='open'),
+            in_progress=count_if(status='in_progress'),
+            resolved=count_if(status='resolved'),
+        )
+        .order_by()
+    )
+    return {row.pop('lab'): row for row in rows}
+
+
+def add_counts(total, part):
+    for name, value in part.items():
+        if isinstance(value, dict):
+            add_counts(total.setdefault(name, {}), value)
+        else:
+            total[name] = total.get(name, 0) + value
+
+
+def compute_stats(days):
+    """Counters for every lab and for the fleet; "recently" means within the last `days` days."""
+    now = timezone.now()
+    since = now - timedelta(days=days)
+    empty = {
+        "pcs": {"total": 0, "working": 0, "not_working": 0, "connected": 0, "disconnected": 0},
+        "equipment": {"total": 0, "by_status": {}, "by_type": {}},
+        "maintenance": {"pending": 0, "fixed": 0, "opened_recently": 0, "closed_recently": 0},
+        "tickets": {"open": 0, "in_progress": 0, "resolved": 0},
+    }
+    parts = {
+        "pcs": pc_counts(),
+        "equipment": {
+            lab: {"total": counts["total"], "by_status": dict(counts["by_status"]), "by_type": dict(counts["by_type"])}
+            for lab, counts in equipment_counts().items()
+        },
+        "maintenance": maintenance_counts(since),
+        "tickets": ticket_counts(),
+    }
+
+    labs = []
+    for lab in Lab.objects.order_by('name').values('id', 'name'):
+        labs.append(dict(lab, **{name: rows.get(lab['id'], empty[name]) for name, rows in parts.items()}))
+
+    # Fleet totals include rows without a lab (tickets without a PC)
+    totals = {"labs": len(labs)}
+    for name, rows in parts.items():
+        totals[name] = {}
+        add_counts(totals[name], empty[name])
+        for counts in rows.values():
+            add_counts(totals[name], counts)
+
+    return {"generated_at": now.isoformat(), "days": days, "totals": totals, "labs": labs}
+
+
+def fleet_stats(days):
+    """compute_stats(days), memoized; writes to any lab or ticket invalidate it through the response cache versions."""
+    versions = response_cache.versions(("global", "all", "tickets"))
+    key = f"stats:{days}:{':'.join(map(str, versions))}"
+    return response_cache.memoize(key, settings.STATS_CACHE_TIMEOUT, lambda: compute_stats(days))
@@ -0,0 +1,190 @@
+"""
+Delta sync for clients keeping a local replica of the lab tables.
+
+GET /api/sync/ returns every row, in pages, and a cursor; GET
+/api/sync/?since=<cursor> returns what changed after it:
+
+    {"cursor": "...", "has_more": false,
+     "changes": {"pcs": [{...}], "peripherals": [], ...},
+     "deleted": {"pcs": [12], ...}}
+
+Clients apply the changes as upserts, then the deletions, and poll again
+with the new cursor (at once while has_more is true). Rows are flat, one
+table per entity with related rows as ids, and rendered by labs.fastpath.
+
+Changed rows are found by an (updated_at, id) keyset per table and deleted
+ones in the Tombstone table written by labs.signals, both on indexes, so a
+poll costs a query per table and rows in proportion to what changed. The
+cursor holds the position reached in each of them.
+
+updated_at (auto_now) and deleted_at are set before the writing
+transaction commits, so a row could become visible behind a cursor that
+has moved past it. restamp_on_commit() sets them again once the
+transaction commits (labs.signals for saves and deletes, labs.bulk and
+labs.importers for their bulk writes), and rows stamped within the last
+SYNC_SETTLE_SECONDS, which may still be getting their commit-time stamp,
+are left for the next poll. Cursors never point inside that window, and
+one that does is refused with a 410.
+Tombstones are kept SYNC_TOMBSTONE_DAYS days; older cursors get a 410 and
+the client starts over without ?since=.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+from labs.fastpath import Plan
+from labs.models import PC, Peripheral, Software, LabEquipment, MaintenanceLog, Tombstone
+from tickets.models import Ticket
+
+
+ENTITIES = {
+    "pcs": PC,
+    "peripherals": Peripheral,
+    "software": Software,
+    "lab_equipment": LabEquipment,
+    "maintenance": MaintenanceLog,
+    "tickets": Ticket,
+}
+# Cursor position of the Tombstone table
+DELETED = "deleted"
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The cursor is older than the kept deletions; sync again without since."
+    default_code = "cursor_expired"
+
+
+def entity_of(model):
+    return next(name for name, entity_model in ENTITIES.items() if entity_model is model)
+
+
+def flat_serializer(model):
+    """ModelSerializer of model's own columns, related rows as ids."""
+    meta = type("Meta", (), {"model": model, "fields": "__all__"})
+    return type(f"{model.__name__}SyncSerializer", (serializers.ModelSerializer,), {"Meta": meta})
+
+
+SERIALIZERS = {name: flat_serializer(model) for name, model in ENTITIES.items()}
+
+
+def restamp_on_commit(queryset, field="updated_at"):
+    """
+    Set field of queryset's rows to the time the current transaction commits
+    (at once outside of one), when they become visible to other connections.
+    """
+    transaction.on_commit(lambda: queryset.update(**{field: timezone.now()}))
+
+
+# -----------------------
+# CURSORS
+# -----------------------
+# A position is (timestamp, id) of the last row returned, or (timestamp, None)
+# once every row up to timestamp has been returned.
+
+def encode_cursor(positions):
+    data = {name: [moment.isoformat(), pk] for name, (moment, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(encoded):
+    """{table: position} of a cursor from encode_cursor()."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        positions = {}
+        for name, (moment, pk) in data.items():
+            moment = parse_datetime(moment)
+            if name not in ENTITIES and name != DELETED or moment is None or timezone.is_naive(moment):
+                raise ValueError
+            if pk is not None and (isinstance(pk, bool) or not isinstance(pk, int)):
+                raise ValueError
+            positions[name] = (moment, pk)
+        if DELETED not in positions:
+            raise ValueError
+        return positions
+    except (TypeError, ValueError, AttributeError):
+        raise ValidationError({"since": "Invalid cursor."})
+
+
+def after(position, field):
+    """Rows past position in (field, id) order."""
+    moment, pk = position
+    if pk is None:
+        return Q(**{f"{field}__gt": moment})
+    return Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "pk__gt": pk})
+
+
+def advance(position, rows, field, limit, settled):
+    """The position after rows (at most limit + 1 of them) and whether rows were left out."""
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return (last[field], last["id"]), True
+    if position is not None and position[0] >= settled:
+        return position, False
+    return (settled, None), False
+
+
+# -----------------------
+# CHANGES
+# -----------------------
+def visible(name, queryset, user):
+    """Students see their own tickets only, as in /api/tickets/."""
+    if name == "tickets" and getattr(user, "role", None) != "admin":
+        return queryset.filter(student=user.pk)
+    return queryset
+
+
+def changes_since(positions, user, limit, context):
+    """
+    Rows changed and ids deleted after positions (from decode_cursor(), or
+    None for everything), at most limit of each per table.
+    """
+    now = timezone.now()
+    settled = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    if positions is None:
+        # A new replica starts from the current rows; earlier deletions do not concern it
+        positions = {DELETED: (settled, None)}
+    elif positions[DELETED][0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        raise CursorExpired()
+    elif any(moment > settled for moment, _ in positions.values()):
+        # Not from advance(): rows still getting their commit-time stamp could be skipped
+        raise CursorExpired("The cursor is ahead of the settled changes; sync again without since.")
+
+    cursor, changes, has_more = {}, {}, False
+    for name, model in ENTITIES.items():
+        plan = Plan(SERIALIZERS[name](context=context))
+        queryset = visible(name, model._default_manager.filter(updated_at__lte=settled), user)
+        if name in positions:
+            queryset = queryset.filter(after(positions[name], "updated_at"))
+        columns = dict.fromkeys([*plan.query_columns, "updated_at", "id"])
+        rows = list(queryset.order_by("updated_at", "id").values(*columns)[:limit + 1])
+        cursor[name], truncated = advance(positions.get(name), rows, "updated_at", limit, settled)
+        changes[name] = plan.render(rows[:limit])
+        has_more |= truncated
+
+    tombstones = Tombstone.objects.filter(deleted_at__lte=settled).filter(after(positions[DELETED], "deleted_at"))
+    if getattr(user, "role", None) != "admin":
+        tombstones = tombstones.filter(~Q(entity="tickets") | Q(owner_id=user.pk))
+    rows = list(tombstones.order_by("deleted_at", "id").values("id", "deleted_at", "entity", "object_id")[:limit + 1])
+    cursor[DELETED], truncated = advance(positions[DELETED], rows, "deleted_at", limit, settled)
+    deleted = {name: [] for name in ENTITIES}
+    for row in rows[:limit]:
+        deleted[row["entity"]].append(row["object_id"])
+    has_more |= truncated
+
+    return {"cursor": encode_cursor(cursor), "has_more": has_more, "changes": changes, "deleted": deleted}
+
+
+def prune_tombstones():
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS. Returns how many were deleted."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
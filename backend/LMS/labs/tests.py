@@ -1,3 +1,1154 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from openpyxl import Workbook
+
+from tickets.models import Ticket
+
+from . import events, fastpath, importers, inventory, response_cache, sync
+from .bench import generate_rows, write_file
+from .fastpath import FastJSONRenderer
+from .importers import import_labs, import_pcs, import_lab_equipment, run_import
+from .jobs import claim_next_job, enqueue_import, run_job
+from .models import Lab, PC, CPU, OS, Peripheral, Software, LabEquipment, MaintenanceLog, NetworkEquipmentDetails, ServerDetails, ElectricalApplianceDetails, ImportJob, ImportRecord, InventorySummary, Tombstone, User
+from .serializers import ImportJobSerializer, InventorySerializer, LabEquipmentListSerializer
+from .views import EQUIPMENT_FILTERS, PC_FILTERS
+
+
+def csv_upload(text, name="sheet.csv"):
+    return SimpleUploadedFile(name, text.encode("utf-8"), content_type="text/csv")
+
+
+def xlsx_upload(rows, name="sheet.xlsx", sheets=None):
+    """rows for a single-sheet workbook, or sheets: {title: rows}."""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, sheet_rows in (sheets or {"Sheet": rows}).items():
+        sheet = workbook.create_sheet(title)
+        for row in sheet_rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+# Version bumps of labs.response_cache run on commit, which TestCase never
+# does; API tests of other behaviour keep no responses
+without_response_cache = override_settings(RESPONSE_CACHE_TIMEOUT=0)
+
+
+@override_settings(IMPORT_CACHE_DIR=tempfile.mkdtemp())
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.lab = Lab.objects.create(name="Lab A")
+
+    def test_import_labs_skips_existing_and_repeated_names(self):
+        result = import_labs(csv_upload("Name,Location\nLab A,Block 1\nLab B,Block 2\nLab B,Block 2\n,Nowhere\n"))
+        created, skipped, errors = result
+        self.assertEqual((created, skipped), (1, 2))
+        self.assertEqual(errors, ["Row 5: Lab name is required"])
+        self.assertTrue(Lab.objects.filter(name="Lab B", location="Block 2").exists())
+
+    def test_import_pcs_batches_inserts(self):
+        PC.objects.create(lab=self.lab, device_name="PC-01")
+        rows = "\n".join(f"PC-{n:02d},working,yes" for n in range(1, 21))
+        with self.assertNumQueries(12):
+            result = import_pcs(csv_upload("Device Name,Status,Connected\n" + rows), lab_id=self.lab.id, batch_size=10)
+        self.assertEqual((result["created"], result["skipped"], result["errors"]), (19, 1, []))
+        self.assertEqual(PC.objects.filter(lab=self.lab).count(), 20)
+
+    def test_import_lab_equipment_creates_detail_rows(self):
+        text = (
+            "equipment_code,name,equipment_type,quantity,ip_address\n"
+            "SW-01,Core Switch,switch,1,10.0.0.1\n"
+            "SW-01,Duplicate,switch,1,10.0.0.2\n"
+            "FAN-01,Fan,bogus,0,\n"
+        )
+        result = import_lab_equipment(csv_upload(text), lab_id=self.lab.id)
+        self.assertEqual((result["created"], result["skipped"]), (2, 1))
+        self.assertEqual(result["errors"], ["Row 4: Invalid equipment_type 'BOGUS', defaulting to OTHER"])
+        switch = LabEquipment.objects.get(lab=self.lab, equipment_code="SW-01")
+        self.assertEqual(switch.network_details.ip_address, "10.0.0.1")
+        self.assertEqual(NetworkEquipmentDetails.objects.count(), 1)
+        self.assertEqual(LabEquipment.objects.get(equipment_code="FAN-01").quantity, 1)
+
+    def test_import_pcs_resolves_aliases_per_row(self):
+        text = "Name,PC Name,Status,GPU,Serial\n,PC-1,broken,yes,S1\nPC-2,,not_working,no,\n"
+        result = import_pcs(csv_upload(text), lab_id=self.lab.id)
+        self.assertEqual(result["created"], 2)
+        pc1, pc2 = PC.objects.filter(lab=self.lab).order_by("device_name")
+        self.assertEqual((pc1.device_name, pc1.status, pc1.gpu, pc1.serial_number), ("PC-1", "working", True, "S1"))
+        self.assertEqual((pc2.device_name, pc2.status, pc2.gpu, pc2.serial_number), ("PC-2", "not_working", False, None))
+
+    def test_upsert_updates_only_changed_rows_and_fields(self):
+        PC.objects.create(lab=self.lab, device_name="PC-1", brand="Dell", ram="8GB", serial_number="S1")
+        PC.objects.create(lab=self.lab, device_name="PC-2", brand="HP", ram="8GB")
+        text = "device_name,brand,ram\nPC-1,Dell,8GB\nPC-2,HP,16GB\nPC-3,Acer,4GB\nPC-3,Acer,4GB\n"
+        result = import_pcs(csv_upload(text), lab_id=self.lab.id, mode="upsert")
+        self.assertEqual(
+            {k: result[k] for k in ("created", "updated", "unchanged", "skipped")},
+            {"created": 1, "updated": 1, "unchanged": 1, "skipped": 1},
+        )
+        pc2 = PC.objects.get(lab=self.lab, device_name="PC-2")
+        self.assertEqual((pc2.brand, pc2.ram), ("HP", "16GB"))
+        # Columns missing from the file are left alone
+        self.assertEqual(PC.objects.get(lab=self.lab, device_name="PC-1").serial_number, "S1")
+
+    def test_upsert_equipment_reports_invalid_values(self):
+        LabEquipment.objects.create(lab=self.lab, equipment_code="EQ-1", name="Old", quantity=1)
+        text = "equipment_code,name,quantity,installation_date\nEQ-1,New,3,2024-05-01\nEQ-1,Again,4,\n"
+        result = import_lab_equipment(csv_upload(text), lab_id=self.lab.id, mode="upsert")
+        self.assertEqual((result["updated"], result["skipped"]), (1, 1))
+        equipment = LabEquipment.objects.get(lab=self.lab, equipment_code="EQ-1")
+        self.assertEqual((equipment.name, equipment.quantity, str(equipment.installation_date)), ("New", 3, "2024-05-01"))
+
+        result = import_lab_equipment(csv_upload("equipment_code,installation_date\nEQ-1,soon\n"), lab_id=self.lab.id, mode="upsert")
+        self.assertEqual(result["updated"], 0)
+        self.assertTrue(result["errors"][0].startswith("Row 2: ValidationError"))
+
+    def test_import_lab_equipment_batches_detail_rows(self):
+        rows = "\n".join(f"SW-{n},switch,10.0.0.{n}" for n in range(20))
+        # 12, plus 4 to book the chunk to InventorySummary (update, then create in a savepoint)
+        with self.assertNumQueries(16):
+            result = import_lab_equipment(csv_upload("code,type,ip\n" + rows), lab_id=self.lab.id)
+        self.assertEqual((result["created"], result["errors"]), (20, []))
+        self.assertEqual(NetworkEquipmentDetails.objects.filter(equipment__lab=self.lab).count(), 20)
+
+    def test_failed_batch_reports_rows_individually(self):
+        text = "code,type,ip,ports\nSW-1,switch,10.0.0.1,24\nSW-2,switch,10.0.0.2,-1\n"
+        result = import_lab_equipment(csv_upload(text), lab_id=self.lab.id)
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertTrue(result["errors"][0].startswith("Row 3 (NetworkDetails): IntegrityError"))
+        self.assertEqual(NetworkEquipmentDetails.objects.get().equipment.equipment_code, "SW-1")
+
+    def test_bad_dates_fail_their_rows_before_the_batch_write(self):
+        rows = "\n".join(f"EQ-{n},2024-01-{n % 28 + 1:02d},{n}" for n in range(20))
+        text = ("equipment_code,installation_date,power_rating,type,service_due_date\n"
+                "EQ-1,not-a-date,2kW,ac,\nEQ-2,2024-01-01 10:30:00,2kW,ac,someday\n")
+        with CaptureQueriesContext(connection) as clean:
+            import_lab_equipment(csv_upload("equipment_code,installation_date,type\n" + rows), lab_id=self.lab.id)
+        other = Lab.objects.create(name="Lab B")
+        with CaptureQueriesContext(connection) as bad:
+            result = import_lab_equipment(csv_upload(text), lab_id=other.id)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["errors"], [
+            "Row 2: ValidationError: installation_date 'not-a-date' is not a YYYY-MM-DD date.",
+            "Row 3 (ElectricalDetails): ValidationError: service_due_date 'someday' is not a YYYY-MM-DD date.",
+        ])
+        self.assertEqual(str(LabEquipment.objects.get(lab=other).installation_date), "2024-01-01")
+        self.assertFalse(ElectricalApplianceDetails.objects.exists())
+        # No savepoints to split a failing batch
+        self.assertLessEqual(len(bad), len(clean))
+
+    def test_streamed_xlsx_keeps_spreadsheet_row_numbers(self):
+        rows = [["PC Name", "Status"]] + [[f"PC-{n}", "working"] for n in range(5)] + [[None, "working"]]
+        result = import_pcs(xlsx_upload(rows), lab_id=self.lab.id, chunk_size=2)
+        self.assertEqual(result["created"], 5)
+        self.assertEqual(result["errors"], ["Row 7: PC device name is required"])
+
+    def test_commit_per_chunk_keeps_earlier_chunks(self):
+        real_import_pc_rows = importers.import_pc_rows
+        calls = []
+
+        def fail_on_second_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) > 1:
+                raise RuntimeError("worker died")
+            return real_import_pc_rows(*args, **kwargs)
+
+        for commit_per_chunk, expected in ((False, 0), (True, 2)):
+            calls.clear()
+            with mock.patch("labs.importers.import_pc_rows", side_effect=fail_on_second_chunk):
+                with self.assertRaises(RuntimeError):
+                    import_pcs(
+                        csv_upload("device_name\nPC-1\nPC-2\nPC-3\n"),
+                        lab_id=self.lab.id, chunk_size=2, commit_per_chunk=commit_per_chunk,
+                    )
+            self.assertEqual(PC.objects.filter(lab=self.lab).count(), expected)
+
+    def test_workbook_import_routes_sheets_and_lab_column(self):
+        PC.objects.create(lab=self.lab, device_name="PC-1")
+        upload = xlsx_upload(None, sheets={
+            "Lab A": [["PC Name", "Status"], ["PC-1", "working"], ["PC-2", "working"]],
+            "Lab B": [["Lab", "PC Name"], [None, "PC-1"], ["Lab C", "PC-1"], ["Lab C", None]],
+        })
+        result = run_import("pcs", upload, workbook=True, workers=2)
+        self.assertEqual((result["created"], result["skipped"]), (3, 1))
+        self.assertEqual(result["errors"], ["Sheet 'Lab B': Row 4: PC device name is required"])
+        self.assertEqual(
+            {name: counts["created"] for name, counts in result["labs"].items()},
+            {"Lab A": 1, "Lab B": 1, "Lab C": 1},
+        )
+        self.assertEqual(PC.objects.filter(lab__name="Lab C").count(), 1)
+
+        # lab_id sends every sheet to one lab
+        lab = Lab.objects.create(name="Lab D")
+        result = run_import("pcs", xlsx_upload(None, sheets={"X": [["device_name"], ["PC-9"]], "Y": [["device_name"], ["PC-9"]]}),
+                            lab_id=lab.id, workbook=True, workers=1)
+        self.assertEqual((result["created"], result["skipped"]), (1, 1))
+
+    def test_generated_equipment_codes_are_unique_across_sheets_and_imports(self):
+        header = ["equipment_code", "name", "equipment_type", "category"]
+        upload = xlsx_upload(None, sheets={
+            "X": [header, [None, "Fan", "FAN", "APPLIANCE"], [f"EQ-{self.lab.id}-0007", "AC", "AC", "APPLIANCE"]],
+            "Y": [header, [None, "Light", "LIGHT", "APPLIANCE"], [None, "Fan", "FAN", "APPLIANCE"]],
+        })
+        result = run_import("lab-equipment", upload, lab_id=self.lab.id, workbook=True)
+        self.assertEqual((result["created"], result["skipped"]), (4, 0))
+        result = import_lab_equipment(csv_upload("name,equipment_type\nRouter,ROUTER\n"), lab_id=self.lab.id)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(
+            sorted(LabEquipment.objects.filter(lab=self.lab).values_list("equipment_code", flat=True)),
+            [f"EQ-{self.lab.id}-{n:04d}" for n in range(7, 12)],
+        )
+
+        # A lab a dry run would create has no id yet
+        result = import_lab_equipment(csv_upload("name,equipment_type\nFan,FAN\n", name="New Lab.csv"), dry_run=True)
+        self.assertEqual(result["sample"][0]["equipment_code"], "EQ-NEW-0001")
+
+    def test_repeat_upload_returns_recorded_result_and_reuses_parse(self):
+        text = "device_name\nPC-1\nPC-2\n"
+        first = run_import("pcs", csv_upload(text), lab_id=self.lab.id)
+        self.assertEqual((first["created"], first["duplicate"]), (2, False))
+
+        with mock.patch("labs.importers.read_dataframes") as read:
+            repeat = run_import("pcs", csv_upload(text), lab_id=self.lab.id)
+            self.assertEqual((repeat["created"], repeat["duplicate"], repeat["import_id"]), (2, True, first["import_id"]))
+
+            # force imports again, from the cached parse of the first upload
+            forced = run_import("pcs", csv_upload(text), lab_id=self.lab.id, force=True)
+            read.assert_not_called()
+        self.assertEqual((forced["created"], forced["skipped"], forced["duplicate"]), (0, 2, False))
+        self.assertEqual(ImportRecord.objects.count(), 2)
+
+        # Same content in another mode is a different import
+        self.assertFalse(run_import("pcs", csv_upload(text), lab_id=self.lab.id, mode="upsert")["duplicate"])
+
+    def test_dry_run_projects_counts_without_writing(self):
+        PC.objects.create(lab=self.lab, device_name="PC-1")
+        text = "equipment_code,name,installation_date,type,ip\nEQ-1,Good,2024-01-01,switch,10.0.0.1\nEQ-2,Bad,not-a-date,,\nEQ-1,Again,,,\n"
+        # Lab and key lookups only, inside the usual savepoints
+        with self.assertNumQueries(6):
+            result = run_import("lab-equipment", csv_upload(text), lab_id=self.lab.id, dry_run=True)
+        self.assertEqual((result["created"], result["skipped"], result["dry_run"]), (1, 1, True))
+        self.assertTrue(result["errors"][0].startswith("Row 3: ValidationError"))
+        # The row with a bad date is left out before the sample is taken
+        self.assertEqual([row["row"] for row in result["sample"]], [2])
+        self.assertEqual(result["sample"][0]["equipment_type"], "SWITCH")
+        self.assertFalse(LabEquipment.objects.exists())
+        self.assertFalse(ImportRecord.objects.exists())
+
+        # Labs named after the file are not created by a dry run
+        result = run_import("pcs", csv_upload("device_name\nPC-1\n", name="new.csv"), dry_run=True)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(Lab.objects.count(), 1)
+
+    def test_bench_generator_covers_every_equipment_type(self):
+        header, rows = generate_rows("lab-equipment", 200, bad_ratio=0.2, seed=1)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(write_file(header, rows, "csv", directory), "rb") as handle:
+                result = import_lab_equipment(SimpleUploadedFile("bench.csv", handle.read()), lab_id=self.lab.id)
+        self.assertTrue(result["errors"])
+        types = set(LabEquipment.objects.filter(lab=self.lab).values_list("equipment_type", flat=True))
+        self.assertEqual(types, set(importers.ALLOWED_EQUIPMENT_TYPES))
+        self.assertTrue(NetworkEquipmentDetails.objects.filter(equipment__lab=self.lab).exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMPORT_CACHE_DIR=tempfile.mkdtemp())
+class ImportJobTests(TestCase):
+    def test_queued_job_runs_and_records_progress(self):
+        lab = Lab.objects.create(name="Lab A")
+        rows = "\n".join(f"PC-{n}" for n in range(5))
+        job = enqueue_import(csv_upload("device_name\n" + rows), "pcs", lab_id=lab.id, options={"chunk_size": 2})
+        self.assertEqual(job.status, "queued")
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(claim_next_job())
+        run_job(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual((job.total_rows, job.rows_processed, job.created_count), (5, 5, 5))
+        self.assertIsNotNone(job.rows_per_second)
+        self.assertFalse(job.file)
+
+    def test_enqueue_rejects_unknown_lab(self):
+        with self.assertRaises(ValueError):
+            enqueue_import(csv_upload("device_name\nPC-1\n"), "pcs", lab_id=999)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_import_endpoints_run_repeat_and_queue_uploads(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        lab = Lab.objects.create(name="Lab A")
+
+        def post(url, **fields):
+            return client.post(url, {"file": csv_upload("device_name\nPC-1\n"), "entity": "pcs", "lab_id": lab.id,
+                                     **fields})
+
+        # The upload is hashed once, for the ledger lookup and the record
+        with mock.patch("labs.importers.file_hash", wraps=importers.file_hash) as hashed:
+            response = post("/api/import/")
+        self.assertEqual((response.status_code, response.json()["created"]), (201, 1))
+        self.assertEqual(hashed.call_count, 1)
+
+        response = post("/api/labs/import/")
+        self.assertEqual((response.status_code, response.json()["duplicate"]), (200, True))
+        response = post("/api/labs/import/", force="true", background="true")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ImportJob.objects.get().pk, response.json()["job_id"])
+        self.assertEqual(client.post("/api/import/", {"entity": "pcs"}).status_code, 400)
+        for url in ("/api/import/", "/api/labs/import/"):
+            response = post(url, lab_id="abc")
+            self.assertEqual((response.status_code, response.json()), (400, {"detail": "lab_id must be an integer"}))
+
+    def test_import_endpoints_are_for_admins_only(self):
+        client = APIClient()
+        upload = {"file": csv_upload("name\nLab B\n"), "entity": "labs"}
+        self.assertEqual(client.post("/api/labs/import/", upload).status_code, 401)
+        client.force_authenticate(User.objects.create_user("student", password="x", role="student"))
+        for url in ("/api/import/", "/api/labs/import/"):
+            self.assertEqual(client.post(url, upload).status_code, 403)
+        self.assertFalse(Lab.objects.exists())
+
+
+@without_response_cache
+class PCApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+
+    def add_pcs(self, count, peripherals):
+        for n in range(count):
+            pc = PC.objects.create(lab=self.lab, device_name=f"PC-{PC.objects.count() + 1:02d}")
+            CPU.objects.create(pc=pc, model="i5")
+            OS.objects.create(pc=pc, name="Ubuntu")
+            Software.objects.create(pc=pc, name="Python")
+            for _ in range(peripherals):
+                Peripheral.objects.create(pc=pc, peripheral_type="mouse")
+
+    def test_pc_pages_cost_the_same_queries_however_much_is_nested(self):
+        self.add_pcs(2, peripherals=1)
+        # Validator (labs.conditional), page count, PCs joined with CPU and OS, peripherals, software
+        with self.assertNumQueries(5):
+            self.client.get("/api/pcs/")
+
+        self.add_pcs(20, peripherals=5)
+        PC.objects.create(lab=self.lab, device_name="PC-99")
+        with self.assertNumQueries(5):
+            response = self.client.get(f"/api/labs/{self.lab.id}/pcs/")
+        results = response.json()["results"]
+        self.assertEqual(len(results), 23)
+        self.assertEqual(len(results[-2]["peripheral_devices"]), 5)
+        self.assertEqual((results[0]["cpu"]["model"], results[-1]["cpu"]), ("i5", None))
+
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/api/pcs/{results[0]['id']}/")
+        self.assertEqual(response.json()["os"]["name"], "Ubuntu")
+
+    def test_list_filters_and_whitelisted_ordering(self):
+        self.add_pcs(3, peripherals=0)
+        PC.objects.filter(device_name="PC-02").update(status="not_working", gpu=True)
+        other = PC.objects.create(lab=Lab.objects.create(name="Lab B"), device_name="PC-00", status="not_working")
+
+        response = self.client.get("/api/pcs/", {"status": "NOT_WORKING", "ordering": "-device_name"})
+        self.assertEqual([pc["device_name"] for pc in response.json()["results"]], ["PC-02", "PC-00"])
+        response = self.client.get("/api/pcs/", {"lab": other.lab_id})
+        self.assertEqual([pc["id"] for pc in response.json()["results"]], [other.id])
+        response = self.client.get(f"/api/labs/{self.lab.id}/pcs/", {"gpu": "true"})
+        self.assertEqual([pc["device_name"] for pc in response.json()["results"]], ["PC-02"])
+
+        for params in ({"ordering": "serial_number"}, {"gpu": "maybe"}, {"status": "broken"}, {"lab": "x"}):
+            self.assertEqual(self.client.get("/api/pcs/", params).status_code, 400, params)
+
+    def test_every_whitelisted_filter_searches_an_index(self):
+        # Without ?lab= too, so each filter needs an index of its own
+        values = {"lab": self.lab.id, "status": "working", "brand": "Dell", "connected": "true", "gpu": "false",
+                  "equipment_type": "FAN", "category": "APPLIANCE", "is_networked": "true"}
+        for url, filters, table in (("/api/pcs/", PC_FILTERS, "labs_pc"),
+                                    ("/api/lab-equipment/", EQUIPMENT_FILTERS, "labs_labequipment")):
+            for param in filters:
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url, {param: values[param]})
+                for sql in [query["sql"] for query in queries.captured_queries if f'"{table}" WHERE' in query["sql"]]:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                        plan = [row[-1] for row in cursor.fetchall()]
+                    self.assertFalse([step for step in plan if step.startswith("SCAN")], param)
+
+    def test_sparse_fields_and_expand_narrow_the_query(self):
+        self.add_pcs(3, peripherals=2)
+        with self.assertNumQueries(3) as queries:
+            response = self.client.get("/api/pcs/", {"fields": "id,device_name,status"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "device_name", "status"})
+        self.assertNotIn("serial_number", queries.captured_queries[2]["sql"])
+
+        # Only the expanded relation is joined; peripherals and software are not fetched
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/pcs/", {"fields": "id", "expand": "cpu"})
+        self.assertEqual(response.json()["results"][0]["cpu"]["model"], "i5")
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/pcs/", {"expand": "peripheral_devices"})
+        self.assertNotIn("os", response.json()["results"][0])
+        self.assertEqual(len(response.json()["results"][0]["peripheral_devices"]), 2)
+
+        self.assertEqual(self.client.get("/api/pcs/", {"fields": "id,secret"}).status_code, 400)
+
+    def test_conditional_get_answers_304_until_something_changes(self):
+        self.add_pcs(2, peripherals=1)
+        url = f"/api/labs/{self.lab.id}/pcs/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content), (304, b""))
+        # A delete need not move the latest updated_at, so there is no date to compare
+        self.assertNotIn("Last-Modified", response)
+
+        # Nested rows count too, deletes included
+        Peripheral.objects.filter(pc__lab=self.lab).first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        PC.objects.filter(lab=self.lab).last().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time())).status_code, 200)
+        pc = PC.objects.first()
+        response = self.client.get(f"/api/pcs/{pc.id}/")
+        self.assertEqual(self.client.get(f"/api/pcs/{pc.id}/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+@without_response_cache
+class LabEquipmentApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+        for n in range(10):
+            switch = LabEquipment.objects.create(lab=self.lab, equipment_code=f"SW-{n}", name="Switch",
+                                                 equipment_type="SWITCH", category="INFRASTRUCTURE")
+            NetworkEquipmentDetails.objects.create(equipment=switch, ip_address=f"10.0.0.{n}")
+        server = LabEquipment.objects.create(lab=self.lab, equipment_code="SRV-1", name="Server",
+                                             equipment_type="SERVER", category="INFRASTRUCTURE")
+        ServerDetails.objects.create(equipment=server, cpu_model="Xeon")
+        fan = LabEquipment.objects.create(lab=self.lab, equipment_code="FAN-1", name="Fan",
+                                          equipment_type="FAN", category="APPLIANCE")
+        ElectricalApplianceDetails.objects.create(equipment=fan, power_rating="60W")
+
+    def test_list_joins_every_detail_subtable(self):
+        # Validator, page count and one joined select
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/labs/{self.lab.id}/lab-equipment/")
+        rows = {row["equipment_code"]: row for row in response.json()["results"]}
+        self.assertEqual(rows["SW-3"]["network_details"]["ip_address"], "10.0.0.3")
+        self.assertEqual((rows["FAN-1"]["network_details"], rows["FAN-1"]["electrical_details"]["power_rating"]),
+                         (None, "60W"))
+
+    def test_compact_list_keeps_matching_detail_blocks(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/lab-equipment/", {"compact": "true"})
+        rows = {row["equipment_code"]: row for row in response.json()["results"]}
+        self.assertNotIn("server_details", rows["SW-0"])
+        self.assertEqual(rows["SW-0"]["network_details"]["ip_address"], "10.0.0.0")
+        self.assertEqual((rows["SRV-1"]["server_details"]["cpu_model"], rows["SRV-1"]["network_details"]),
+                         ("Xeon", None))
+        self.assertEqual(set(rows["FAN-1"]) & {"network_details", "electrical_details"}, {"electrical_details"})
+
+@without_response_cache
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        pc = PC.objects.create(lab=Lab.objects.create(name="Lab A"), device_name="PC-01")
+        for n in range(7):
+            MaintenanceLog.objects.create(pc=pc, issue_description=f"Issue {n}")
+        # Ties on reported_on must be broken by id
+        MaintenanceLog.objects.filter(id__in=MaintenanceLog.objects.order_by("id").values("id")[:4]).update(
+            reported_on=MaintenanceLog.objects.order_by("id").first().reported_on
+        )
+
+    def test_cursor_pages_walk_both_ways_without_counting(self):
+        expected = list(MaintenanceLog.objects.order_by("-reported_on", "-id").values_list("id", flat=True))
+        url, seen, pages = "/api/maintenance/?pagination=cursor&page_size=3", [], []
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            self.assertNotIn("count", page)
+            seen += [row["id"] for row in page["results"]]
+            pages.append(page)
+            url = page["next"]
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(pages[-1]["previous"]).json()
+        self.assertEqual(previous["results"], pages[-2]["results"])
+        first = self.client.get(pages[1]["previous"]).json()
+        self.assertEqual((first["results"], first["previous"]), (pages[0]["results"], None))
+
+        self.assertEqual(self.client.get("/api/maintenance/?cursor=bogus").status_code, 404)
+        self.assertIn("count", self.client.get("/api/maintenance/").json())
+
+    def test_date_range_filters(self):
+        log = MaintenanceLog.objects.order_by("id").last()
+        MaintenanceLog.objects.filter(id=log.id).update(reported_on="2024-03-10T12:00:00Z", status="fixed",
+                                                        fixed_on="2024-03-12T09:00:00Z")
+        response = self.client.get("/api/maintenance/", {"reported_after": "2024-03-01", "reported_before": "2024-04-01"})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [log.id])
+        response = self.client.get("/api/maintenance/", {"status": "fixed", "fixed_before": "2024-03-12"})
+        self.assertEqual(response.json()["results"], [])
+
+    def test_sparse_fields_skip_large_text_columns(self):
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get("/api/maintenance/", {"pagination": "cursor", "fields": "id,status"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "status"})
+        self.assertNotIn("issue_description", queries.captured_queries[0]["sql"])
+        self.assertNotIn("remarks", queries.captured_queries[0]["sql"])
+
+        response = self.client.get("/api/lab-equipment/", {"compact": "true", "fields": "id,equipment_code"})
+        self.assertEqual(response.status_code, 200)
+
+
+@without_response_cache
+@override_settings(IMPORT_CACHE_DIR=tempfile.mkdtemp())
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab_a = Lab.objects.create(name="Lab A")
+        self.lab_b = Lab.objects.create(name="Lab B")
+        for lab, code, eq_type, quantity, status in (
+            (self.lab_a, "FAN-1", "FAN", 4, "working"),
+            (self.lab_a, "FAN-2", "FAN", 2, "under_repair"),
+            (self.lab_a, "SW-1", "SWITCH", 1, "not_working"),
+            (self.lab_b, "FAN-1", "FAN", 3, "working"),
+        ):
+            category = "APPLIANCE" if eq_type == "FAN" else "INFRASTRUCTURE"
+            LabEquipment.objects.create(lab=lab, equipment_code=code, name=code, equipment_type=eq_type,
+                                        category=category, quantity=quantity, status=status)
+
+    def test_inventory_is_one_summary_query(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/inventory/")
+        self.assertEqual(response.json()[0], {
+            "id": f"{self.lab_a.id}_FAN", "lab": self.lab_a.id, "lab_name": "Lab A", "equipment_type": "FAN",
+            "total_quantity": 6, "working_quantity": 4, "not_working_quantity": 0, "under_repair_quantity": 2,
+        })
+        self.assertEqual([row["id"] for row in response.json()],
+                         [f"{self.lab_a.id}_FAN", f"{self.lab_a.id}_SWITCH", f"{self.lab_b.id}_FAN"])
+
+    def test_inventory_filters_and_pagination(self):
+        response = self.client.get("/api/inventory/", {"category": "appliance", "page_size": 1})
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+        response = self.client.get("/api/inventory/", {"lab": self.lab_a.id, "equipment_type": "switch"})
+        self.assertEqual([row["total_quantity"] for row in response.json()], [1])
+        self.assertEqual(self.client.get("/api/inventory/", {"lab": "x"}).status_code, 400)
+
+    def summary(self, lab):
+        return {
+            (row.equipment_type, row.category): (row.total, row.working, row.not_working, row.under_repair)
+            for row in InventorySummary.objects.filter(lab=lab)
+        }
+
+    def test_summary_follows_saves_and_deletes(self):
+        fan = LabEquipment.objects.get(lab=self.lab_a, equipment_code="FAN-2")
+        fan.status = "working"
+        fan.quantity = 5
+        fan.save()
+        LabEquipment.objects.get(lab=self.lab_a, equipment_code="SW-1").delete()
+        self.assertEqual(self.summary(self.lab_a), {("FAN", "APPLIANCE"): (9, 9, 0, 0)})
+
+        fan.equipment_type = "LIGHT"
+        fan.save()
+        self.assertEqual(self.summary(self.lab_a), {("FAN", "APPLIANCE"): (4, 4, 0, 0),
+                                                    ("LIGHT", "APPLIANCE"): (5, 5, 0, 0)})
+        self.lab_b.delete()
+        self.assertEqual(inventory.verify(), [])
+
+    def test_imports_keep_summary_current_and_rebuild_repairs_drift(self):
+        upload = "equipment_code,name,equipment_type,category,quantity,status\n"
+        importers.import_lab_equipment(csv_upload(upload + "FAN-3,Fan,FAN,APPLIANCE,2,not_working\n"),
+                                       lab_id=self.lab_a.id)
+        importers.import_lab_equipment(csv_upload(upload + "FAN-1,Fan,FAN,APPLIANCE,4,not_working\n"),
+                                       lab_id=self.lab_a.id, mode="upsert")
+        self.assertEqual(self.summary(self.lab_a)[("FAN", "APPLIANCE")], (8, 0, 6, 2))
+        self.assertEqual(inventory.verify(), [])
+
+        InventorySummary.objects.filter(lab=self.lab_b).update(total=0)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_inventory_summary", "--verify-only", stdout=io.StringIO(), stderr=io.StringIO())
+        call_command("rebuild_inventory_summary", stdout=io.StringIO())
+        self.assertEqual(inventory.verify(), [])
+
+
+@override_settings(IMPORT_CACHE_DIR=tempfile.mkdtemp())
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+        self.pc = PC.objects.create(lab=self.lab, device_name="PC-01")
+
+    def test_reads_are_served_from_cache_until_a_write_bumps_the_version(self):
+        url = f"/api/labs/{self.lab.id}/pcs/"
+        hits = response_cache.cache_stats().get("hits", 0)
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual((response["X-Cache"], response.json()["results"][0]["device_name"]), ("HIT", "PC-01"))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        # Other query strings and other labs are cached separately
+        self.assertEqual(self.client.get(url, {"status": "working"})["X-Cache"], "MISS")
+        self.assertEqual(response_cache.cache_stats()["hits"], hits + 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pc.device_name = "PC-99"
+            self.pc.save()
+        response = self.client.get(url)
+        self.assertEqual((response["X-Cache"], response.json()["results"][0]["device_name"]), ("MISS", "PC-99"))
+
+    def test_imports_and_nested_rows_invalidate_the_lab(self):
+        url = f"/api/labs/{self.lab.id}/pcs/"
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            CPU.objects.create(pc=self.pc, model="i7")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+
+        self.client.get("/api/inventory/")
+        with self.captureOnCommitCallbacks(execute=True):
+            run_import("lab-equipment", csv_upload("equipment_code,name,equipment_type,category,quantity\n"
+                                                   "FAN-1,Fan,FAN,APPLIANCE,2\n"), lab_id=self.lab.id)
+        response = self.client.get("/api/inventory/")
+        self.assertEqual((response["X-Cache"], response.json()[0]["total_quantity"]), ("MISS", 2))
+
+        # Importers called directly (shell, bench_import, workbooks) book their writes too
+        self.client.get(url)
+        self.client.get("/api/labs/")
+        with self.captureOnCommitCallbacks(execute=True):
+            import_pcs(csv_upload("device_name\nPC-02\n"), lab_id=self.lab.id)
+            import_labs(csv_upload("name\nLab B\n"))
+            before_commit = timezone.now()
+        self.assertEqual([self.client.get(url)["X-Cache"], self.client.get("/api/labs/")["X-Cache"]], ["MISS", "MISS"])
+        # Stamped for delta sync when the import committed
+        self.assertGreater(PC.objects.get(device_name="PC-02").updated_at, before_commit)
+
+    def test_deletes_look_up_the_labs_of_nested_rows_once(self):
+        other = Lab.objects.create(name="Lab B")
+        pcs = [self.pc, PC.objects.create(lab=other, device_name="PC-02")]
+        for pc in pcs:
+            CPU.objects.create(pc=pc, model="i5")
+            for _ in range(3):
+                Peripheral.objects.create(pc=pc, peripheral_type="mouse")
+        urls = [f"/api/labs/{lab.id}/pcs/" for lab in (self.lab, other)]
+
+        def lab_lookups(delete):
+            for url in urls:
+                self.client.get(url)
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                delete()
+            return sum(query["sql"].startswith('SELECT "labs_pc"."lab_id"') for query in queries.captured_queries)
+
+        self.assertEqual(lab_lookups(Peripheral.objects.filter(pc__in=pcs).delete), 1)
+        self.assertEqual([self.client.get(url)["X-Cache"] for url in urls], ["MISS", "MISS"])
+        # Rows deleted with their lab are invalidated by the lab's own delete
+        self.assertEqual(lab_lookups(other.delete), 0)
+        self.assertEqual([self.client.get(url)["X-Cache"] for url in urls], ["HIT", "MISS"])
+
+
+class BulkWriteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+        self.other_lab = Lab.objects.create(name="Lab B")
+        self.pcs = [PC.objects.create(lab=self.lab, device_name=f"PC-{n:02d}") for n in range(1, 4)]
+
+    def test_creates_updates_and_deletes_in_one_request(self):
+        payload = {
+            "create": [{"lab": self.lab.id, "device_name": f"NEW-{n:02d}"} for n in range(60)],
+            "update": [{"id": self.pcs[0].id, "status": "not_working"},
+                       {"id": self.pcs[1].id, "lab": self.other_lab.id}],
+            "delete": [self.pcs[2].id],
+        }
+        # Labs, updated and deleted rows, the unique check, the delete with its cascade and sync tombstone (7),
+        # the update, the insert and the response rows (3): the same for 6 items or 600
+        with self.assertNumQueries(19):
+            response = self.client.post("/api/pcs/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["device_name"] for row in response.json()["created"]][:2], ["NEW-00", "NEW-01"])
+        self.assertEqual(response.json()["updated"][0]["status"], "not_working")
+        self.assertEqual(response.json()["deleted"], [self.pcs[2].id])
+        self.assertEqual(PC.objects.filter(lab=self.lab).count(), 61)
+        self.assertEqual(PC.objects.get(pk=self.pcs[1].id).lab, self.other_lab)
+
+    def test_any_invalid_item_rejects_the_whole_batch(self):
+        response = self.client.post("/api/pcs/bulk/", {
+            "create": [{"lab": self.lab.id, "device_name": "NEW-01"},
+                       {"lab": self.lab.id, "device_name": "PC-02"},
+                       {"lab": self.lab.id, "status": "broken"}],
+            "update": [{"id": self.pcs[0].id, "device_name": "X"}, {"id": 999}],
+            "delete": [self.pcs[0].id],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors["create"][0], {})
+        self.assertIn("non_field_errors", errors["create"][1])
+        self.assertEqual(set(errors["create"][2]), {"device_name", "status"})
+        self.assertEqual(errors["update"], [{}, {"id": ["Not found."]}])
+        self.assertEqual(errors["delete"], [{"id": ["Also listed in update."]}])
+        self.assertEqual(PC.objects.count(), 3)
+
+        # Items clashing with each other
+        response = self.client.post("/api/pcs/bulk/", {"create": [{"lab": self.lab.id, "device_name": "NEW-01"}] * 2},
+                                    format="json")
+        self.assertEqual(response.json()["create"][0], {})
+        self.assertIn("non_field_errors", response.json()["create"][1])
+
+        student = User.objects.create_user("student", password="x", role="student")
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.post("/api/pcs/bulk/", {"delete": []}, format="json").status_code, 403)
+
+    def test_equipment_batches_keep_inventory_and_cache_current(self):
+        fan = LabEquipment.objects.create(lab=self.lab, equipment_code="FAN-1", name="Fan", equipment_type="FAN",
+                                          category="APPLIANCE", quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/lab-equipment/bulk/", {
+                "create": [{"lab": self.lab.id, "equipment_code": "FAN-2", "name": "Fan", "equipment_type": "FAN",
+                            "category": "APPLIANCE", "quantity": 3}],
+                "update": [{"id": fan.id, "lab": self.other_lab.id}],
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(inventory.verify(), [])
+        self.assertEqual(InventorySummary.objects.get(lab=self.other_lab).total, 2)
+
+        response = self.client.post("/api/software/bulk/", {
+            "create": [{"pc": self.pcs[0].id, "name": "Python", "version": "3.12"},
+                       {"pc": self.pcs[0].id, "name": "Git"}],
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.pcs[0].installed_software.count(), 2)
+
+
+@without_response_cache
+class LabBundleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+
+    def add_lab(self, name, pcs):
+        lab = Lab.objects.create(name=name)
+        for n in range(pcs):
+            pc = PC.objects.create(lab=lab, device_name=f"PC-{n:02d}")
+            CPU.objects.create(pc=pc, model="i5")
+            Peripheral.objects.create(pc=pc, peripheral_type="mouse")
+        fan = LabEquipment.objects.create(lab=lab, equipment_code="FAN-1", name="Fan", equipment_type="FAN",
+                                          category="APPLIANCE", quantity=pcs)
+        MaintenanceLog.objects.create(lab_equipment=fan)
+        return lab
+
+    def test_bundle_holds_every_part_of_the_lab(self):
+        lab = self.add_lab("Lab A", pcs=2)
+        response = self.client.get(f"/api/labs/{lab.id}/bundle/")
+        bundle = response.json()
+        self.assertEqual((bundle["name"], len(bundle["pcs"])), ("Lab A", 2))
+        self.assertEqual(bundle["pcs"][0]["cpu"]["model"], "i5")
+        self.assertEqual([row["equipment_code"] for row in bundle["equipment"]], ["FAN-1"])
+        self.assertEqual(bundle["maintenance"], {"pending": 1, "fixed": 0})
+        self.assertEqual(bundle["inventory"][0]["total_quantity"], 2)
+
+        response = self.client.get(f"/api/labs/{lab.id}/bundle/", {"include": "pcs"})
+        self.assertEqual(set(response.json()) & {"pcs", "equipment", "maintenance", "inventory"}, {"pcs"})
+        self.assertEqual(self.client.get(f"/api/labs/{lab.id}/bundle/", {"include": "tickets"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/labs/999/bundle/").status_code, 404)
+
+    def test_fields_narrow_the_lab_but_not_its_parts(self):
+        lab = self.add_lab("Lab A", pcs=2)
+        for fields in ("id", "name"):
+            response = self.client.get(f"/api/labs/{lab.id}/bundle/", {"fields": fields})
+            self.assertEqual(response.status_code, 200)
+            bundle = response.json()
+            self.assertEqual(set(bundle), {fields, "pcs", "equipment", "maintenance", "inventory"})
+            self.assertEqual(bundle["pcs"][0]["cpu"]["model"], "i5")
+            self.assertEqual(bundle["equipment"][0]["lab"], lab.id)
+
+        response = self.client.get("/api/labs/bundles/", {"fields": "name", "include": "pcs"})
+        self.assertEqual([len(bundle["pcs"]) for bundle in response.json()], [2])
+
+    def test_many_bundles_cost_the_same_queries_as_one(self):
+        labs = [self.add_lab(f"Lab {n}", pcs=n) for n in range(1, 4)]
+        # Labs, PCs with CPU and OS, peripherals, software, equipment, maintenance counts, inventory
+        with self.assertNumQueries(7):
+            response = self.client.get("/api/labs/bundles/")
+        self.assertEqual([len(bundle["pcs"]) for bundle in response.json()], [1, 2, 3])
+
+        self.add_lab("Lab 4", pcs=10)
+        with self.assertNumQueries(7):
+            response = self.client.get("/api/labs/bundles/", {"ids": f"{labs[0].id},{labs[2].id}"})
+        self.assertEqual([bundle["name"] for bundle in response.json()], ["Lab 1", "Lab 3"])
+
+        response = self.client.get("/api/labs/bundles/", {"page_size": 2, "include": "maintenance"})
+        self.assertEqual((response.json()["count"], len(response.json()["results"])), (4, 2))
+
+
+@without_response_cache
+class FastPathTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+        for n in range(5):
+            pc = PC.objects.create(lab=self.lab, device_name=f"PC-{n:02d}", brand="Dell \u2028 «Ö»" if n else None,
+                                   connected=bool(n % 2))
+            if n != 2:
+                CPU.objects.create(pc=pc, model="i5", core_count=n or None)
+                OS.objects.create(pc=pc, name="Ubuntu", install_date=date(2024, 1, n + 1))
+            for kind in ("mouse", "monitor")[:n % 3]:
+                Peripheral.objects.create(pc=pc, peripheral_type=kind, model_name='"quoted"\n')
+            Software.objects.create(pc=pc, name="Python", expiry_date=date(2030, 5, 1) if n else None)
+        switch = LabEquipment.objects.create(lab=self.lab, equipment_code="SW-1", name="Switch",
+                                             equipment_type="SWITCH", category="INFRASTRUCTURE",
+                                             installation_date=date(2023, 7, 1))
+        NetworkEquipmentDetails.objects.create(equipment=switch, ip_address="10.0.0.1", number_of_ports=24)
+        LabEquipment.objects.create(lab=self.lab, equipment_code="FAN-1", name="Fan", equipment_type="FAN",
+                                    category="APPLIANCE", remarks="tab\there")
+
+    def fetch(self, url, params):
+        with override_settings(FAST_SERIALIZATION=True):
+            fast = self.client.get(url, params)
+        with override_settings(FAST_SERIALIZATION=False):
+            slow = self.client.get(url, params)
+        return fast, slow
+
+    def test_fast_lists_match_the_serializers_byte_for_byte(self):
+        cases = [
+            ("/api/pcs/", {}),
+            (f"/api/labs/{self.lab.id}/pcs/", {"ordering": "-device_name"}),
+            ("/api/pcs/", {"fields": "id,device_name", "expand": "os,installed_software"}),
+            ("/api/pcs/", {"pagination": "cursor", "page_size": 2}),
+            ("/api/lab-equipment/", {}),
+            (f"/api/labs/{self.lab.id}/lab-equipment/", {"status": "working"}),
+            ("/api/lab-equipment/", {"compact": "true"}),
+        ]
+        for url, params in cases:
+            fast, slow = self.fetch(url, params)
+            self.assertEqual(fast.status_code, 200, (url, params))
+            self.assertEqual(fast.content, slow.content, (url, params))
+            self.assertEqual(isinstance(fast.accepted_renderer, FastJSONRenderer), "compact" not in params)
+
+        # Later cursor pages too
+        first, _ = self.fetch("/api/pcs/", {"pagination": "cursor", "page_size": 2})
+        fast, slow = self.fetch(first.json()["next"], {})
+        self.assertEqual((fast.content, len(fast.json()["results"])), (slow.content, 2))
+
+    def test_fast_lists_cost_the_same_queries(self):
+        # Validator, page count, PCs joined with CPU and OS, peripherals, software
+        with self.assertNumQueries(5):
+            response = self.client.get(f"/api/labs/{self.lab.id}/pcs/")
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        with self.assertNumQueries(3):
+            self.client.get("/api/lab-equipment/")
+
+    def test_unsupported_serializers_are_refused(self):
+        for serializer in (LabEquipmentListSerializer(), InventorySerializer(), ImportJobSerializer()):
+            with self.assertRaises(fastpath.Unsupported):
+                fastpath.Plan(serializer)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {"when": timezone.now(), "day": date(2024, 2, 29), "n": 1, "text": "a\u2029b é", 3: [None, True]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, "application/json; indent=2"),
+                         JSONRenderer().render(data, "application/json; indent=2"))
+        with mock.patch.object(fastpath, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@without_response_cache
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user("staff", password="x", role="admin")
+        self.client.force_authenticate(self.admin)
+        self.lab = Lab.objects.create(name="Lab A")
+        self.pcs = [PC.objects.create(lab=self.lab, device_name=f"PC-{n:02d}") for n in range(5)]
+        self.mouse = Peripheral.objects.create(pc=self.pcs[0], peripheral_type="mouse")
+        Software.objects.create(pc=self.pcs[0], name="Python")
+        LabEquipment.objects.create(lab=self.lab, equipment_code="FAN-1", name="Fan", equipment_type="FAN",
+                                    category="APPLIANCE")
+        MaintenanceLog.objects.create(pc=self.pcs[1])
+        self.students = [User.objects.create_user(f"student{n}", password="x", role="student") for n in range(2)]
+        self.tickets = [Ticket.objects.create(student=student, pc=self.pcs[0], issue_description="Slow")
+                        for student in self.students]
+
+    def sync_all(self, since=None, **params):
+        """Rows and deletions of every page from since, and the cursor after them."""
+        changes, deleted = {}, {}
+        while True:
+            page = self.client.get("/api/sync/", {**params, **({"since": since} if since else {})}).json()
+            for name, rows in page["changes"].items():
+                changes.setdefault(name, []).extend(row["id"] for row in rows)
+            for name, ids in page["deleted"].items():
+                deleted.setdefault(name, []).extend(ids)
+            since = page["cursor"]
+            if not page["has_more"]:
+                return changes, deleted, since
+
+    def test_first_sync_pages_through_every_row_then_only_changes(self):
+        changes, deleted, cursor = self.sync_all(limit=2)
+        self.assertEqual(changes["pcs"], [pc.id for pc in self.pcs])
+        self.assertEqual({name: len(ids) for name, ids in changes.items()},
+                         {"pcs": 5, "peripherals": 1, "software": 1, "lab_equipment": 1, "maintenance": 1,
+                          "tickets": 2})
+        self.assertEqual(set(map(len, deleted.values())), {0})
+
+        # One keyset query per table and one for the tombstones, whatever the fleet size
+        with self.assertNumQueries(7):
+            page = self.client.get("/api/sync/", {"since": cursor}).json()
+        self.assertEqual(sum(map(len, page["changes"].values())), 0)
+
+        self.pcs[3].status = "not_working"
+        self.pcs[3].save()
+        mouse_id = self.mouse.id
+        self.mouse.delete()
+        self.lab.pcs.filter(pk=self.pcs[4].pk).delete()
+        changes, deleted, cursor = self.sync_all(since=page["cursor"])
+        self.assertEqual((changes["pcs"], changes["peripherals"]), ([self.pcs[3].id], []))
+        self.assertEqual((deleted["pcs"], deleted["peripherals"]), ([self.pcs[4].id], [mouse_id]))
+        row = self.client.get("/api/sync/", {"limit": 1}).json()["changes"]["pcs"][0]
+        # Flat rows: nested tables are synced on their own
+        self.assertEqual((row["id"], row["lab"], row["device_name"], "cpu" in row), (self.pcs[0].id, self.lab.id, "PC-00", False))
+
+        # Rows still settling are left for the next poll, and cursors inside that window are refused
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            pc = PC.objects.create(lab=self.lab, device_name="PC-99")
+            self.assertNotIn(pc.id, self.sync_all()[0]["pcs"])
+            self.assertEqual(self.client.get("/api/sync/", {"since": cursor}).status_code, 410)
+
+    def test_rows_are_stamped_when_their_transaction_commits(self):
+        cursor, mouse_id = self.sync_all()[2], self.mouse.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pcs[1].status = "not_working"
+            self.pcs[1].save()
+            # As if the transaction had started before the cursor was handed out
+            PC.objects.filter(pk=self.pcs[1].pk).update(updated_at=timezone.now() - timedelta(hours=1))
+            self.mouse.delete()
+            response = self.client.post("/api/pcs/bulk/", {
+                "create": [{"lab": self.lab.id, "device_name": "NEW-01"}],
+                "update": [{"id": self.pcs[2].id, "status": "not_working"}],
+            }, format="json")
+            before_commit = timezone.now()
+        self.assertFalse(PC.objects.filter(updated_at__lt=before_commit, pk__in=[
+            self.pcs[2].id, response.json()["created"][0]["id"]]).exists())
+        self.assertGreater(Tombstone.objects.get(object_id=mouse_id).deleted_at, before_commit)
+        changes, deleted, _ = self.sync_all(since=cursor)
+        self.assertIn(self.pcs[1].id, changes["pcs"])
+        self.assertEqual(deleted["peripherals"], [mouse_id])
+
+    def test_students_only_see_their_tickets(self):
+        self.client.force_authenticate(self.students[0])
+        changes, deleted, cursor = self.sync_all()
+        self.assertEqual(changes["tickets"], [self.tickets[0].id])
+        own_id = self.tickets[0].id
+        for ticket in self.tickets:
+            ticket.delete()
+        self.assertEqual(self.sync_all(since=cursor)[1]["tickets"], [own_id])
+
+    def test_a_cascade_writes_its_tombstones_in_one_insert(self):
+        cursor = self.sync_all()[2]
+        pc_ids = [pc.id for pc in self.pcs]
+        with CaptureQueriesContext(connection) as queries:
+            self.lab.delete()
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith('INSERT INTO "labs_tombstone"')]
+        self.assertEqual(len(inserts), 1)
+        deleted = self.sync_all(since=cursor)[1]
+        self.assertEqual(sorted(deleted["pcs"]), pc_ids)
+        self.assertEqual((len(deleted["peripherals"]), len(deleted["software"]), len(deleted["lab_equipment"])), (1, 1, 1))
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get("/api/sync/", {"since": "bogus"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/sync/", {"limit": "0"}).status_code, 400)
+        old = sync.encode_cursor({sync.DELETED: (timezone.now() - timedelta(days=31), None)})
+        self.assertEqual(self.client.get("/api/sync/", {"since": old}).status_code, 410)
+
+        Tombstone.objects.create(entity="pcs", object_id=1, deleted_at=timezone.now() - timedelta(days=31))
+        Tombstone.objects.create(entity="pcs", object_id=2)
+        call_command("prune_sync_tombstones", stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list("object_id", flat=True)), [2])
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        response_cache.response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", password="x", role="admin"))
+        self.lab = Lab.objects.create(name="Lab A")
+        Lab.objects.create(name="Lab B")
+        PC.objects.create(lab=self.lab, device_name="PC-01")
+        PC.objects.create(lab=self.lab, device_name="PC-02", status="not_working", connected=False)
+        fan = LabEquipment.objects.create(lab=self.lab, equipment_code="FAN-1", name="Fan", equipment_type="FAN",
+                                          category="APPLIANCE", status="under_repair")
+        MaintenanceLog.objects.create(lab_equipment=fan)
+
+    def test_stats_are_a_few_aggregate_queries_then_memoized(self):
+        # Labs, PCs, equipment, maintenance, tickets
+        with self.assertNumQueries(5):
+            stats = self.client.get("/api/stats/").json()
+        self.assertEqual(stats["totals"]["labs"], 2)
+        self.assertEqual(stats["totals"]["pcs"], {"total": 2, "working": 1, "not_working": 1,
+                                                  "connected": 1, "disconnected": 1})
+        self.assertEqual(stats["totals"]["equipment"], {"total": 1, "by_status": {"under_repair": 1},
+                                                        "by_type": {"FAN": 1}})
+        self.assertEqual(stats["totals"]["maintenance"]["opened_recently"], 1)
+        self.assertEqual([lab["pcs"]["total"] for lab in stats["labs"]], [2, 0])
+
+        with self.assertNumQueries(0):
+            self.client.get("/api/stats/")
+        # A write to any lab recomputes them
+        with self.captureOnCommitCallbacks(execute=True):
+            PC.objects.create(lab=self.lab, device_name="PC-03")
+        self.assertEqual(self.client.get("/api/stats/").json()["totals"]["pcs"]["total"], 3)
+        self.assertEqual(self.client.get("/api/stats/", {"days": "0"}).status_code, 400)
+
+        # So does a ticket write
+        student = User.objects.create_user("student", password="x", role="student")
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(student=student, pc=PC.objects.first(), issue_description="Slow")
+        self.assertEqual(self.client.get("/api/stats/").json()["totals"]["tickets"]["open"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertEqual(self.client.get("/api/stats/").json()["totals"]["tickets"]["open"], 0)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"n": len(calls)}
+
+        threads = [threading.Thread(target=response_cache.memoize, args=("test-flight", 30, compute))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+class EventTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("staff", password="x", role="admin")
+        self.student = User.objects.create_user("student", password="x", role="student")
+        self.labs = [Lab.objects.create(name=name) for name in ("Lab A", "Lab B")]
+        self.pcs = [PC.objects.create(lab=lab, device_name=f"PC-{lab.pk}") for lab in self.labs]
+
+    def committed(self, write, *args, **kwargs):
+        """write(*args, **kwargs), with its on_commit callbacks run as if its transaction committed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return write(*args, **kwargs)
+
+    def change(self, obj, **values):
+        for name, value in values.items():
+            setattr(obj, name, value)
+        self.committed(obj.save)
+
+    async def next_event(self, content):
+        """The next event of a stream, skipping comments and the retry line."""
+        while True:
+            chunk = (await asyncio.wait_for(anext(content), 5)).decode()
+            if chunk.startswith("id:"):
+                _, event, data = (line.split(": ", 1)[1] for line in chunk.strip().split("\n"))
+                return event, json.loads(data)
+
+    async def test_hub_filters_by_lab_and_ticket_owner(self):
+        hub = events.Hub(backlog=10)
+        lab_a = hub.subscribe({self.labs[0].pk}, self.student, queue_size=10)
+        everything = hub.subscribe(None, self.admin, queue_size=10)
+        hub.publish("pc.status", {"id": 1}, lab=self.labs[1].pk)
+        hub.publish("ticket.status", {"id": 2}, lab=self.labs[0].pk, owner=self.admin.pk)
+        hub.publish("ticket.status", {"id": 3}, lab=self.labs[0].pk, owner=self.student.pk)
+        await asyncio.sleep(0)
+        self.assertEqual([lab_a.queue.get_nowait().data["id"]], [3])
+        self.assertEqual([everything.queue.get_nowait().data["id"] for _ in range(3)], [1, 2, 3])
+
+    async def test_slow_subscriber_is_closed_and_replayed_from_its_last_event(self):
+        hub = events.Hub(backlog=5)
+        subscriber = hub.subscribe(None, self.admin, queue_size=2)
+        first = hub.publish("pc.status", {"id": 1})
+        for n in range(2, 5):
+            hub.publish("pc.status", {"id": n})
+        await asyncio.sleep(0)
+        # The full queue is dropped for the marker closing the stream
+        self.assertEqual([subscriber.queue.get_nowait()], [None])
+
+        again = hub.subscribe(None, self.admin, queue_size=10, last_event_id=first.id)
+        self.assertEqual([again.queue.get_nowait().data["id"] for _ in range(3)], [2, 3, 4])
+        for n in range(5, 9):
+            hub.publish("pc.status", {"id": n})
+        # Event 2 is no longer kept, nor is an id from another process
+        for last_event_id in (first.id, "0000.1"):
+            late = hub.subscribe(None, self.admin, queue_size=10, last_event_id=last_event_id)
+            self.assertEqual(late.queue.get_nowait().type, events.RESET)
+
+    async def test_stream_pushes_changes_in_the_subscribed_labs(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.student)))()
+        response = await self.async_client.get("/api/events/", {"lab": self.labs[0].pk, "access_token": token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(content), b"retry: 3000\n\n")
+            await sync_to_async(self.change)(self.pcs[1], status="not_working")
+            await sync_to_async(self.change)(self.pcs[0], connected=False)
+            event, data = await self.next_event(content)
+            self.assertEqual(event, "pc.status")
+            self.assertEqual((data["id"], data["connected"], data["previous"]),
+                             (self.pcs[0].pk, False, {"status": "working", "connected": True}))
+
+            log = await sync_to_async(self.committed)(MaintenanceLog.objects.create, pc=self.pcs[0])
+            await sync_to_async(self.change)(log, status="fixed")
+            self.assertEqual((await self.next_event(content))[0], "maintenance.created")
+            self.assertEqual((await self.next_event(content))[0], "maintenance.fixed")
+
+            ticket = await sync_to_async(Ticket.objects.create)(student=self.student, pc=self.pcs[0],
+                                                                issue_description="No network")
+            await sync_to_async(self.change)(ticket, status="in_progress")
+            self.assertEqual(await self.next_event(content), ("ticket.status", {
+                "id": ticket.pk, "lab": self.labs[0].pk, "pc": self.pcs[0].pk,
+                "status": "in_progress", "previous_status": "open",
+            }))
+        finally:
+            await content.aclose()
+
+    async def test_stream_needs_authentication_and_lab_ids(self):
+        response = await self.async_client.get("/api/events/")
+        self.assertEqual(response.status_code, 401)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get("/api/events/", {"lab": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_is_not_served_over_wsgi(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get("/api/events/").status_code, 501)
@@ -8,12 +8,15 @@ urlpatterns = [
     
     # Labs
     path('labs/', views.LabList.as_view(), name='lab-list'),
+    path('labs/bundles/', views.LabBundleList.as_view(), name='lab-bundle-list'),
     path('labs/<int:pk>/', views.LabDetail.as_view(), name='lab-detail'),
+    path('labs/<int:pk>/bundle/', views.LabBundle.as_view(), name='lab-bundle'),
     path('labs/<int:lab_id>/pcs/', views.LabPCList.as_view(), name='lab-pc-list'),
     path('labs/<int:lab_id>/lab-equipment/', views.LabLabEquipmentList.as_view(), name='lab-lab-equipment-list'),
     
     # PCs
     path('pcs/', views.PCList.as_view(), name='pc-list'),
+    path('pcs/bulk/', views.PCBulk.as_view(), name='pc-bulk'),
     path('pcs/<int:pk>/', views.PCDetail.as_view(), name='pc-detail'),
     path('pcs/<int:pc_id>/peripherals/', views.PCPeripheralList.as_view(), name='pc-peripheral-list'),
     
@@ -27,14 +30,17 @@ urlpatterns = [
     
     # Peripherals
     path('peripherals/', views.PeripheralList.as_view(), name='peripheral-list'),
+    path('peripherals/bulk/', views.PeripheralBulk.as_view(), name='peripheral-bulk'),
     path('peripherals/<int:pk>/', views.PeripheralDetail.as_view(), name='peripheral-detail'),
     
     # Software
     path('software/', views.SoftwareList.as_view(), name='software-list'),
+    path('software/bulk/', views.SoftwareBulk.as_view(), name='software-bulk'),
     path('software/<int:pk>/', views.SoftwareDetail.as_view(), name='software-detail'),
     
     # Lab Equipment (unified for non-PC hardware)
     path('lab-equipment/', views.LabEquipmentList.as_view(), name='lab-equipment-list'),
+    path('lab-equipment/bulk/', views.LabEquipmentBulk.as_view(), name='lab-equipment-bulk'),
     path('lab-equipment/<int:pk>/', views.LabEquipmentDetail.as_view(), name='lab-equipment-detail'),
     
     # Lab Equipment Detail Subtables
@@ -52,9 +58,20 @@ urlpatterns = [
     path('maintenance/<int:pk>/', views.MaintenanceLogDetail.as_view(), name='maintenance-log-detail'),
     
     # Inventory (dynamic calculation)
-    path('inventory/', views.inventory_list, name='inventory-list'),
+    path('inventory/', views.InventoryList.as_view(), name='inventory-list'),
+    
+    # Dashboard statistics
+    path('stats/', views.stats_api, name='stats'),
+
+    # Delta sync
+    path('sync/', views.sync_api, name='sync'),
+
+    # Live events (server-sent, ASGI only)
+    path('events/', views.events_api, name='events'),
     
     # Utility endpoints
     path('redirect-after-login/', views.redirect_after_login, name='redirect-after-login'),
     path('labs/import/', views.import_data_api, name='labs-import'),
+    path('import/jobs/', views.ImportJobList.as_view(), name='import-job-list'),
+    path('import/jobs/<int:pk>/', views.ImportJobDetail.as_view(), name='import-job-detail'),
 ]
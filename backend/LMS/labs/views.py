@@ -4,14 +4,15 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from django.conf import settings
 from django.db.models import Count, Q
-from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 
 from .models import (
     User, Lab, PC, CPU, OS, Peripheral, Software,
     LabEquipment, NetworkEquipmentDetails, ServerDetails,
-    ProjectorDetails, ElectricalApplianceDetails, MaintenanceLog
+    ProjectorDetails, ElectricalApplianceDetails, MaintenanceLog, ImportJob, InventorySummary
 )
 from .serializers import (
     UserSerializer, LabSerializer, PCSerializer, CPUSerializer, OSSerializer,
@@ -19,10 +20,21 @@ from .serializers import (
     LabEquipmentSerializer, LabEquipmentListSerializer,
     NetworkEquipmentDetailsSerializer, ServerDetailsSerializer,
     ProjectorDetailsSerializer, ElectricalApplianceDetailsSerializer,
-    MaintenanceLogSerializer
+    MaintenanceLogSerializer, ImportJobSerializer, InventorySerializer
 )
-from .permissions import IsAdminOrReadOnly, AllowAuthenticatedReadAndCreateElseAdmin
-from .importers import import_labs, import_pcs, import_lab_equipment
+from .pagination import OptionalCursorPagination, OptionalPageNumberPagination
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin
+from .prefetching import EagerLoadingMixin
+from .fastpath import FastListMixin, use_fast_renderer
+from .filtering import FilterMixin
+from .bulk import BulkWriteView
+from .bundles import build_bundles, requested_parts
+from .stats import fleet_stats
+from .sync import changes_since, decode_cursor
+from . import events, inventory
+from .permissions import IsAdminOrReadOnly, IsAdminUser, AllowAuthenticatedReadAndCreateElseAdmin
+from .importers import handle_import_request, parse_bool
 
 
 # ===============================
@@ -41,37 +53,113 @@ class UserDetail(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminOrReadOnly]
 
 
-class LabList(generics.ListCreateAPIView):
+class LabList(CachedResponseMixin, ConditionalGetMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Lab.objects.all()
     serializer_class = LabSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_scopes = ("labs",)
 
 
-class LabDetail(generics.RetrieveUpdateDestroyAPIView):
+class LabDetail(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Lab.objects.all()
     serializer_class = LabSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
+class LabBundle(CachedResponseMixin, generics.GenericAPIView):
+    """
+    GET one lab with its PCs, equipment, maintenance counts and inventory
+    rows (see labs.bundles). ?include=pcs,inventory picks the parts.
+    """
+    queryset = Lab.objects.all()
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get_cache_scopes(self):
+        return ("labs", f"lab:{self.kwargs['pk']}")
+
+    def get(self, request, *args, **kwargs):
+        bundles = build_bundles([self.get_object()], requested_parts(request), self.get_serializer_context())
+        return Response(bundles[0])
+
+
+class LabBundleList(CachedResponseMixin, generics.GenericAPIView):
+    """
+    GET bundles of many labs: ?ids=1,2,3, or every lab. Paginated over labs
+    only when ?page= or ?page_size= is given.
+    """
+    queryset = Lab.objects.order_by('name')
+    permission_classes = [IsAdminOrReadOnly]
+    pagination_class = OptionalPageNumberPagination
+    cache_scopes = ("labs", "all")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        ids = self.request.query_params.get('ids')
+        if ids:
+            ids = [value.strip() for value in ids.split(',') if value.strip()]
+            if not all(value.isdigit() for value in ids):
+                raise ValidationError({'ids': 'Must be a comma-separated list of lab ids.'})
+            queryset = queryset.filter(pk__in=ids)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        labs = self.get_queryset()
+        page = self.paginate_queryset(labs)
+        bundles = build_bundles(list(labs if page is None else page), requested_parts(request),
+                                self.get_serializer_context())
+        if page is not None:
+            return self.get_paginated_response(bundles)
+        return Response(bundles)
+
+
 # ===============================
 # PC Views
 # ===============================
 
-class PCList(generics.ListCreateAPIView):
+# ?param= -> lookup; each is backed by an index on PC, with or without ?lab= (see FilterMixin)
+PC_FILTERS = {
+    'lab': 'lab', 'status': 'status', 'brand': 'brand',
+    'connected': 'connected', 'gpu': 'gpu',
+}
+PC_ORDERING = ('device_name', 'status')
+
+
+class PCList(ConditionalGetMixin, FastListMixin, FilterMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = PC.objects.all()
     serializer_class = PCSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('device_name', 'id')
+    filter_fields = PC_FILTERS
+    ordering_fields = PC_ORDERING
+
+
+class PCBulk(BulkWriteView):
+    """POST create/update/delete lists of PCs in one transaction (see labs.bulk)."""
+    queryset = PC.objects.all()
+    serializer_class = PCSerializer
+
+    def after_write(self, created, updated):
+        super().after_write(created, updated)
+        # bulk_update sends no signals; publish the status changes here
+        for obj in updated:
+            events.pc_status_changed(obj, {'status': obj._before.status, 'connected': obj._before.connected})
 
 
-class PCDetail(generics.RetrieveUpdateDestroyAPIView):
+class PCDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = PC.objects.all()
     serializer_class = PCSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class LabPCList(generics.ListCreateAPIView):
+class LabPCList(CachedResponseMixin, ConditionalGetMixin, FastListMixin, FilterMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = PCSerializer
     permission_classes = [IsAdminOrReadOnly]
+    filter_fields = {param: lookup for param, lookup in PC_FILTERS.items() if param != 'lab'}
+    ordering_fields = PC_ORDERING
+
+    def get_cache_scopes(self):
+        return (f"lab:{self.kwargs['lab_id']}",)
 
     def get_queryset(self):
         lab_id = self.kwargs['lab_id']
@@ -122,12 +210,17 @@ class OSDetail(generics.RetrieveUpdateDestroyAPIView):
 # Peripheral Views (OneToMany with PC)
 # ===============================
 
-class PeripheralList(generics.ListCreateAPIView):
+class PeripheralList(EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Peripheral.objects.all()
     serializer_class = PeripheralSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
+class PeripheralBulk(BulkWriteView):
+    queryset = Peripheral.objects.all()
+    serializer_class = PeripheralSerializer
+
+
 class PeripheralDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = Peripheral.objects.all()
     serializer_class = PeripheralSerializer
@@ -155,10 +248,17 @@ class PCPeripheralList(generics.ListCreateAPIView):
 # Software Views
 # ===============================
 
-class SoftwareList(generics.ListCreateAPIView):
+class SoftwareList(EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = Software.objects.all()
     serializer_class = SoftwareSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('name', 'id')
+
+
+class SoftwareBulk(BulkWriteView):
+    queryset = Software.objects.all()
+    serializer_class = SoftwareSerializer
 
 
 class SoftwareDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -171,21 +271,63 @@ class SoftwareDetail(generics.RetrieveUpdateDestroyAPIView):
 # Lab Equipment Views
 # ===============================
 
-class LabEquipmentList(generics.ListCreateAPIView):
+# ?param= -> lookup; each is backed by an index on LabEquipment, with or without ?lab=
+EQUIPMENT_FILTERS = {
+    'lab': 'lab', 'status': 'status', 'equipment_type': 'equipment_type',
+    'category': 'category', 'brand': 'brand', 'is_networked': 'is_networked',
+}
+EQUIPMENT_ORDERING = ('equipment_code', 'equipment_type', 'status')
+
+
+class CompactListMixin:
+    """
+    ?compact=true on a GET lists with LabEquipmentListSerializer, which only
+    includes the detail block matching each row's equipment_type.
+    """
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and parse_bool(self.request.query_params.get('compact')):
+            return LabEquipmentListSerializer
+        return super().get_serializer_class()
+
+
+class LabEquipmentList(ConditionalGetMixin, CompactListMixin, FastListMixin, FilterMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = LabEquipment.objects.all()
     serializer_class = LabEquipmentSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('equipment_code', 'id')
+    filter_fields = EQUIPMENT_FILTERS
+    ordering_fields = EQUIPMENT_ORDERING
+
+
+class LabEquipmentBulk(BulkWriteView):
+    queryset = LabEquipment.objects.all()
+    serializer_class = LabEquipmentSerializer
 
+    def after_write(self, created, updated):
+        super().after_write(created, updated)
+        # bulk_create/bulk_update send no signals; keep InventorySummary current here
+        if updated:
+            inventory.refresh_labs(self.changed_labs(created, updated))
+        elif created:
+            inventory.add_equipment(created)
 
-class LabEquipmentDetail(generics.RetrieveUpdateDestroyAPIView):
+
+class LabEquipmentDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LabEquipment.objects.all()
     serializer_class = LabEquipmentSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class LabLabEquipmentList(generics.ListCreateAPIView):
+class LabLabEquipmentList(CachedResponseMixin, ConditionalGetMixin, CompactListMixin, FastListMixin, FilterMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = LabEquipmentSerializer
     permission_classes = [IsAdminOrReadOnly]
+    filter_fields = {param: lookup for param, lookup in EQUIPMENT_FILTERS.items() if param != 'lab'}
+    ordering_fields = EQUIPMENT_ORDERING
+
+    def get_cache_scopes(self):
+        return (f"lab:{self.kwargs['lab_id']}",)
 
     def get_queryset(self):
         lab_id = self.kwargs['lab_id']
@@ -256,9 +398,17 @@ class ElectricalApplianceDetailsDetail(generics.RetrieveUpdateDestroyAPIView):
 # Maintenance Log Views
 # ===============================
 
-class MaintenanceLogList(generics.ListCreateAPIView):
+class MaintenanceLogList(FilterMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     serializer_class = MaintenanceLogSerializer
     permission_classes = [AllowAuthenticatedReadAndCreateElseAdmin]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-reported_on', '-id')
+    filter_fields = {
+        'lab': 'lab', 'status': 'status', 'pc': 'pc', 'lab_equipment': 'lab_equipment',
+        'reported_after': 'reported_on__gte', 'reported_before': 'reported_on__lt',
+        'fixed_after': 'fixed_on__gte', 'fixed_before': 'fixed_on__lt',
+    }
+    ordering_fields = ('reported_on', 'fixed_on', 'status')
 
     def get_queryset(self):
         return MaintenanceLog.objects.all()
@@ -291,47 +441,141 @@ class MaintenanceLogDetail(generics.RetrieveUpdateDestroyAPIView):
 
 
 # ===============================
-# Inventory API (Dynamic calculation)
+# Inventory API (served from InventorySummary)
+# ===============================
+
+class InventoryList(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
+    """
+    Equipment quantities per lab and equipment type, read from the
+    InventorySummary table (see labs.inventory) in one query.
+    Filters: ?lab=<id>, ?equipment_type=<TYPE>, ?category=<CATEGORY>.
+    Paginated only when ?page= or ?page_size= is given. Answers conditional
+    GETs with 304 (see labs.conditional) and serves repeated reads from
+    labs.response_cache.
+    """
+    serializer_class = InventorySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = OptionalPageNumberPagination
+
+    def get_cache_scopes(self):
+        # lab_name comes from Lab
+        lab = self.request.query_params.get('lab')
+        return ("labs", f"lab:{lab}") if lab else ("labs", "all")
+
+    def get_summary_rows(self):
+        params = self.request.query_params
+        queryset = InventorySummary.objects.all()
+
+        lab = params.get('lab')
+        if lab:
+            if not lab.isdigit():
+                raise ValidationError({'lab': 'Must be a lab id.'})
+            queryset = queryset.filter(lab_id=lab)
+        if params.get('equipment_type'):
+            queryset = queryset.filter(equipment_type=params['equipment_type'].upper())
+        if params.get('category'):
+            queryset = queryset.filter(category=params['category'].upper())
+        return queryset
+
+    def get_validator_querysets(self):
+        rows = self.get_summary_rows()
+        # lab_name comes from Lab
+        return [rows, Lab.objects.filter(pk__in=rows.values('lab'))]
+
+    def get_queryset(self):
+        return inventory.per_type(self.get_summary_rows())
+
+
+# ===============================
+# Import Jobs (background imports)
+# ===============================
+
+class ImportJobList(generics.ListAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAdminUser]
+
+
+class ImportJobDetail(generics.RetrieveAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAdminUser]
+
+
+# ===============================
+# Dashboard statistics
+# ===============================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stats_api(request):
+    """
+    Fleet-wide and per-lab counters for the dashboard (see labs.stats).
+    ?days= sets the window of the recent maintenance activity (default 7).
+    """
+    days = request.query_params.get('days', '7')
+    if not days.isdigit() or not 1 <= int(days) <= 365:
+        raise ValidationError({'days': 'Must be a number of days between 1 and 365.'})
+    return Response(fleet_stats(int(days)))
+
+
+# ===============================
+# Delta sync
 # ===============================
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def inventory_list(request):
-    from rest_framework import serializers as rf_serializers
-    
-    class InventorySerializer(rf_serializers.Serializer):
-        id = rf_serializers.CharField(read_only=True)
-        lab = rf_serializers.IntegerField()
-        lab_name = rf_serializers.CharField()
-        equipment_type = rf_serializers.CharField()
-        total_quantity = rf_serializers.IntegerField()
-        working_quantity = rf_serializers.IntegerField()
-        not_working_quantity = rf_serializers.IntegerField()
-        under_repair_quantity = rf_serializers.IntegerField()
-    
-    labs = Lab.objects.all()
-    inventory_data = []
-
-    for lab in labs:
-        equipment_in_lab = LabEquipment.objects.filter(lab=lab)
-        equipment_types = equipment_in_lab.values_list('equipment_type', flat=True).distinct()
-
-        for eq_type in equipment_types:
-            eq_of_type = equipment_in_lab.filter(equipment_type=eq_type)
-
-            inventory_data.append({
-                'id': f"{lab.id}_{eq_type}",
-                'lab': lab.id,
-                'lab_name': lab.name,
-                'equipment_type': eq_type,
-                'total_quantity': sum(eq_of_type.values_list('quantity', flat=True)),
-                'working_quantity': sum(eq_of_type.filter(status='working').values_list('quantity', flat=True)),
-                'not_working_quantity': sum(eq_of_type.filter(status='not_working').values_list('quantity', flat=True)),
-                'under_repair_quantity': sum(eq_of_type.filter(status='under_repair').values_list('quantity', flat=True)),
-            })
-
-    serializer = InventorySerializer(inventory_data, many=True)
-    return Response(serializer.data)
+def sync_api(request):
+    """
+    Rows created, updated and deleted since ?since= (a cursor from an
+    earlier response), or every row without it (see labs.sync). ?limit=
+    caps the rows per table (default SYNC_PAGE_SIZE).
+    """
+    limit = request.query_params.get('limit', str(settings.SYNC_PAGE_SIZE))
+    if not limit.isdigit() or not 1 <= int(limit) <= 1000:
+        raise ValidationError({'limit': 'Must be a number between 1 and 1000.'})
+    since = request.query_params.get('since')
+    positions = decode_cursor(since) if since else None
+    data = changes_since(positions, request.user, int(limit), {'request': request})
+    use_fast_renderer(request)
+    return Response(data)
+
+
+# ===============================
+# Live events
+# ===============================
+
+async def events_api(request):
+    """
+    Server-sent events of PC status, maintenance and ticket changes (see
+    labs.events), for the labs in ?lab=1,2 or all of them. Authenticated by
+    session, Authorization header or ?access_token=.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Method not allowed"}, status=405)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the stream stays open
+        return JsonResponse({"detail": "Live events are only served over ASGI."}, status=501)
+
+    user = await events.authenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    labs = None
+    if request.GET.get("lab"):
+        values = [value.strip() for value in request.GET["lab"].split(",")]
+        if not all(value.isdigit() for value in values):
+            return JsonResponse({"lab": "Must be lab ids separated by commas."}, status=400)
+        labs = {int(value) for value in values}
+
+    response = StreamingHttpResponse(
+        events.stream(labs, user, request.headers.get("Last-Event-ID")),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stops nginx buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 # ===============================
@@ -354,43 +598,9 @@ def redirect_after_login(request):
 # Import API
 # ===============================
 
-@csrf_exempt
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
 def import_data_api(request):
-    if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
-
-    file = request.FILES.get("file")
-    entity = request.POST.get("entity")
-
-    if not file or not entity:
-        return JsonResponse(
-            {"detail": "file and entity are required (labs | pcs | lab-equipment)"},
-            status=400,
-        )
-
-    try:
-        if entity == "labs":
-            created, skipped, errors = import_labs(file)
-        elif entity == "pcs":
-            result = import_pcs(file)
-            created = result['created']
-            skipped = result['skipped']
-            errors = result['errors']
-        elif entity == "lab-equipment":
-            created, skipped, errors = import_lab_equipment(file)
-        else:
-            return JsonResponse({"detail": "Invalid entity"}, status=400)
-
-        return JsonResponse(
-            {
-                "status": "success",
-                "entity": entity,
-                "created": created,
-                "skipped": skipped,
-                "errors": errors,
-            },
-            status=201,
-        )
-
-    except Exception as e:
-        return JsonResponse({"detail": str(e)}, status=500)
+    """The bulk import of POST /api/import/ (BulkImportAPIView), for admins only."""
+    data, code = handle_import_request(request.data, request.FILES, request.user)
+    return Response(data, status=code)
@@ -0,0 +1,59 @@
+"""
+Sheet parsing for workbook imports.
+
+This module has no Django imports so it can be loaded by worker processes
+started with the spawn method. Sheets are parsed there in parallel; all
+database work stays in the importing process (see importers.import_workbook).
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl import load_workbook
+
+
+# Workbook bytes, sent once to each worker process by the pool initializer
+_content = None
+
+
+def sheet_names(content):
+    """Names of the worksheets in an XLSX file, in workbook order."""
+    workbook = load_workbook(io.BytesIO(content), read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def _init_worker(content):
+    global _content
+    _content = content
+
+
+def read_sheet(sheet_name, content=None):
+    """Parse one worksheet into a DataFrame."""
+    return pd.read_excel(io.BytesIO(_content if content is None else content), sheet_name=sheet_name)
+
+
+def read_sheets(content, names, workers=None):
+    """
+    Yield (sheet_name, DataFrame) in workbook order. With more than one
+    worker, sheets are parsed concurrently on a process pool and yielded as
+    soon as each one (and every sheet before it) is ready.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    if workers <= 1:
+        for name in names:
+            yield name, read_sheet(name, content)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn is safe from threaded callers (e.g. the import worker)
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(content,),
+    ) as pool:
+        yield from zip(names, pool.map(read_sheet, names))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0007_cursor_pagination_indexes'),
+        ('tickets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_at', 'id'], name='tickets_tic_created_8f9e5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['student', 'created_at', 'id'], name='tickets_tic_student_a00615_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 05:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0009_sync_indexes_and_tombstones'),
+        ('tickets', '0002_cursor_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['updated_at', 'id'], name='tickets_tic_updated_a117e3_idx'),
+        ),
+    ]
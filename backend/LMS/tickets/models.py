@@ -9,6 +9,13 @@ class Ticket(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Back the cursor ordering of TicketListView, for admins and per student
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['student', 'created_at', 'id']),
+            models.Index(fields=['updated_at', 'id']),  # delta sync (labs.sync)
+        ]
 
     def __str__(self):
         return f"Ticket #{self.id} - {self.pc.device_name} - {self.status}"
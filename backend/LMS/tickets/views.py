@@ -1,4 +1,5 @@
 from rest_framework import generics, permissions
+from labs.pagination import OptionalCursorPagination
 from .models import Ticket
 from .serializers import TicketSerializer
 
@@ -14,6 +15,8 @@ class TicketCreateView(generics.CreateAPIView):
 class TicketListView(generics.ListAPIView):
     serializer_class = TicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         if self.request.user.role == 'admin':
@@ -13,8 +13,7 @@ import {
   Hardware as EquipmentIcon,
   Build as MaintenanceIcon,
 } from '@mui/icons-material';
-import { equipmentAPI, labsAPI, maintenanceAPI } from '../services/api';
-import type { Equipment, Lab, MaintenanceLog } from '../types';
+import { statsAPI } from '../services/api';
 
 interface DashboardStats {
   totalLabs: number;
@@ -44,29 +43,14 @@ const Dashboard: React.FC = () => {
         setLoading(true);
         setError('');
 
-        // Fetch all data in parallel
-        const [labs, equipment, maintenance] = await Promise.all<[
-          any,
-          any,
-          any
-        ]>([
-          labsAPI.getAll(),
-          equipmentAPI.getAll(),
-          maintenanceAPI.getAll(),
-        ]);
-
-        // Extract results from paginated responses
-        const labsArray = (Array.isArray(labs) ? labs : (labs?.results ?? [])) as Lab[];
-        const equipmentArray = (Array.isArray(equipment) ? equipment : (equipment?.results ?? [])) as Equipment[];
-        const maintenanceArray = (Array.isArray(maintenance) ? maintenance : (maintenance?.results ?? [])) as MaintenanceLog[];
-
-        // Calculate stats from actual equipment data
-        const totalLabs = labsArray.length;
-        const totalEquipment = equipmentArray.length;
-        const workingEquipment = equipmentArray.filter((item: Equipment) => item.status === 'working').length;
-        const notWorkingEquipment = equipmentArray.filter((item: Equipment) => item.status === 'not_working').length;
-        const underRepairEquipment = equipmentArray.filter((item: Equipment) => item.status === 'under_repair').length;
-        const pendingMaintenance = maintenanceArray.filter((log: MaintenanceLog) => log.status === 'pending').length;
+        // Counted on the server (/api/stats/)
+        const { totals } = await statsAPI.get();
+        const totalLabs = totals.labs;
+        const totalEquipment = totals.equipment.total;
+        const workingEquipment = totals.equipment.by_status.working ?? 0;
+        const notWorkingEquipment = totals.equipment.by_status.not_working ?? 0;
+        const underRepairEquipment = totals.equipment.by_status.under_repair ?? 0;
+        const pendingMaintenance = totals.maintenance.pending;
 
         setStats({
           totalLabs,
@@ -52,14 +52,9 @@ const LabDetail: React.FC = () => {
     try {
       setLoading(true);
       setError('');
-      const [labData, pcData] = await Promise.all([
-        labsAPI.getById(labId),
-        pcsAPI.getByLab(labId),
-      ]);
+      const labData = await labsAPI.getBundle(labId, ['pcs']);
       setLab(labData);
-      // Extract results from paginated response if needed
-      const pcsArray = Array.isArray(pcData?.results) ? pcData.results : Array.isArray(pcData) ? pcData : [];
-      setPcs(pcsArray);
+      setPcs(labData.pcs ?? []);
     } catch (e: any) {
       console.error('Failed to load lab or PCs:', e);
       setError(e?.response?.data?.detail || 'Failed to load lab details. Please check your connection and try again.');
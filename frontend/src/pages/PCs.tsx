@@ -1,7 +1,7 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { Box, Typography, Card, CardContent, Stack, TextField, MenuItem, Chip, CircularProgress } from '@mui/material';
 import { Search, Refresh } from '@mui/icons-material';
-import { labsAPI, pcsAPI } from '../services/api';
+import { labsAPI } from '../services/api';
 import type { Lab, PC } from '../types';
 
 type Agg = { total: number; working: number; not_working: number; under_repair: number; other: number };
@@ -35,23 +35,10 @@ const PCs: React.FC = () => {
       setLoading(true);
       setError('');
 
-      const labsData = await labsAPI.getAll();
-      // Extract results from paginated response
-      const labsArray = Array.isArray(labsData?.results) ? labsData.results : Array.isArray(labsData) ? labsData : [];
-      setLabs(labsArray);
-
-      const all: PC[] = [];
-      for (const lab of labsArray) {
-        try {
-          const labPcs = await pcsAPI.getByLab(lab.id);
-          // Extract results from paginated response if needed
-          const pcsArray = Array.isArray(labPcs?.results) ? labPcs.results : Array.isArray(labPcs) ? labPcs : [];
-          all.push(...pcsArray);
-        } catch (err) {
-          console.warn(`Failed to load PCs for lab ${lab.id}:`, err);
-        }
-      }
-      setPcs(all);
+      // Every lab with its PCs in one request
+      const bundles = await labsAPI.getBundles(['pcs']);
+      setLabs(bundles);
+      setPcs(bundles.flatMap((lab) => lab.pcs ?? []));
     } catch (e: any) {
       console.error('Failed to load PCs:', e);
       setError(e?.response?.data?.detail || 'Failed to load PCs. Please check your connection and try again.');
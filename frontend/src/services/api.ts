@@ -1,6 +1,6 @@
 import axios from 'axios';
 import type { 
-  User, Lab, PC, Equipment, Software, MaintenanceLog, Inventory,
+  User, Lab, LabBundle, PC, Equipment, Software, MaintenanceLog, Inventory, Stats, SyncChanges, LiveEvent,
   LoginRequest, RegisterRequest, AuthResponse 
 } from '../types';
 
@@ -22,6 +22,18 @@ const setTokens = (access: string, refresh: string) => {
   localStorage.setItem('refresh_token', refresh);
 };
 
+// Batch writes (POST /<resource>/bulk/): all items are applied in one transaction, or none on a 400
+export interface BulkWrite<T> {
+  create?: Array<Partial<T>>;
+  update?: Array<Partial<T> & { id: number }>;
+  delete?: number[];
+}
+export interface BulkResult<T> {
+  created: T[];
+  updated: T[];
+  deleted: number[];
+}
+
 // Navigation helpers
 export const navigationAPI = {
   redirectAfterLogin: async (): Promise<{ redirect_to: string }> => {
@@ -109,6 +121,41 @@ export const authAPI = {
   },
 };
 
+// Dashboard statistics, counted on the server; days sets the window of recent maintenance activity
+export const statsAPI = {
+  get: async (days?: number): Promise<Stats> => {
+    const response = await api.get('/stats/', { params: days ? { days } : {} });
+    return response.data;
+  },
+};
+
+// Delta sync: apply changes as upserts, then deletions; call again at once while has_more
+export const syncAPI = {
+  changes: async (since?: string, limit?: number): Promise<SyncChanges> => {
+    const response = await api.get('/sync/', { params: { ...(since ? { since } : {}), ...(limit ? { limit } : {}) } });
+    return response.data;
+  },
+};
+
+// Live events: onEvent gets every change in the labs (all without labs); on 'reset'
+// reload what is shown. EventSource reconnects by itself. Returns the unsubscribe function.
+const LIVE_EVENT_TYPES: LiveEvent['type'][] = ['pc.status', 'maintenance.created', 'maintenance.fixed', 'ticket.status', 'reset'];
+
+export const eventsAPI = {
+  subscribe: (onEvent: (event: LiveEvent) => void, labs?: number[]): (() => void) => {
+    // EventSource cannot send the Authorization header
+    const params = new URLSearchParams({ access_token: getToken() || '' });
+    if (labs?.length) params.set('lab', labs.join(','));
+    const source = new EventSource(`${API_BASE_URL}/events/?${params}`);
+    for (const type of LIVE_EVENT_TYPES) {
+      source.addEventListener(type, (message) => {
+        onEvent({ type, data: JSON.parse((message as MessageEvent).data) } as LiveEvent);
+      });
+    }
+    return () => source.close();
+  },
+};
+
 // Labs API
 export const labsAPI = {
   getAll: async (): Promise<Lab[]> => {
@@ -120,6 +167,17 @@ export const labsAPI = {
     const response = await api.get(`/labs/${id}/`);
     return response.data;
   },
+
+  // A lab with its PCs, equipment, maintenance counts and inventory in one request
+  getBundle: async (id: number, include?: string[]): Promise<LabBundle> => {
+    const response = await api.get(`/labs/${id}/bundle/`, { params: include ? { include: include.join(',') } : {} });
+    return response.data;
+  },
+
+  getBundles: async (include?: string[]): Promise<LabBundle[]> => {
+    const response = await api.get('/labs/bundles/', { params: include ? { include: include.join(',') } : {} });
+    return response.data;
+  },
   
   create: async (data: Omit<Lab, 'id' | 'created_at' | 'updated_at'>): Promise<Lab> => {
     const response = await api.post('/labs/', data);
@@ -161,6 +219,11 @@ export const labEquipmentAPI = {
   delete: async (id: number): Promise<void> => {
     await api.delete(`/lab-equipment/${id}/`);
   },
+
+  bulk: async (changes: BulkWrite<any>): Promise<BulkResult<any>> => {
+    const response = await api.post('/lab-equipment/bulk/', changes);
+    return response.data;
+  },
 };
 
 // PCs API
@@ -188,6 +251,11 @@ export const pcsAPI = {
   delete: async (id: number): Promise<void> => {
     await api.delete(`/pcs/${id}/`);
   },
+
+  bulk: async (changes: BulkWrite<PC>): Promise<BulkResult<PC>> => {
+    const response = await api.post('/pcs/bulk/', changes);
+    return response.data;
+  },
 };
 
 // Equipment API
@@ -242,6 +310,11 @@ export const softwareAPI = {
   delete: async (id: number): Promise<void> => {
     await api.delete(`/software/${id}/`);
   },
+
+  bulk: async (changes: BulkWrite<Software>): Promise<BulkResult<Software>> => {
+    const response = await api.post('/software/bulk/', changes);
+    return response.data;
+  },
 };
 
 // Maintenance API
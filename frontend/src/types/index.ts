@@ -14,6 +14,14 @@ export interface Lab {
   updated_at: string;
 }
 
+// GET /labs/<id>/bundle/ and /labs/bundles/; parts not asked for with ?include= are omitted
+export interface LabBundle extends Lab {
+  pcs?: PC[];
+  equipment?: any[];
+  maintenance?: { pending: number; fixed: number };
+  inventory?: Inventory[];
+}
+
 export interface PC {
   id: number;
   lab: number;
@@ -59,6 +67,7 @@ export interface MaintenanceLog {
   reported_on: string;
   fixed_on?: string;
   remarks?: string;
+  updated_at?: string;
 }
 
 export interface Inventory {
@@ -100,3 +109,36 @@ export interface Ticket {
 export interface RedirectAfterLoginResponse {
   redirect_to: string;
 }
+
+// GET /stats/: the same counters fleet-wide (totals) and per lab
+export interface StatsCounters {
+  pcs: { total: number; working: number; not_working: number; connected: number; disconnected: number };
+  equipment: { total: number; by_status: Record<string, number>; by_type: Record<string, number> };
+  maintenance: { pending: number; fixed: number; opened_recently: number; closed_recently: number };
+  tickets: { open: number; in_progress: number; resolved: number };
+}
+
+export interface Stats {
+  generated_at: string;
+  days: number;
+  totals: StatsCounters & { labs: number };
+  labs: Array<StatsCounters & { id: number; name: string }>;
+}
+
+// GET /sync/?since=<cursor>: rows changed and ids deleted per table since the cursor
+// (every row without one). Rows are flat: related rows appear as ids.
+export type SyncEntity = 'pcs' | 'peripherals' | 'software' | 'lab_equipment' | 'maintenance' | 'tickets';
+
+export interface SyncChanges {
+  cursor: string;
+  has_more: boolean;
+  changes: Record<SyncEntity, Array<{ id: number; updated_at: string } & Record<string, unknown>>>;
+  deleted: Record<SyncEntity, number[]>;
+}
+
+// Server-sent events of /api/events/
+export type LiveEvent =
+  | { type: 'pc.status'; data: { id: number; lab: number; device_name: string; status: string; connected: boolean; previous: { status: string; connected: boolean } } }
+  | { type: 'maintenance.created' | 'maintenance.fixed'; data: { id: number; lab: number | null; pc: number | null; lab_equipment: number | null; peripheral: number | null; status: string } }
+  | { type: 'ticket.status'; data: { id: number; lab: number | null; pc: number | null; status: string; previous_status: string } }
+  | { type: 'reset'; data: Record<string, never> };